@@ -31,27 +31,30 @@ try:
 except Exception:
     pass
 
-# Import TTS engine only AFTER allocator env is set
-from modules.tts_engine import _release_global_tts_model
-from interface import main as interface_main
-from modules.resume_handler import find_incomplete_books
-from tools.combine_only import run_combine_only_mode
-from wrapper.chunk_tool import run_chunk_repair_tool
-from utils.generate_from_json import main as generate_from_json_main
-from modules.tts_engine import process_book_folder
+# The TTS engine (torch, chatterbox), resume handler and voice analyzer are imported
+# where they are first used, after the allocator env above is set, so the window
+# opens without loading them. `python chatterbox_gui.py --profile-startup` shows
+# what startup still imports.
 import importlib
 import config.config as config_mod
 
-# Import voice analyzer
-try:
-    from voice_analyzer.analyzer import analyze_voice_sample
-    from voice_analyzer.audio_processor import process_voice_sample
-    VOICE_ANALYZER_AVAILABLE = True
-    print("✅ Voice analyzer available")
-except ImportError as e:
-    VOICE_ANALYZER_AVAILABLE = False
-    print(f"Warning: Missing dependencies for voice analysis: {e}")
-    print("Install with: pip install -r voice_analyzer/requirements.txt")
+_VOICE_ANALYZER_AVAILABLE = None
+
+
+def voice_analyzer_available():
+    """Probe the optional voice analyzer once, when its tab is first built"""
+    global _VOICE_ANALYZER_AVAILABLE
+    if _VOICE_ANALYZER_AVAILABLE is None:
+        try:
+            from voice_analyzer.analyzer import analyze_voice_sample
+            from voice_analyzer.audio_processor import process_voice_sample
+            _VOICE_ANALYZER_AVAILABLE = True
+            print("✅ Voice analyzer available")
+        except ImportError as e:
+            _VOICE_ANALYZER_AVAILABLE = False
+            print(f"Warning: Missing dependencies for voice analysis: {e}")
+            print("Install with: pip install -r voice_analyzer/requirements.txt")
+    return _VOICE_ANALYZER_AVAILABLE
 
 class NoScrollSpinBox(QSpinBox):
     def wheelEvent(self, event):
@@ -493,6 +496,9 @@ class ChatterboxMainWindow(QMainWindow):
         if hasattr(self, '_voice_playing') and self._voice_playing:
             self.stop_voice_sample()
 
+        # Write any unsaved repair edits back to the chunks JSON
+        self.close_repair_store()
+
         # Accept the close event
         event.accept()
 
@@ -1967,7 +1973,7 @@ class ChatterboxMainWindow(QMainWindow):
         # Artifact cleaning controls
         self.enable_artifact_cleaning = QCheckBox("Enable artifact cleaning")
         self.enable_artifact_cleaning.setChecked(False)
-        self.enable_artifact_cleaning.setToolTip("Remove audio artifacts using auto-editor (slower processing)")
+        self.enable_artifact_cleaning.setToolTip("Cut silence and artifacts below the threshold (in-process, auto-editor semantics)")
         audio_layout.addRow("", self.enable_artifact_cleaning)
 
         self.artifact_threshold_spin = NoScrollDoubleSpinBox()
@@ -2038,7 +2044,7 @@ class ChatterboxMainWindow(QMainWindow):
         # Text search
         search_layout.addWidget(QLabel("Search for text fragment:"))
         self.repair_search_edit = QLineEdit()
-        self.repair_search_edit.setPlaceholderText("Enter text to search for...")
+        self.repair_search_edit.setPlaceholderText("Search text (\"phrase\", ~fuzzy, asr:words, asr<0.8 for ASR mismatches)...")
         self.repair_search_edit.returnPressed.connect(self.search_chunks_for_repair)
         search_layout.addWidget(self.repair_search_edit)
 
@@ -2203,6 +2209,7 @@ class ChatterboxMainWindow(QMainWindow):
         self.current_repair_chunks = None
         self.current_repair_chunk = None
         self.current_repair_book_path = None
+        self.current_repair_store = None
         self.current_repair_audio_dir = None
         self.current_repair_voice_name = None
         self.current_repair_voice_path = None
@@ -2855,6 +2862,7 @@ class ChatterboxMainWindow(QMainWindow):
             print(f"🖥️ Using device: {device.upper()}")
 
             # Call the TTS engine with all parameters
+            from modules.tts_engine import process_book_folder
             result = process_book_folder(
                 book_dir=book_path,
                 voice_path=voice_path,
@@ -2880,6 +2888,7 @@ class ChatterboxMainWindow(QMainWindow):
         """Refresh list of incomplete books"""
         self.incomplete_books_list.clear()
         try:
+            from modules.resume_handler import find_incomplete_books
             incomplete_books = find_incomplete_books()
             for book in incomplete_books:
                 self.incomplete_books_list.addItem(str(book))
@@ -3001,7 +3010,7 @@ class ChatterboxMainWindow(QMainWindow):
 
     def _process_text_file(self, text_path):
         """Process text file with VADER sentiment analysis and JSON generation (matches CLI Option 4)"""
-        from modules.tts_engine import generate_enriched_chunks
+        from modules.chunk_enrichment import generate_enriched_chunks
         from config.config import AUDIOBOOK_ROOT, TEXT_INPUT_ROOT
 
         print(f"📝 Processing text file: {text_path.name}")
@@ -3155,8 +3164,23 @@ class ChatterboxMainWindow(QMainWindow):
         else:
             self.log_output("No chunk files found for repair")
 
+    def close_repair_store(self):
+        """Export pending repair edits to the chunks JSON and close the chunk store"""
+        store = getattr(self, 'current_repair_store', None)
+        if store is None:
+            return
+        try:
+            if store.dirty:
+                store.export_json()
+                self.log_output(f"💾 Saved chunk edits to {store.json_path.name}")
+            store.close()
+        except Exception as e:
+            self.log_output(f"❌ Error saving chunk edits: {e}")
+        self.current_repair_store = None
+
     def load_chunks_for_repair(self):
         """Load chunks for the selected book"""
+        self.close_repair_store()
         current_data = self.repair_book_combo.currentData()
         if not current_data:
             # Clear display when placeholder is selected
@@ -3168,8 +3192,9 @@ class ChatterboxMainWindow(QMainWindow):
         book_name, json_path, source = current_data
 
         try:
-            from wrapper.chunk_loader import load_chunks
-            self.current_repair_chunks = load_chunks(str(json_path))
+            from wrapper.chunk_store import ChunkStore
+            self.current_repair_store = ChunkStore.for_json(json_path)
+            self.current_repair_chunks = self.current_repair_store.all()
             self.current_repair_book_path = json_path
 
             # Ensure chunks have index fields (0-based indexing)
@@ -3182,6 +3207,10 @@ class ChatterboxMainWindow(QMainWindow):
             from pathlib import Path
             audiobook_root = Path(AUDIOBOOK_ROOT)
             self.current_repair_audio_dir = audiobook_root / book_name / "TTS" / "audio_chunks"
+            if self.current_repair_audio_dir.exists():
+                asr_count = self.current_repair_store.import_asr(self.current_repair_audio_dir)
+                if asr_count:
+                    self.log_output(f"Indexed ASR transcripts for {asr_count} chunks")
 
             self.log_output(f"Loaded {len(self.current_repair_chunks)} chunks from {json_path.name}")
 
@@ -3265,8 +3294,8 @@ class ChatterboxMainWindow(QMainWindow):
             return
 
         try:
-            from wrapper.chunk_search import search_chunks
-            results = search_chunks(self.current_repair_chunks, query)
+            from wrapper.chunk_search import search_store
+            results = search_store(self.current_repair_store, query)
 
             self.repair_results_list.clear()
 
@@ -3437,44 +3466,22 @@ Audio: chunk_{chunk['index']+1:05d}.wav"""
             self.current_repair_chunk = updated_chunk
             self.log_output(f"🔧 Updated chunk at index {chunk_index} in list (preserving structure)")
 
-            # Save to file
-            from wrapper.chunk_loader import save_chunks
+            # Save the single row to the chunk store (written back to JSON when the book is closed)
             json_path = str(self.current_repair_book_path)
-
-            # Debug logging
-            self.log_output(f"💾 Saving changes to: {json_path}")
             self.log_output(f"💾 Updated chunk {updated_chunk['index'] + 1:05d}: text='{updated_chunk['text'][:50]}...'")
             self.log_output(f"💾 Boundary: {updated_chunk['boundary_type']}, Sentiment: {updated_chunk['sentiment_compound']}")
             self.log_output(f"💾 TTS Params: exag={updated_chunk['tts_params']['exaggeration']}, cfg={updated_chunk['tts_params']['cfg_weight']}, temp={updated_chunk['tts_params']['temperature']}")
 
-            # Debug: Show what we're actually saving
-            actual_chunk_in_list = self.current_repair_chunks[chunk_index]
-            self.log_output(f"🔍 DEBUG: Chunk in list at index {chunk_index}: text='{actual_chunk_in_list['text'][:50]}...'")
-            self.log_output(f"🔍 DEBUG: Are they the same object? {updated_chunk is actual_chunk_in_list}")
+            self.current_repair_store.update_chunk(chunk_index, updated_chunk)
 
-            save_chunks(json_path, self.current_repair_chunks)
-
-            # Verify the save by checking file modification time and re-reading the file
-            import os
-            from datetime import datetime
-            if os.path.exists(json_path):
-                mod_time = datetime.fromtimestamp(os.path.getmtime(json_path))
-                self.log_output(f"💾 File modified at: {mod_time.strftime('%Y-%m-%d %H:%M:%S')}")
-
-                # Re-read the file to verify what was actually saved
-                try:
-                    from wrapper.chunk_loader import load_chunks
-                    saved_chunks = load_chunks(json_path)
-                    if chunk_index < len(saved_chunks):
-                        saved_chunk = saved_chunks[chunk_index]
-                        self.log_output(f"🔍 VERIFY: Saved chunk text: '{saved_chunk['text'][:50]}...'")
-                        self.log_output(f"🔍 VERIFY: Saved boundary: {saved_chunk.get('boundary_type', 'MISSING')}")
-                        self.log_output(f"🔍 VERIFY: Saved sentiment: {saved_chunk.get('sentiment_compound', 'MISSING')}")
-                except Exception as e:
-                    self.log_output(f"❌ Error verifying save: {e}")
+            # Verify the save by re-reading the row
+            saved_chunk = self.current_repair_store.get(chunk_index)
+            if saved_chunk is not None:
+                self.log_output(f"🔍 VERIFY: Saved chunk text: '{saved_chunk['text'][:50]}...'")
+                self.log_output(f"🔍 VERIFY: Render status: {self.current_repair_store.render_status(chunk_index)}")
 
             self.log_output(f"✅ Saved changes to chunk {updated_chunk['index'] + 1:05d}")
-            QMessageBox.information(self, "Saved", f"Chunk changes saved to:\n{json_path}")
+            QMessageBox.information(self, "Saved", f"Chunk changes saved.\nThey are written to {json_path} when you switch books or close the app.")
 
         except Exception as e:
             self.log_output(f"Error saving chunk: {e}")
@@ -3491,7 +3498,8 @@ Audio: chunk_{chunk['index']+1:05d}.wav"""
             chunk_index = self.current_repair_chunk['index']
             audio_path = self.current_repair_audio_dir / f"chunk_{chunk_index+1:05d}.wav"
 
-            if audio_path.exists():
+            from modules.chunk_pack import chunk_available
+            if chunk_available(audio_path):
                 from wrapper.chunk_player import play_chunk_audio
                 play_chunk_audio(str(audio_path))
                 self.log_output(f"🔊 Playing original audio: {audio_path.name}")
@@ -3563,6 +3571,9 @@ Audio: chunk_{chunk['index']+1:05d}.wav"""
                                           override_voice_name=voice_name)
 
             if revised_path:
+                if self.current_repair_store is not None:
+                    from wrapper.chunk_store import RENDER_REVISED
+                    self.current_repair_store.set_render_status(chunk_index, RENDER_REVISED)
                 self.log_output(f"✅ Chunk resynthesized: {revised_path}")
                 QMessageBox.information(self, "Success", f"Chunk resynthesized successfully:\n{revised_path}")
             else:
@@ -3611,6 +3622,9 @@ Audio: chunk_{chunk['index']+1:05d}.wav"""
 
             from wrapper.chunk_revisions import accept_revision
             accept_revision(chunk_index, self.current_repair_audio_dir)
+            if self.current_repair_store is not None:
+                from wrapper.chunk_store import RENDER_DONE
+                self.current_repair_store.set_render_status(chunk_index, RENDER_DONE)
 
             self.log_output(f"✅ Revision accepted for chunk {chunk_index+1:05d}")
             self.log_output(f"📦 Original archived to Audio_Revisions/chunk_{chunk_index+1:05d}_orig.wav")
@@ -4716,7 +4730,7 @@ Audio: chunk_{chunk['index']+1:05d}.wav"""
         desc_label.setStyleSheet("color: #666; padding: 5px;")
         layout.addWidget(desc_label)
 
-        if VOICE_ANALYZER_AVAILABLE:
+        if voice_analyzer_available():
             # Build the voice analyzer GUI directly in the tab
             try:
                 self.build_voice_analyzer_gui(layout)
@@ -6825,6 +6839,11 @@ The Voice Analyzer provides:
 
 
 def main():
+    if "--profile-startup" in sys.argv:
+        from modules.startup_profiler import profile_startup
+        profile_startup(["chatterbox_gui"], label="GUI")
+        return
+
     app = QApplication(sys.argv)
     app.setStyle('Fusion')  # Modern look
 
@@ -18,6 +18,22 @@ VOICE_SAMPLES_DIR = Path("Voice_Samples")
 # You can also override via environment variable `CHATTERBOX_CKPT_DIR`.
 CHATTERBOX_CKPT_DIR = os.environ.get("CHATTERBOX_CKPT_DIR", "/home/danno/.cache/huggingface/hub/models--ResembleAI--chatterbox/snapshots/1b475dffa71fb191cb6d5901215eb6f55635a9b6")
 
+# Checkpoint loading (see src/chatterbox/checkpoint.py)
+# Memory-map the safetensors and build modules without random weight init before loading
+CHECKPOINT_MMAP = True
+# Load the voice encoder and S3 speech tokenizer on first use. They only build voice
+# conditionals, so runs that reuse cached conditionals never load them.
+LAZY_MODEL_COMPONENTS = True
+
+# Chunk completion journal (audio_chunks/chunks.journal, see modules/chunk_journal.py)
+# fsync after each journal append; disable on slow network drives (a crash may then drop the last few lines)
+CHUNK_JOURNAL_FSYNC = True
+
+# Chunk audio storage: "files" = one chunk_XXXXX.wav per chunk, "pack" = one append-only
+# audio_chunks/chunks.pack indexed by the journal (no per-chunk .wav/.txt files, see modules/chunk_pack.py)
+# Override via environment variable `GENTTS_CHUNK_STORAGE`.
+CHUNK_STORAGE = os.environ.get("GENTTS_CHUNK_STORAGE", "files")
+
 # ============================================================================
 # ENVIRONMENT SETUP
 # ============================================================================
@@ -53,14 +69,39 @@ TEST_MAX_WORKERS = 2                  # For experimentation
 USE_DYNAMIC_WORKERS = False           # Toggle for testing
 VRAM_SAFETY_THRESHOLD = 6.5           # GB
 
+# Render worker processes (CPU): the parent loads the model once into shared memory and
+# a fork-server pool of prewarmed workers renders chunk ranges (see modules/render_pool.py).
+# 0 = render in-process with MAX_WORKERS threads. Override via `GENTTS_RENDER_WORKERS`.
+RENDER_WORKER_PROCESSES = int(os.environ.get("GENTTS_RENDER_WORKERS", "0"))
+RENDER_WORKER_THREADS = 0             # torch threads per worker process (0 = CPU cores / workers)
+RENDER_RANGE_SIZE = 8                 # Consecutive chunks per dispatched range
+
+# CPU topology autotuning (see modules/cpu_tuning.py). `python -m modules.cpu_tuning --voice <wav>`
+# benchmarks processes x threads x batch size on this host and saves the best layout per host;
+# CPU runs then use it wherever RENDER_WORKER_PROCESSES/RENDER_WORKER_THREADS are left at 0.
+USE_CPU_TUNING = True
+CPU_TUNING_FILE = Path(os.environ.get("GENTTS_CPU_TUNING_FILE", Path.home() / ".cache" / "gentts" / "cpu_tuning.json"))
+CPU_PIN_WORKERS = True                # Pin render worker processes to disjoint physical cores (NUMA node by node)
+AUTOTUNE_BATCH_SIZES = (1, 2, 4, 8)   # Micro-batch sizes tried for the best processes x threads layout
+
 # ============================================================================
 # AUDIO QUALITY SETTINGS
 # ============================================================================
 ENABLE_MID_DROP_CHECK = False
 ENABLE_ASR = False  # Disabled by default due to tensor dimension errors
-ASR_WORKERS = 4                       # Parallel ASR on CPU threads
+ASR_WORKERS = 4                       # Torch threads for ASR on CPU
 DEFAULT_ASR_MODEL = "base"            # Default Whisper model for ASR validation
 
+# Resident ASR service (see modules/asr_service.py): one long-lived process loads the ASR model once
+# and transcribes chunks from a queue while synthesis continues; chunks that fail are queued back
+# to the synthesis side for regeneration
+ENABLE_RESIDENT_ASR = True
+ASR_QUEUE_SIZE = 64                   # Chunks waiting for ASR before synthesis blocks (backpressure)
+ASR_SERVICE_START_TIMEOUT = 300       # Seconds to wait for the ASR process to load its model
+ASR_PASS_THRESHOLD = 0.8              # ASR similarity below this is logged as a validation failure
+# Chunks per batched Whisper decode in the ASR service (see modules/asr_batch.py); 1 = per-chunk transcribe
+ASR_BATCH_SIZE = int(os.environ.get("GENTTS_ASR_BATCH_SIZE", "8"))
+
 # ASR Model Memory Requirements (approximate)
 ASR_MODEL_VRAM_MB = {
     "tiny": 39,
@@ -145,6 +186,7 @@ NORMALIZATION_TYPE = "peak"
 TARGET_LUFS = -16
 TARGET_PEAK_DB = -1.5
 TARGET_LRA = 11                       # Target loudness range for consistency
+USE_MANIFEST_LOUDNESS = True          # "loudness" type: gain from per-chunk BS.1770 stats, skips ffmpeg analysis pass
 
 # ============================================================================
 # AUDIO PLAYBACK SPEED SETTINGS
@@ -156,6 +198,13 @@ ATEMPO_SPEED = 1.0
 # ============================================================================
 M4B_SAMPLE_RATE = 24000
 
+# Perth watermarking: "chunk" = each chunk as it is generated, "deferred" = the assembled
+# book WAV in large overlapping blocks before M4B encoding (no per-chunk cost, short chunks
+# covered too), "off" = never. Override via environment variable `GENTTS_WATERMARK_MODE`.
+WATERMARK_MODE = os.environ.get("GENTTS_WATERMARK_MODE", "deferred")
+WATERMARK_BLOCK_SEC = 60              # Deferred mode: seconds of audio per watermarker call
+WATERMARK_OVERLAP_SEC = 0.5           # Deferred mode: crossfade between neighbouring blocks
+
 # ============================================================================
 # TTS MODEL PARAMETERS (DEFAULTS)
 # ============================================================================
@@ -285,10 +334,37 @@ BATCH_SIZE = 50000
 TTS_BATCH_SIZE = 32
 CLEANUP_INTERVAL = 500000                # Deep cleanup every N chunks (reduced frequency for speed)
 
+# Adaptive micro-batching (see modules/batch_controller.py): process_batch generates in sub-batches
+# whose size grows or shrinks from measured tokens/sec and peak memory (VRAM on CUDA, RSS on CPU)
+ENABLE_ADAPTIVE_BATCHING = True
+ADAPTIVE_BATCH_MAX = 16                  # Largest micro-batch the controller may try
+ADAPTIVE_BATCH_MEMORY_FRACTION = 0.85    # Memory budget: fraction of VRAM (CUDA) or RAM (CPU, split across render workers)
+
+# Render plan (see modules/render_plan.py): before rendering, chunks are bin-packed into length-sorted
+# batches of identical TTS params, saved as render_plan.json next to chunks_info.json, and the predicted
+# runtime is printed. The plan's batches are then rendered as written.
+ENABLE_RENDER_PLAN = True
+RENDER_PLAN_FILE = "render_plan.json"
+RENDER_PLAN_COST_MODEL = {               # Seconds per T3 decode step, step growth per extra row, fixed cost per call
+    "cuda": {"step_seconds": 0.012, "batch_scaling": 0.12, "call_overhead": 0.6},
+    "mps": {"step_seconds": 0.03, "batch_scaling": 0.3, "call_overhead": 1.0},
+    "cpu": {"step_seconds": 0.09, "batch_scaling": 0.55, "call_overhead": 1.5},
+}
+RENDER_PLAN_CALIBRATION_FILE = Path(os.environ.get("GENTTS_RENDER_PLAN_CALIBRATION", Path.home() / ".cache" / "gentts" / "render_plan_calibration.json"))
+
 # ============================================================================
 # SMART RELOAD SETTINGS
 # ============================================================================
-ENABLE_SMART_RELOAD = False          # Feature appears incomplete, disable by default
+# Mid-book model reload when throughput has degraded (see modules/smart_reload_manager.py): per-chunk
+# tokens/sec after warm-up is the baseline; a reload happens only for a significant slowdown whose
+# projected time saved over the remaining chunks exceeds the measured reload cost
+ENABLE_SMART_RELOAD = False
+SMART_RELOAD_WARMUP_CHUNKS = 5       # Chunks after a (re)load left out of the measurements
+SMART_RELOAD_WINDOW = 20             # Chunks in the baseline window and in the recent window
+SMART_RELOAD_MIN_DEGRADATION = 10.0  # % slowdown below which a reload is never considered
+SMART_RELOAD_T_THRESHOLD = 2.6       # Welch t-statistic for a significant slowdown (~p < 0.01, one-sided)
+SMART_RELOAD_MIN_ROI = 1.0           # Required time saved / reload cost
+SMART_RELOAD_MEMORY_GROWTH_MB = 2048 # Memory growth since the last (re)load that forces a reset
 
 # ============================================================================
 # QUALITY ENHANCEMENT SETTINGS (Phase 1)
@@ -299,6 +375,10 @@ ENABLE_REGENERATION_LOOP = True      # Enable automatic chunk regeneration on qu
 MAX_REGENERATION_ATTEMPTS = 3        # Maximum retry attempts per chunk
 QUALITY_THRESHOLD = 0.30              # TEMPORARILY LOWERED - Composite quality score threshold (0.0-1.0)
 
+# --- Best-of-K Candidates (alternative to sequential regeneration) ---
+ENABLE_BEST_OF_K = False             # Generate K takes per chunk in one batched T3 pass and keep the best-scoring one
+BEST_OF_K_CANDIDATES = 3             # Number of takes per chunk (batch size of the single generate_batch call)
+
 # --- Sentiment Smoothing Settings ---
 ENABLE_SENTIMENT_SMOOTHING = True    # Re-enabled - GUI controls now working properly
 SENTIMENT_SMOOTHING_WINDOW = 3       # Number of previous chunks to consider
@@ -316,6 +396,14 @@ SPECTRAL_VARIANCE_LIMIT = 100.0      # Maximum spectral variance before flagging
 ENABLE_OUTPUT_VALIDATION = True      # Enable quality control clearinghouse (runs individual checks when enabled)
 OUTPUT_VALIDATION_THRESHOLD = 0.6    # Minimum F1 score for output validation (reduced for punctuation tolerance)
 
+# --- Tiered Quality Gate (see modules/quality_gate.py) ---
+ENABLE_QUALITY_GATE = False          # Cheap signal checks on every take; MFCC only for risky (or sampled) takes (ASR always runs when enabled)
+QUALITY_GATE_SAVE_TAKES = False      # Save every raw take (untrimmed, with T3's token count) to TTS/gate_takes for `python -m modules.quality_gate`
+QUALITY_GATE_RISK_THRESHOLD = 0.3    # Risk (0.0-1.0) at or above which a take gets full validation
+QUALITY_GATE_SAMPLE_RATE = 0.05      # Share of low-risk takes fully validated anyway (measures the gate's miss rate)
+QUALITY_GATE_LENGTH_TOLERANCE = 0.4  # Relative deviation of audio length from the text's expected length before it adds risk
+QUALITY_GATE_MAX_GAP_MS = 1200       # Longest silence inside speech before it adds risk
+
 # --- Parameter Adjustment for Regeneration ---
 REGEN_TEMPERATURE_ADJUSTMENT = 0.1   # How much to adjust temperature per retry (increased for visibility)
 REGEN_EXAGGERATION_ADJUSTMENT = 0.15 # How much to adjust exaggeration per retry (increased for visibility)
@@ -389,6 +477,39 @@ ENABLE_FP16_PRECISION = True       # Use half-precision (FP16) for models (NEW)
 ENABLE_TF32_MATMUL = True           # Enable TF32 for matrix operations (NEW)
 ENABLE_MIXED_PRECISION = True      # Use torch.cuda.amp for automatic mixed precision (NEW)
 
+# S3Gen attention kernels for the conformer encoder and CFM decoder blocks
+# "sdpa" = fused scaled-dot-product attention, "eager" = explicit matmul/softmax (reference)
+# Override via environment variable `GENTTS_S3GEN_ATTENTION`.
+S3GEN_ATTENTION_BACKEND = "sdpa"
+
+# Per-chunk speech token budget for T3 (caps decoding and sizes the token buffer)
+# budget = chars × tokens-per-char × margin + slack, clamped to [min, max]
+# tokens-per-char is calibrated from performance.log once it has enough rows
+ENABLE_TOKEN_BUDGET = True
+TOKEN_BUDGET_TOKENS_PER_CHAR = 2.0     # Fallback rate before calibration (25 tokens/s, ~13 chars/s narration)
+TOKEN_BUDGET_MARGIN = 1.3              # Safety multiplier on the estimate
+TOKEN_BUDGET_SLACK_TOKENS = 25         # Fixed headroom (~1s) for very short chunks
+TOKEN_BUDGET_MIN_TOKENS = 75           # Never cap below ~3s of audio
+TOKEN_BUDGET_MAX_TOKENS = 1000         # Hard cap (previous fixed max_new_tokens)
+TOKEN_BUDGET_PERCENTILE = 95           # Percentile of observed tokens/char used for calibration
+TOKEN_BUDGET_LOG_PATH = "performance.log"
+
+# T3 alignment early stop: taps one attention layer (only that layer runs eager attention)
+# to force EOS per row on long tails / repetitions and to hold back premature EOS
+ENABLE_ALIGNMENT_EARLY_STOP = True
+
+# Streaming synthesis (ChatterboxTTS.generate_stream): speech tokens per vocoded window
+STREAM_FIRST_CHUNK_TOKENS = 25         # First window (~1s of audio) - sets time to first audio
+STREAM_CHUNK_TOKENS = 50               # Following windows (~2s of audio)
+
+# Local TTS server (python -m modules.tts_server)
+SERVER_HOST = "127.0.0.1"              # Localhost only by default
+SERVER_PORT = 8765
+SERVER_MAX_BATCH = 8                   # Max requests per generate_batch call
+SERVER_BATCH_WAIT_MS = 20              # How long the batcher waits for more requests after the first
+SERVER_VOICE_CACHE_SIZE = 8            # Voices whose conditionals stay resident (LRU)
+SERVER_LATENCY_WINDOW = 1000           # Recent requests used for latency percentiles
+
 # Memory Management (prevent fragmentation on RTX 4060 Ti 8GB)
 PYTORCH_CUDA_ALLOC_CONF = "max_split_size_mb:128"  # Disable expandable_segments for allocator stability
 
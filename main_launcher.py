@@ -6,16 +6,53 @@ Unified CLI tool for synthesis, chunking, and audio revision
 
 import sys
 import logging
-from modules.text_processor import sentence_chunk_text, smart_punctuate, test_chunking, detect_content_boundaries
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from wrapper.chunk_loader import save_chunks, load_chunks
-from wrapper.chunk_tool import run_chunk_repair_tool
-from modules.resume_handler import resume_book_from_chunk, find_incomplete_books
-from tools.combine_only import run_combine_only_mode
 from pathlib import Path
-from interface import main
 from config.config import *
 
+# Subcommands import their modules on first use, so the menu (and light commands
+# like prepare/combine/repair) start without loading torch and the TTS stack.
+# Module lists are also what `--profile-startup <command>` measures.
+COMMAND_MODULES = {
+    "convert": ["interface"],
+    "resume": ["modules.resume_handler"],
+    "combine": ["tools.combine_only"],
+    "prepare": ["modules.chunk_enrichment"],
+    "test-chunking": ["modules.text_processor"],
+    "repair": ["wrapper.chunk_tool"],
+    "generate-json": ["utils.generate_from_json"],
+}
+
+
+def convert_book():
+    """Convert a book (full GenTTS pipeline)"""
+    from interface import main as interface_main
+    return interface_main()
+
+
+def resume_book_from_chunk(start_chunk):
+    from modules.resume_handler import resume_book_from_chunk as _resume
+    return _resume(start_chunk)
+
+
+def run_combine_only_mode():
+    from tools.combine_only import run_combine_only_mode as _combine
+    return _combine()
+
+
+def run_chunk_repair_tool():
+    from wrapper.chunk_tool import run_chunk_repair_tool as _repair
+    return _repair()
+
+
+def generate_from_json():
+    from utils.generate_from_json import main as generate_from_json_main
+    return generate_from_json_main()
+
+
+def test_chunking(*args):
+    from modules.text_processor import test_chunking as _test_chunking
+    return _test_chunking(*args)
+
 def prompt_menu(options):
     print("\nSelect an option:")
     for idx, label in enumerate(options, 1):
@@ -40,8 +77,6 @@ def prompt_menu(options):
             print(f"❌ Unexpected error: {e}")
             return None
 
-from modules.tts_engine import generate_enriched_chunks
-
 def prepare_chunk_file():
     """Unified chunk prep that calls the centralized chunk generation function."""
     print("\n📝 Prepare Text File for Chunking")
@@ -153,6 +188,7 @@ def prepare_chunk_file():
     text_output_dir.mkdir(parents=True, exist_ok=True)
 
     print(f"\n🔄 Processing: {selected_txt_file}")
+    from modules.chunk_enrichment import generate_enriched_chunks
     enriched_chunks = generate_enriched_chunks(selected_txt_file, text_output_dir, user_tts_params)
 
     print(f"\n✅ Processing Complete!")
@@ -189,7 +225,7 @@ def main_with_resume():
     elif mode == "3":
         return run_combine_only_mode()
     else:
-        return main()  # Your existing main function
+        return convert_book()  # Your existing main function
 
 
 def wrapper_main():
@@ -208,7 +244,7 @@ def wrapper_main():
         if selected is None:
             break
         elif selected == 1:
-            main()
+            convert_book()
         elif selected == 2:
             try:
                 print("\n🔄 Resume Processing from Specific Chunk")
@@ -246,6 +282,39 @@ def wrapper_main():
             from utils.generate_from_json import main as generate_from_json_main
             generate_from_json_main()
 
-if __name__ == "__main__":
+def run_command(command):
+    """Run one menu action directly (`python main_launcher.py combine`)"""
+    actions = {
+        "convert": convert_book,
+        "resume": lambda: resume_book_from_chunk(0),
+        "combine": run_combine_only_mode,
+        "prepare": prepare_chunk_file,
+        "test-chunking": lambda: test_chunking(None, MAX_CHUNK_WORDS, MIN_CHUNK_WORDS),
+        "repair": run_chunk_repair_tool,
+        "generate-json": generate_from_json,
+    }
+    return actions[command]()
+
+
+def cli():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="GenTTS wrapper launcher (menu when no command is given)")
+    parser.add_argument("command", nargs="?", choices=sorted(COMMAND_MODULES), help="Run one action directly")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print an import-time tree for the launcher (plus COMMAND's imports) and exit")
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        from modules.startup_profiler import profile_startup
+        modules = ["main_launcher"] + COMMAND_MODULES.get(args.command, [])
+        profile_startup(modules, label=args.command or "menu")
+        return
+    if args.command:
+        return run_command(args.command)
     wrapper_main()
+
+
+if __name__ == "__main__":
+    cli()
 main = wrapper_main
@@ -0,0 +1,173 @@
+"""
+Batched Whisper Transcription
+=============================
+
+`asr_model.transcribe(audio)` pads every chunk to a 30 s mel and runs its own
+encoder pass and decoding loop, although chunks are only 3-10 s long. Here several
+chunks are decoded together instead:
+
+- each chunk is padded/trimmed to one 30 s window and turned into a log-mel
+  spectrogram; the mels are stacked into a (batch, n_mels, 3000) tensor
+- one `whisper.decode` call runs the encoder over the whole batch and decodes
+  all rows in lockstep (greedy, temperature 0, no timestamps)
+
+What transcribe adds on top is kept where it matters for validation: a row whose
+decode looks degenerate (compression ratio or average log-prob past transcribe's
+thresholds) is re-run through `transcribe`, which retries at higher temperatures,
+and a row Whisper considers silence comes back empty. Chunks longer than one
+window always go through `transcribe`.
+
+On CPU the ASR process uses ASR_WORKERS torch threads; ASR_BATCH_SIZE chunks are
+decoded per call. `python -m modules.asr_batch <chunk folder>` compares per-chunk
+and batched throughput on this host.
+"""
+
+import time
+
+import numpy as np
+
+from config.config import ASR_BATCH_SIZE, ASR_WORKERS, DEFAULT_ASR_MODEL
+
+ASR_SAMPLE_RATE = 16000
+WINDOW_SECONDS = 30
+
+# transcribe()'s defaults for when a decode is not trusted
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+
+def segment_to_float(audio_segment):
+    """Mono float32 samples in [-1, 1] from a pydub AudioSegment"""
+    samples = np.array(audio_segment.get_array_of_samples())
+    if audio_segment.channels == 2:
+        samples = samples.reshape((-1, 2)).mean(axis=1)
+    return (samples / audio_segment.max_possible_amplitude).astype(np.float32)
+
+
+def to_asr_input(samples, sr):
+    """Mono float32 at the 16 kHz Whisper expects"""
+    if sr != ASR_SAMPLE_RATE:
+        import torch
+        import torchaudio.functional as AF
+        samples = AF.resample(torch.from_numpy(samples), sr, ASR_SAMPLE_RATE).numpy()
+    return samples.astype(np.float32)
+
+
+def configure_asr_threads(device):
+    """Give the ASR process ASR_WORKERS torch threads when it runs on CPU"""
+    if str(device).lower() == "cpu" and ASR_WORKERS > 0:
+        import torch
+        torch.set_num_threads(ASR_WORKERS)
+
+
+def _n_mels(asr_model):
+    return getattr(getattr(asr_model, "dims", None), "n_mels", 80)
+
+
+def transcribe_batch(asr_model, audios, language=None):
+    """
+    Transcribe several 16 kHz float32 clips with one encoder/decoder pass per batch
+
+    Args:
+        asr_model: Loaded openai-whisper model
+        audios: List of 1-D float32 arrays at 16 kHz
+        language: Language code, or None to detect per clip
+
+    Returns:
+        list: Transcript text per clip, in input order
+    """
+    import torch
+    import whisper
+
+    texts = [None] * len(audios)
+    window = []
+    for i, audio in enumerate(audios):
+        if len(audio) > WINDOW_SECONDS * ASR_SAMPLE_RATE:
+            texts[i] = asr_model.transcribe(audio, language=language).get("text", "").strip()
+        else:
+            window.append(i)
+    if not window:
+        return texts
+
+    device = asr_model.device
+    n_mels = _n_mels(asr_model)
+    mels = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(audios[i])), n_mels).to(device)
+        for i in window
+    ])
+    options = whisper.DecodingOptions(language=language, without_timestamps=True, fp16=device.type == "cuda")
+    with torch.no_grad():
+        results = whisper.decode(asr_model, mels, options)
+
+    for i, result in zip(window, results):
+        if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+            texts[i] = ""
+        elif result.compression_ratio > COMPRESSION_RATIO_THRESHOLD or result.avg_logprob < LOGPROB_THRESHOLD:
+            # transcribe() retries these at higher temperatures
+            texts[i] = asr_model.transcribe(audios[i], language=language).get("text", "").strip()
+        else:
+            texts[i] = result.text.strip()
+    return texts
+
+
+def transcribe_chunks(asr_model, audios, batch_size=ASR_BATCH_SIZE):
+    """transcribe_batch over `audios` in groups of `batch_size` (1 = per-chunk transcribe)"""
+    if batch_size <= 1:
+        return [asr_model.transcribe(audio).get("text", "").strip() for audio in audios]
+    texts = []
+    for start in range(0, len(audios), batch_size):
+        texts.extend(transcribe_batch(asr_model, audios[start:start + batch_size]))
+    return texts
+
+
+def main():
+    """Throughput of per-chunk vs batched transcription over a folder of chunk wavs"""
+    import argparse
+    from pathlib import Path
+    from pydub import AudioSegment
+
+    ap = argparse.ArgumentParser(description="Compare per-chunk and batched Whisper transcription throughput")
+    ap.add_argument("chunk_dir", help="Folder with chunk_*.wav files (e.g. a book's audio_chunks)")
+    ap.add_argument("--model", default=DEFAULT_ASR_MODEL, help="Whisper model name")
+    ap.add_argument("--device", default="cpu", help="cpu or cuda")
+    ap.add_argument("--limit", type=int, default=32, help="Chunks to transcribe")
+    ap.add_argument("--batch-sizes", default=f"1,4,{ASR_BATCH_SIZE}", help="Comma-separated sizes (1 = per chunk)")
+    args = ap.parse_args()
+
+    import whisper
+    from modules.audio_processor import calculate_text_similarity
+
+    paths = sorted(Path(args.chunk_dir).glob("chunk_*.wav"))[:args.limit]
+    if not paths:
+        print(f"❌ No chunk_*.wav files in {args.chunk_dir}")
+        return 1
+    audios = []
+    for path in paths:
+        segment = AudioSegment.from_wav(path)
+        audios.append(to_asr_input(segment_to_float(segment), segment.frame_rate))
+    audio_seconds = sum(len(a) for a in audios) / ASR_SAMPLE_RATE
+
+    configure_asr_threads(args.device)
+    model = whisper.load_model(args.model, device=args.device)
+    print(f"🎤 {len(audios)} chunks, {audio_seconds:.0f}s of audio, {args.model} on {args.device.upper()}"
+          + (f" ({ASR_WORKERS} threads)" if args.device == "cpu" else ""))
+    transcribe_chunks(model, audios[:2], batch_size=2)  # warm-up
+
+    reference = None
+    baseline = None
+    for size in [int(s) for s in args.batch_sizes.split(",") if s.strip()]:
+        start = time.perf_counter()
+        texts = transcribe_chunks(model, audios, batch_size=size)
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference, baseline = texts, elapsed
+        agreement = np.mean([calculate_text_similarity(a, b) for a, b in zip(reference, texts)])
+        print(f"   batch {size:>2}: {elapsed:6.1f}s, {len(audios) / elapsed:5.2f} chunks/s, "
+              f"{audio_seconds / elapsed:5.1f}x realtime, {baseline / elapsed:4.2f}x vs first, "
+              f"agreement {agreement:.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,289 @@
+"""
+Resident ASR Service
+====================
+
+ASR validation in its own long-lived process, so transcription overlaps
+synthesis instead of running inline in the TTS worker thread.
+
+- `AsrService.start` spawns one process that loads the ASR model once
+  (load_asr_model_adaptive) and then transcribes jobs from a queue until closed.
+- The synthesis side calls `submit` right after a chunk is written (the final,
+  trimmed audio). The job queue is bounded (ASR_QUEUE_SIZE), so synthesis only
+  waits when ASR falls that far behind.
+- The ASR process takes up to ASR_BATCH_SIZE waiting jobs at a time and
+  transcribes them in one batched Whisper decode (modules/asr_batch.py).
+- A collector thread receives results. It records the transcript and similarity
+  in the chunk journal (an `annotate` line) and logs failures to the run log.
+  When the chunk's quality score times the similarity is below
+  QUALITY_THRESHOLD and attempts remain, it queues a regeneration request.
+- The synthesis side picks up requests with `take_regenerations` (between
+  micro-batches and at the end of the book), re-renders those chunks with
+  adjusted parameters and submits them again. `wait_idle` waits for outstanding
+  jobs before the book is assembled.
+
+If the ASR process fails to start or dies, submissions are dropped with a
+warning and the render continues unvalidated.
+"""
+
+import time
+import queue
+import logging
+import threading
+from pathlib import Path
+
+from config.config import (
+    ASR_QUEUE_SIZE, ASR_SERVICE_START_TIMEOUT, ASR_PASS_THRESHOLD, ASR_BATCH_SIZE,
+    QUALITY_THRESHOLD, MAX_REGENERATION_ATTEMPTS, ENABLE_REGENERATION_LOOP,
+)
+from modules.asr_batch import segment_to_float
+
+
+def _next_jobs(jobs):
+    """Block for one job, then take whatever else is already waiting (up to ASR_BATCH_SIZE)"""
+    batch = [jobs.get()]
+    while batch[-1] is not None and len(batch) < ASR_BATCH_SIZE:
+        try:
+            batch.append(jobs.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _asr_worker_main(asr_config, jobs, results):
+    """ASR process: load the model once, then transcribe jobs in batches until a None job arrives"""
+    from modules.asr_manager import load_asr_model_adaptive
+    from modules.asr_batch import to_asr_input, transcribe_chunks, configure_asr_threads
+    from modules.audio_processor import calculate_text_similarity
+
+    try:
+        asr_model, asr_device = load_asr_model_adaptive(asr_config)
+    except Exception as e:
+        asr_model, asr_device = None, str(e)
+    if asr_model is None:
+        results.put(("failed", asr_device))
+        return
+    configure_asr_threads(asr_device)
+    results.put(("ready", asr_device))
+
+    running = True
+    while running:
+        batch = _next_jobs(jobs)
+        if batch[-1] is None:
+            batch.pop()
+            running = False
+        if not batch:
+            continue
+        start = time.time()
+        try:
+            texts = transcribe_chunks(asr_model, [to_asr_input(job["samples"], job["sr"]) for job in batch])
+            error = None
+        except Exception as e:
+            texts, error = [None] * len(batch), str(e)
+        seconds = (time.time() - start) / len(batch)
+        for job, text in zip(batch, texts):
+            result = {"chunk": job["chunk"], "seconds": seconds}
+            if error is not None:
+                result["error"] = error
+            else:
+                result["text"] = text
+                result["score"] = calculate_text_similarity(job["expected"], text)
+            results.put(("result", result))
+    results.put(("exit", None))
+
+
+class AsrService:
+    """Long-lived ASR process fed by a queue; see the module docstring"""
+
+    def __init__(self, asr_config=None, log_path=None):
+        self.asr_config = asr_config or {}
+        self.log_path = log_path
+        self.device = None
+        self.available = False
+        self.scores = {}
+        self._jobs_info = {}
+        self._attempts = {}
+        self._regenerations = []
+        self._pending = 0
+        self._asr_seconds = 0.0
+        self._failed = set()
+        self._cond = threading.Condition()
+        self._proc = None
+        self._collector = None
+
+    def start(self):
+        """Spawn the ASR process and wait for its model to load; returns True if it is ready"""
+        import multiprocessing as mp
+        ctx = mp.get_context("spawn")  # no forked CUDA state in the ASR process
+        self._jobs = ctx.Queue(maxsize=ASR_QUEUE_SIZE)
+        self._results = ctx.Queue()
+        self._proc = ctx.Process(target=_asr_worker_main, args=(self.asr_config, self._jobs, self._results),
+                                 name="asr-service", daemon=True)
+        start = time.time()
+        self._proc.start()
+        try:
+            kind, detail = self._results.get(timeout=ASR_SERVICE_START_TIMEOUT)
+        except queue.Empty:
+            kind, detail = "failed", f"no response in {ASR_SERVICE_START_TIMEOUT}s"
+        if kind != "ready":
+            print(f"❌ ASR service failed to start ({detail}) - chunks will not be ASR-validated")
+            self._proc.terminate()
+            return False
+        self.device = detail
+        self.available = True
+        self._collector = threading.Thread(target=self._collect, name="asr-collector", daemon=True)
+        self._collector.start()
+        print(f"🎤 ASR service ready on {str(detail).upper()} in {time.time() - start:.1f}s (pid {self._proc.pid})")
+        return True
+
+    def submit(self, chunk_index, audio_segment, expected_text, final_path, quality_score=1.0, tts_params=None):
+        """
+        Queue a written chunk for ASR validation
+
+        Args:
+            chunk_index: 0-based chunk index
+            audio_segment: Final chunk audio (pydub AudioSegment)
+            expected_text: Normalized text the audio should say
+            final_path: The chunk's `chunk_XXXXX.wav` path (for the journal)
+            quality_score: The take's quality score before ASR
+            tts_params: Params the take was rendered with (base for a regeneration)
+
+        Returns:
+            bool: False if the service is unavailable (or died while the queue was full)
+        """
+        if not self.available:
+            return False
+        samples = segment_to_float(audio_segment)
+
+        with self._cond:
+            self._attempts[chunk_index] = self._attempts.get(chunk_index, 0) + 1
+            self._jobs_info[chunk_index] = {
+                "expected": expected_text, "path": Path(final_path),
+                "quality": quality_score, "tts_params": dict(tts_params or {}),
+            }
+            self._pending += 1
+        job = {"chunk": chunk_index, "samples": samples, "sr": audio_segment.frame_rate, "expected": expected_text}
+        # Waits while ASR_QUEUE_SIZE chunks are queued (backpressure on synthesis), but only
+        # as long as the ASR process is there to drain the queue
+        while self.available and self._proc.is_alive():
+            try:
+                self._jobs.put(job, timeout=1.0)
+                return True
+            except queue.Full:
+                continue
+        logging.warning(f"⚠️ ASR service unavailable - chunk {chunk_index + 1:05} will not be ASR-validated")
+        with self._cond:
+            self._pending = max(0, self._pending - 1)
+            self._cond.notify_all()
+        return False
+
+    def _collect(self):
+        while True:
+            try:
+                kind, payload = self._results.get(timeout=1.0)
+            except queue.Empty:
+                if self._proc.is_alive():
+                    continue
+                kind, payload = "died", None
+            if kind == "result":
+                self._handle_result(payload)
+                continue
+            if kind == "died":
+                logging.error(f"❌ ASR service process exited unexpectedly (code {self._proc.exitcode})")
+            with self._cond:
+                self.available = False
+                self._pending = 0
+                self._cond.notify_all()
+            return
+
+    def _handle_result(self, result):
+        from modules.chunk_journal import ChunkJournal, chunk_number_from_name
+        from modules.progress_tracker import log_run
+
+        idx = result["chunk"]
+        with self._cond:
+            info = self._jobs_info.get(idx, {})
+            attempts = self._attempts.get(idx, 1)
+            self._asr_seconds += result.get("seconds", 0.0)
+        chunk_id_str = f"{idx + 1:05}"
+
+        if "error" in result:
+            logging.error(f"❌ ASR failed for {chunk_id_str}: {result['error']}")
+            score, text = 0.8, ""  # Neutral score, as inline ASR: no regeneration on ASR errors
+        else:
+            score, text = result["score"], result["text"]
+            logging.info(f"🎤 ASR similarity for chunk {chunk_id_str}: {score:.3f} - "
+                         f"Expected: '{info.get('expected', '')}' Got: '{text}'")
+
+        path = info.get("path")
+        if path is not None:
+            try:
+                ChunkJournal(path.parent).annotate(chunk_number_from_name(path.name),
+                                                   asr={"text": text, "score": round(float(score), 4)})
+            except OSError as e:
+                logging.warning(f"Could not journal ASR result for {path.name}: {e}")
+
+        regenerate = (ENABLE_REGENERATION_LOOP and info.get("quality", 1.0) * score < QUALITY_THRESHOLD
+                      and attempts < MAX_REGENERATION_ATTEMPTS)
+        if score < ASR_PASS_THRESHOLD and self.log_path and not regenerate:
+            log_run(f"ASR VALIDATION FAILED - Chunk {chunk_id_str}:\nExpected:\n{info.get('expected', '')}\n"
+                    f"Actual:\n{text}\nSimilarity: {score:.3f}\n" + "=" * 50, self.log_path)
+
+        with self._cond:
+            self.scores[idx] = (score, text)
+            if score < ASR_PASS_THRESHOLD:
+                self._failed.add(idx)
+            else:
+                self._failed.discard(idx)
+            if regenerate:
+                self._regenerations.append({
+                    "chunk": idx,
+                    "score": score,
+                    "quality": info.get("quality", 1.0) * score,
+                    "attempt": attempts,
+                    "tts_params": info.get("tts_params", {}),
+                })
+            self._pending -= 1
+            self._cond.notify_all()
+
+    def take_regenerations(self):
+        """Regeneration requests queued since the last call (oldest first)"""
+        with self._cond:
+            requests, self._regenerations = self._regenerations, []
+        return requests
+
+    def wait_idle(self, timeout=None):
+        """Wait until every submitted chunk has a result; returns False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending <= 0, timeout)
+
+    def summary(self):
+        with self._cond:
+            validated = len(self.scores)
+            failed = len(self._failed)
+            regenerated = sum(1 for n in self._attempts.values() if n > 1)
+            asr_seconds = self._asr_seconds
+        return (f"🎤 ASR service: {validated} chunks validated, {failed} below {ASR_PASS_THRESHOLD}, "
+                f"{regenerated} regenerated, {asr_seconds:.0f}s of transcription overlapped with synthesis")
+
+    def close(self):
+        """Stop the ASR process (after wait_idle, so no results are lost)"""
+        if self._proc is None:
+            return
+        if self._proc.is_alive():
+            try:
+                self._jobs.put(None, timeout=5)
+            except queue.Full:
+                pass
+            self._proc.join(timeout=30)
+            if self._proc.is_alive():
+                self._proc.terminate()
+        if self._collector is not None:
+            self._collector.join(timeout=5)
+        self.available = False
+        print(f"🧹 ASR service stopped")
+
+
+def start_asr_service(asr_config=None, log_path=None):
+    """Start a resident ASR service; returns it, or None if the model could not be loaded"""
+    service = AsrService(asr_config, log_path)
+    return service if service.start() else None
@@ -42,12 +42,18 @@ distribution of low-quality audio with TTS artifacts or technical issues.
 import numpy as np
 import soundfile as sf
 import logging
-import shutil
 import re
 import time
+import threading
 from pathlib import Path
 from pydub import AudioSegment, silence
 from config.config import *
+from modules.chunk_journal import journal_chunk_removed
+from modules.chunk_pack import extract_chunk, place_chunk_file
+
+# Whisper's decoder keeps its KV cache in forward hooks on the shared model, so
+# concurrent transcribe() calls on one model corrupt each other's output
+ASR_TRANSCRIBE_LOCK = threading.Lock()
 
 # Enhanced imports for spectral analysis
 try:
@@ -315,7 +321,8 @@ def validate_output_matches_input(audio_path_or_segment, reference_text, asr_mod
                 return 0.8  # Neutral score if ASR unavailable
 
         # Transcribe the audio
-        result = asr_model.transcribe(audio_path)
+        with ASR_TRANSCRIBE_LOCK:
+            result = asr_model.transcribe(audio_path)
         transcribed_text = result.get("text", "").strip()
 
         # Clean up temporary file
@@ -435,7 +442,8 @@ def handle_problematic_chunks(wav_path, issue_type, metrics):
 
     # Move to quarantine with descriptive name
     quarantine_path = quarantine_dir / f"{wav_path.stem}_{issue_type}.wav"
-    shutil.move(str(wav_path), str(quarantine_path))
+    extract_chunk(wav_path, quarantine_path)
+    journal_chunk_removed(wav_path)
 
     # Log for user review
     logging.warning(f"🚨 Quarantined {issue_type}: {wav_path.name} → {quarantine_path.name}")
@@ -492,7 +500,7 @@ def pause_for_chunk_review(quarantine_dir):
         main_path = qfile.parent.parent / original_name
 
         try:
-            shutil.move(str(qfile), str(main_path))
+            place_chunk_file(qfile, main_path)
             moved_count += 1
             print(f"↩️ Restored: {original_name}")
         except Exception as e:
@@ -857,10 +865,6 @@ def get_wav_duration(wav_path):
         return frames / float(rate)
 
 def get_chunk_audio_duration(wav_path):
-    """Get actual audio duration from WAV file"""
-    try:
-        data, sr = sf.read(str(wav_path))
-        return len(data) / sr
-    except:
-        # Fallback to wave module
-        return get_wav_duration(wav_path)
+    """Get chunk duration from the chunk manifest, falling back to the WAV header"""
+    from modules.chunk_journal import chunk_duration
+    return chunk_duration(wav_path)
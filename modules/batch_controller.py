@@ -0,0 +1,268 @@
+"""
+Adaptive Micro-Batch Controller
+===============================
+
+Picks the `generate_batch` micro-batch size during a run instead of using a
+fixed cap. Every sub-batch that process_batch generates is measured for:
+
+- throughput: speech tokens/sec (audio seconds x 25 tokens/s over wall time),
+  kept as an EWMA per batch size
+- peak memory: VRAM peak on CUDA (max_memory_allocated). On CPU it is the RSS
+  high-water mark (VmHWM, reset through /proc/self/clear_refs where supported,
+  else the RSS after the call).
+
+After each full batch the controller:
+
+- shrinks (halves) when the peak exceeded the memory budget or the call ran out
+  of memory, and caps the size below that point for the rest of the run
+- shrinks when the half size has measured clearly higher throughput
+- grows (doubles, up to ADAPTIVE_BATCH_MAX) once the current size has enough
+  samples, if the predicted peak fits the budget and the larger size hasn't
+  already measured slower
+
+Each decision is printed and logged. There is one controller per (device, CFG
+on/off) because CFG doubles the effective batch.
+
+The process_batch worker threads share a controller, while the peak-memory
+counters are process-wide and throughput suffers under contention. So a
+controller generates one sub-batch at a time: the peak reset, the call and its
+measurement run under the controller's run lock. The workers' CPU-side work
+(trimming, writing chunks) still overlaps with generation.
+"""
+
+import time
+import logging
+import threading
+from pathlib import Path
+
+from config.config import ADAPTIVE_BATCH_MAX, ADAPTIVE_BATCH_MEMORY_FRACTION
+
+SPEECH_TOKENS_PER_SEC = 25   # S3 speech token rate
+EWMA_ALPHA = 0.3
+MIN_SAMPLES = 2              # Full batches measured at a size before growing past it
+THROUGHPUT_MARGIN = 0.03     # Relative tokens/sec difference treated as real
+GROWTH_HEADROOM = 1.10       # Safety factor on the predicted peak when growing
+
+_OOM_MARKERS = ("out of memory", "cuda oom", "can't allocate memory", "not enough memory", "failed to allocate")
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def is_oom_error(exc):
+    """True for out-of-memory failures on CUDA, MPS and CPU"""
+    if isinstance(exc, MemoryError):
+        return True
+    return isinstance(exc, RuntimeError) and any(m in str(exc).lower() for m in _OOM_MARKERS)
+
+
+def _is_cuda(device):
+    return str(device).startswith("cuda")
+
+
+def _reset_peak(device):
+    if _is_cuda(device):
+        import torch
+        torch.cuda.reset_peak_memory_stats()
+        return
+    try:
+        Path("/proc/self/clear_refs").write_text("5")  # resets VmHWM (Linux)
+    except OSError:
+        pass
+
+
+def current_memory(device):
+    """Bytes in use now: allocated VRAM on CUDA, process RSS otherwise"""
+    if _is_cuda(device):
+        import torch
+        return torch.cuda.memory_allocated()
+    import psutil
+    return psutil.Process().memory_info().rss
+
+
+def _peak_memory(device):
+    if _is_cuda(device):
+        import torch
+        return torch.cuda.max_memory_allocated()
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return current_memory(device)
+
+
+def memory_budget(device):
+    """Bytes a micro-batch peak may reach on this device"""
+    if _is_cuda(device):
+        import torch
+        total = torch.cuda.get_device_properties(torch.device(device)).total_memory
+        return int(total * ADAPTIVE_BATCH_MEMORY_FRACTION)
+    import psutil
+    from modules.cpu_tuning import worker_layout
+    processes = max(1, worker_layout()[0])
+    return int(psutil.virtual_memory().total * ADAPTIVE_BATCH_MEMORY_FRACTION / processes)
+
+
+class _SizeStats:
+    def __init__(self):
+        self.tokens_per_sec = None
+        self.samples = 0
+        self.peak = 0
+        self.per_item = 0.0
+
+    def add(self, tokens_per_sec, peak, per_item):
+        if self.tokens_per_sec is None:
+            self.tokens_per_sec = tokens_per_sec
+        else:
+            self.tokens_per_sec += EWMA_ALPHA * (tokens_per_sec - self.tokens_per_sec)
+        self.samples += 1
+        self.peak = max(self.peak, peak)
+        self.per_item = max(self.per_item, per_item)
+
+
+class AdaptiveBatchController:
+    """Micro-batch size for one device / CFG setting, adjusted from measured batches"""
+
+    def __init__(self, device, initial_size, max_size=ADAPTIVE_BATCH_MAX, budget=None, label=""):
+        self.device = str(device)
+        self.max_size = max(1, int(max_size))
+        self.ceiling = self.max_size
+        self.size = max(1, min(int(initial_size), self.max_size))
+        self.budget = budget if budget is not None else memory_budget(device)
+        self.label = label
+        self.stats = {}
+        self.decisions = []
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()  # One measured sub-batch at a time across worker threads
+
+    def _decide(self, new_size, reason):
+        new_size = max(1, min(new_size, self.ceiling))
+        if new_size == self.size:
+            return
+        message = f"📐 Micro-batch{self.label} {self.size} → {new_size}: {reason}"
+        print(message)
+        logging.info(message)
+        self.decisions.append((time.time(), self.size, new_size, reason))
+        self.size = new_size
+
+    def record(self, n_items, audio_seconds, elapsed, mem_before, peak):
+        """Feed one generated sub-batch of `n_items` texts and adjust the size"""
+        with self._lock:
+            if elapsed <= 0 or n_items <= 0:
+                return
+            tokens_per_sec = audio_seconds * SPEECH_TOKENS_PER_SEC / elapsed
+            per_item = max(0, peak - mem_before) / n_items
+            self.stats.setdefault(n_items, _SizeStats()).add(tokens_per_sec, peak, per_item)
+            if n_items != self.size:
+                return  # a short tail batch says little about the current size
+
+            gb = 1024 ** 3
+            current = self.stats[self.size]
+            if peak > self.budget:
+                self.ceiling = max(1, self.size // 2)
+                self._decide(self.size // 2, f"peak {peak / gb:.2f} GB over budget {self.budget / gb:.2f} GB")
+                return
+
+            smaller = self.stats.get(self.size // 2)
+            if (self.size > 1 and smaller and smaller.samples >= MIN_SAMPLES
+                    and smaller.tokens_per_sec > current.tokens_per_sec * (1 + THROUGHPUT_MARGIN)):
+                self.ceiling = self.size - 1
+                self._decide(self.size // 2, f"{smaller.tokens_per_sec:.0f} tok/s at {self.size // 2} "
+                                             f"beats {current.tokens_per_sec:.0f} tok/s at {self.size}")
+                return
+
+            bigger = min(self.size * 2, self.ceiling)
+            if bigger <= self.size or current.samples < MIN_SAMPLES:
+                return
+            known = self.stats.get(bigger)
+            if known and known.samples >= MIN_SAMPLES and \
+                    known.tokens_per_sec < current.tokens_per_sec * (1 + THROUGHPUT_MARGIN):
+                return
+            predicted = mem_before + current.per_item * bigger * GROWTH_HEADROOM
+            if predicted < self.budget:
+                self._decide(bigger, f"{current.tokens_per_sec:.0f} tok/s, predicted peak "
+                                     f"{predicted / gb:.2f} GB within {self.budget / gb:.2f} GB")
+
+    def record_oom(self, n_items, exc):
+        """An n_items sub-batch ran out of memory: halve and cap below it"""
+        with self._lock:
+            self.ceiling = max(1, min(self.ceiling, n_items - 1))
+            self._decide(max(1, n_items // 2), f"out of memory at {n_items} ({str(exc).splitlines()[0][:80]})")
+
+    def run(self, items, generate, sample_rate):
+        """
+        Generate `items` in controller-sized sub-batches, one measured sub-batch
+        at a time across threads sharing this controller
+
+        Args:
+            items: Texts (all sharing the same TTS params)
+            generate: Callable(list) -> list of wave tensors, one per item
+            sample_rate: Output sample rate (for audio seconds)
+
+        Returns:
+            list: Outputs in input order
+        """
+        outputs = []
+        i = 0
+        while i < len(items):
+            with self._run_lock:
+                with self._lock:
+                    sub = items[i:i + self.size]
+                _reset_peak(self.device)
+                mem_before = current_memory(self.device)
+                start = time.perf_counter()
+                try:
+                    out = generate(sub)
+                except (RuntimeError, MemoryError) as e:
+                    if not is_oom_error(e) or len(sub) == 1:
+                        raise
+                    self.record_oom(len(sub), e)
+                    _free_memory(self.device)
+                    continue
+                elapsed = time.perf_counter() - start
+                audio_seconds = sum(w.shape[-1] for w in out) / float(sample_rate)
+                self.record(len(sub), audio_seconds, elapsed, mem_before, _peak_memory(self.device))
+            outputs.extend(out)
+            i += len(sub)
+        return outputs
+
+    def summary(self):
+        """One line per measured size: tokens/sec, peak memory, samples"""
+        lines = []
+        for size in sorted(self.stats):
+            s = self.stats[size]
+            lines.append(f"   batch {size:>2}: {s.tokens_per_sec or 0:7.0f} tok/s, peak {s.peak / 1024 ** 3:.2f} GB, "
+                         f"{s.samples} batches")
+        return lines
+
+
+def _free_memory(device):
+    import gc
+    gc.collect()
+    if _is_cuda(device):
+        import torch
+        torch.cuda.empty_cache()
+
+
+def get_batch_controller(device, cfg_enabled, initial_size=None):
+    """Shared controller for this device and CFG setting (created on first use)"""
+    key = (str(device), bool(cfg_enabled))
+    with _controllers_lock:
+        if key not in _controllers:
+            default = 4 if cfg_enabled else 8
+            _controllers[key] = AdaptiveBatchController(
+                device, initial_size or default, label=f" [{device}{', CFG' if cfg_enabled else ''}]")
+        return _controllers[key]
+
+
+def log_batch_controller_summary():
+    """Print what each controller measured and where it settled"""
+    for (device, cfg_enabled), controller in _controllers.items():
+        if not controller.stats:
+            continue
+        print(f"📐 Adaptive micro-batching{controller.label}: settled at {controller.size} "
+              f"({len(controller.decisions)} changes)")
+        for line in controller.summary():
+            print(line)
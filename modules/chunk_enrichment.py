@@ -0,0 +1,210 @@
+"""
+Chunk Enrichment Module
+Splits book text into chunks and enriches them with VADER sentiment and per-chunk
+TTS parameters (chunks_info.json). Kept free of torch/audio imports so preparing
+text does not load the synthesis stack.
+"""
+
+import time
+import logging
+
+from config.config import *
+from modules.text_processor import smart_punctuate, sentence_chunk_text, detect_content_boundaries
+from wrapper.chunk_loader import save_chunks
+
+def smooth_sentiment_scores(scores, index, method="rolling", window=3):
+    """
+    Apply sentiment smoothing to prevent harsh emotional transitions.
+
+    Args:
+        scores: List of compound sentiment scores
+        index: Current chunk index
+        method: "rolling" for moving average, "exp_decay" for exponential decay
+        window: Number of previous chunks to consider
+
+    Returns:
+        float: Smoothed sentiment score
+    """
+    if index == 0:
+        return scores[0]
+
+    start_idx = max(0, index - window + 1)
+    window_scores = scores[start_idx:index + 1]
+
+    if method == "rolling":
+        return sum(window_scores) / len(window_scores)
+    elif method == "exp_decay":
+        weights = SENTIMENT_EXP_DECAY_WEIGHTS[:len(window_scores)]
+        weighted_sum = sum(w * s for w, s in zip(weights, reversed(window_scores)))
+        weight_sum = sum(weights[:len(window_scores)])
+        return weighted_sum / weight_sum if weight_sum > 0 else window_scores[-1]
+    else:
+        return scores[index]  # No smoothing
+
+def generate_enriched_chunks(text_file, output_dir, user_tts_params=None, quality_params=None, config_params=None, voice_name=None):
+    """Reads a text file, performs VADER sentiment analysis, and returns enriched chunks."""
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    analyzer = SentimentIntensityAnalyzer()
+
+    # Extract quality parameters for JSON generation (GUI overrides config)
+    if quality_params:
+        enable_smoothing = quality_params.get('sentiment_smoothing', ENABLE_SENTIMENT_SMOOTHING)
+        smoothing_window = quality_params.get('smoothing_window', SENTIMENT_SMOOTHING_WINDOW)
+        smoothing_method = quality_params.get('smoothing_method', SENTIMENT_SMOOTHING_METHOD)
+        print(f"🔧 JSON Generation: Using GUI smoothing settings - Enabled: {enable_smoothing}, Window: {smoothing_window}, Method: {smoothing_method}")
+    else:
+        enable_smoothing = ENABLE_SENTIMENT_SMOOTHING
+        smoothing_window = SENTIMENT_SMOOTHING_WINDOW
+        smoothing_method = SENTIMENT_SMOOTHING_METHOD
+        print(f"🔧 JSON Generation: Using config smoothing settings - Enabled: {enable_smoothing}")
+
+    # Extract VADER sensitivity parameters (GUI overrides config)
+    if config_params:
+        vader_exag_sensitivity = config_params.get('vader_exag_sensitivity', VADER_EXAGGERATION_SENSITIVITY)
+        vader_cfg_sensitivity = config_params.get('vader_cfg_sensitivity', VADER_CFG_WEIGHT_SENSITIVITY)
+        vader_temp_sensitivity = config_params.get('vader_temp_sensitivity', VADER_TEMPERATURE_SENSITIVITY)
+        print(f"🔧 JSON Generation: Using GUI VADER sensitivity - Exag: {vader_exag_sensitivity}, CFG: {vader_cfg_sensitivity}, Temp: {vader_temp_sensitivity}")
+    else:
+        vader_exag_sensitivity = VADER_EXAGGERATION_SENSITIVITY
+        vader_cfg_sensitivity = VADER_CFG_WEIGHT_SENSITIVITY
+        vader_temp_sensitivity = VADER_TEMPERATURE_SENSITIVITY
+        print(f"🔧 JSON Generation: Using config VADER sensitivity - Exag: {vader_exag_sensitivity}, CFG: {vader_cfg_sensitivity}, Temp: {vader_temp_sensitivity}")
+
+    raw_text = text_file.read_text(encoding='utf-8')
+    cleaned = smart_punctuate(raw_text)
+    # Allow GUI/runtime overrides for chunk sizing via config_params
+    try:
+        max_words_override = None
+        min_words_override = None
+        if config_params:
+            max_words_override = int(config_params.get('max_chunk_words', MAX_CHUNK_WORDS))
+            min_words_override = int(config_params.get('min_chunk_words', MIN_CHUNK_WORDS))
+        chunks = sentence_chunk_text(
+            cleaned,
+            max_words=max_words_override if max_words_override is not None else MAX_CHUNK_WORDS,
+            min_words=min_words_override if min_words_override is not None else MIN_CHUNK_WORDS,
+        )
+    except Exception:
+        # Fallback to config defaults if overrides invalid
+        chunks = sentence_chunk_text(cleaned)
+
+    # Use user-provided parameters as base, or fall back to config defaults
+    if user_tts_params:
+        base_exaggeration = user_tts_params.get('exaggeration', BASE_EXAGGERATION)
+        base_cfg_weight = user_tts_params.get('cfg_weight', BASE_CFG_WEIGHT)
+        base_temperature = user_tts_params.get('temperature', BASE_TEMPERATURE)
+        base_min_p = user_tts_params.get('min_p', DEFAULT_MIN_P)
+        base_top_p = user_tts_params.get('top_p', DEFAULT_TOP_P)
+        base_repetition_penalty = user_tts_params.get('repetition_penalty', DEFAULT_REPETITION_PENALTY)
+        use_vader = user_tts_params.get('use_vader', True)  # Default to True for backward compatibility
+
+    else:
+        base_exaggeration = BASE_EXAGGERATION
+        base_cfg_weight = BASE_CFG_WEIGHT
+        base_temperature = BASE_TEMPERATURE
+        base_min_p = DEFAULT_MIN_P
+        base_top_p = DEFAULT_TOP_P
+        base_repetition_penalty = DEFAULT_REPETITION_PENALTY
+        use_vader = True  # Default behavior
+
+    enriched = []
+    chunk_texts = [chunk_text for chunk_text, _ in chunks]
+
+    # First pass: collect all sentiment scores
+    raw_sentiment_scores = []
+    for chunk_text, _ in chunks:
+        sentiment_scores = analyzer.polarity_scores(chunk_text)
+        raw_sentiment_scores.append(sentiment_scores['compound'])
+
+    # Second pass: apply smoothing and generate parameters
+    for i, (chunk_text, is_para_end) in enumerate(chunks):
+        # Get original sentiment score
+        raw_compound_score = raw_sentiment_scores[i]
+
+        # Apply sentiment smoothing if enabled (uses GUI settings, not config)
+        if use_vader and enable_smoothing:
+            compound_score = smooth_sentiment_scores(
+                raw_sentiment_scores,
+                i,
+                method=smoothing_method,
+                window=smoothing_window
+            )
+            # Debug: Log sentiment changes
+            if abs(compound_score - raw_compound_score) > 0.1:
+                logging.info(f"📊 Chunk {i+1:05}: sentiment smoothed {raw_compound_score:.3f} → {compound_score:.3f}")
+        else:
+            compound_score = raw_compound_score
+
+        if use_vader:
+            # Apply VADER sentiment adjustments using smoothed score
+            exaggeration = base_exaggeration + (compound_score * vader_exag_sensitivity)
+            cfg_weight = base_cfg_weight + (compound_score * vader_cfg_sensitivity)
+            temperature = base_temperature + (compound_score * vader_temp_sensitivity)
+            min_p = base_min_p + (compound_score * VADER_MIN_P_SENSITIVITY)
+            repetition_penalty = base_repetition_penalty + (compound_score * VADER_REPETITION_PENALTY_SENSITIVITY)
+
+            # Clamp values to defined min/max (ensure JSON values respect bounds)
+            exaggeration = round(max(TTS_PARAM_MIN_EXAGGERATION, min(exaggeration, TTS_PARAM_MAX_EXAGGERATION)), 2)
+            cfg_weight = round(max(TTS_PARAM_MIN_CFG_WEIGHT, min(cfg_weight, TTS_PARAM_MAX_CFG_WEIGHT)), 2)
+            temperature = round(max(TTS_PARAM_MIN_TEMPERATURE, min(temperature, TTS_PARAM_MAX_TEMPERATURE)), 2)
+            min_p = round(max(TTS_PARAM_MIN_MIN_P, min(min_p, TTS_PARAM_MAX_MIN_P)), 3)
+            repetition_penalty = round(max(TTS_PARAM_MIN_REPETITION_PENALTY, min(repetition_penalty, TTS_PARAM_MAX_REPETITION_PENALTY)), 1)
+
+            # Debug: Log VADER-adjusted parameters for significant changes
+            if abs(exaggeration - base_exaggeration) > 0.05 or abs(cfg_weight - base_cfg_weight) > 0.05:
+                logging.info(f"🎭 Chunk {i+1:05}: VADER adjusted params - exag: {base_exaggeration:.2f}→{exaggeration:.2f}, cfg: {base_cfg_weight:.2f}→{cfg_weight:.2f}, sentiment: {compound_score:.3f}")
+        else:
+            # Use fixed base values (no VADER adjustment)
+            exaggeration = base_exaggeration
+            cfg_weight = base_cfg_weight
+            temperature = base_temperature
+            min_p = base_min_p
+            repetition_penalty = base_repetition_penalty
+
+        boundary_type = detect_content_boundaries(chunk_text, i, chunk_texts, is_para_end)
+
+        enriched.append({
+            "index": i,
+            "text": chunk_text,
+            "word_count": len(chunk_text.split()),
+            "boundary_type": boundary_type if boundary_type else "none",
+            "sentiment_compound": compound_score,  # Store smoothed score
+            "sentiment_raw": raw_compound_score,   # Store original score for reference
+            "tts_params": {
+                "exaggeration": exaggeration,
+                "cfg_weight": cfg_weight,
+                "temperature": temperature,
+                "min_p": min_p,
+                "top_p": base_top_p,  # Top-P remains constant (not adjusted by VADER)
+                "repetition_penalty": repetition_penalty
+            }
+        })
+
+    output_json_path = output_dir / "chunks_info.json"
+
+    # Add voice metadata if provided
+    if voice_name:
+        # Try metadata method first
+        try:
+            # Create metadata entry as first element
+            metadata = {
+                "_metadata": True,
+                "voice_used": voice_name,
+                "generation_timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "total_chunks": len(enriched)
+            }
+            enriched_with_metadata = [metadata] + enriched
+            save_chunks(output_json_path, enriched_with_metadata)
+            print(f"✅ Saved voice metadata: {voice_name}")
+        except Exception as e:
+            # Fallback to comment method if metadata fails
+            print(f"⚠️ Metadata method failed, using comment fallback: {e}")
+            save_chunks(output_json_path, enriched)
+
+            # Add voice as comment
+            from modules.voice_detector import add_voice_to_json
+            add_voice_to_json(output_json_path, voice_name, method="comment")
+    else:
+        save_chunks(output_json_path, enriched)
+
+    return enriched
@@ -0,0 +1,521 @@
+"""
+Chunk Completion Journal
+========================
+
+Atomic chunk writes plus an append-only record of every finished chunk, so
+resume and completeness checks replay one small file instead of globbing the
+audio directory and opening every WAV.
+
+- Chunks are encoded in memory, written to a hidden temp file, fsync'd and
+  renamed over `chunk_XXXXX.wav`, so a crash never leaves a torn chunk.
+- After the rename, one JSON line is appended to `chunks.journal` in the same
+  directory: chunk number, file name, byte size, BLAKE2 hash, audio stats
+  (duration, samples, sample rate, peak, RMS and, when the book will be
+  loudness-normalized from the manifest, the BS.1770 loudness histogram and
+  true peak), the TTS params used and (when ASR ran) the transcript and its
+  similarity.
+- The journal doubles as the chunk audio manifest (ChunkManifest), so duration
+  totals read no audio; files not in it fall back to their WAV header. Later lines win (regenerated chunks),
+  `{"chunk": n, "removed": true}` records a deletion and `{"chunk": n, "annotate": {...}}` adds fields
+  to the current entry (ASR results from the resident ASR service).
+- A crash between rename and append only loses that journal line; the chunk is
+  regenerated on resume. A torn final journal line is ignored on replay.
+- Directories from before the journal are adopted on the first write (existing
+  chunk files are recorded without hash/duration).
+- With CHUNK_STORAGE = "pack" the chunk audio is appended to `chunks.pack`
+  instead of a loose WAV, and the journal entry carries its offset, so the
+  journal is also the pack index (see modules/chunk_pack.py).
+
+Chunk numbers are the 1-based numbers used in the file names.
+"""
+
+import io
+import os
+import re
+import json
+import time
+import wave
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no render worker processes, threads only
+    fcntl = None
+
+from config.config import CHUNK_JOURNAL_FSYNC, CHUNK_STORAGE, USE_MANIFEST_LOUDNESS
+from modules.loudness import LoudnessAccumulator, measure_chunk
+
+JOURNAL_FILENAME = "chunks.journal"
+PACK_FILENAME = "chunks.pack"
+
+_CHUNK_NAME_RE = re.compile(r"chunk_(\d{3,})\.wav")
+_journal_locks = {}
+_journal_locks_guard = threading.Lock()
+
+
+def _lock_for(journal_path):
+    with _journal_locks_guard:
+        return _journal_locks.setdefault(str(journal_path), threading.Lock())
+
+
+def lock_file_exclusive(f):
+    """Hold an exclusive lock on an open file until it is closed (render worker processes share the journal and pack)"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def chunk_number_from_name(name):
+    """Chunk number from a `chunk_XXXXX.wav` file name, or None"""
+    match = _CHUNK_NAME_RE.fullmatch(name)
+    return int(match.group(1)) if match else None
+
+
+def _json_safe(params):
+    """Keep only JSON-serializable param values (tensors/paths become strings)"""
+    if not params:
+        return {}
+    safe = {}
+    for key, value in params.items():
+        if isinstance(value, (bool, int, float, str)) or value is None:
+            safe[key] = value
+        else:
+            safe[key] = str(value)
+    return safe
+
+
+def _loudness_needed():
+    """True if book assembly will read per-chunk loudness (manifest-based loudness normalization)"""
+    from modules import file_manager as fm  # runtime overrides of the normalization settings land here
+    return fm.ENABLE_NORMALIZATION and fm.NORMALIZATION_TYPE == "loudness" and USE_MANIFEST_LOUDNESS
+
+
+def wav_stats(data):
+    """
+    Duration, sample count, peak and RMS (0-1 full scale) of an in-memory PCM WAV
+
+    Peak/RMS/loudness are omitted for sample formats other than 16-bit PCM. The
+    loudness pass (K-weighting and 4x true peak) only runs when _loudness_needed();
+    ChunkManifest.loudness measures chunks without it from their audio.
+    """
+    with wave.open(io.BytesIO(data), "rb") as wf:
+        sample_rate = wf.getframerate()
+        samples = wf.getnframes()
+        channels = wf.getnchannels()
+        sample_width = wf.getsampwidth()
+        frames = wf.readframes(samples) if sample_width == 2 else b""
+
+    stats = {
+        "duration": round(samples / float(sample_rate), 4) if sample_rate else 0.0,
+        "samples": samples,
+        "sample_rate": sample_rate,
+    }
+    if frames:
+        pcm = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+        if channels > 1:
+            pcm = pcm.reshape(-1, channels)
+        stats["peak"] = round(float(np.abs(pcm).max()), 5) if pcm.size else 0.0
+        stats["rms"] = round(float(np.sqrt(np.mean(np.square(pcm)))), 5) if pcm.size else 0.0
+        if pcm.size and _loudness_needed():
+            stats["loudness"] = measure_chunk(pcm, sample_rate)
+    return stats
+
+
+class ChunkJournal:
+    """Append-only completion journal for one audio chunks directory"""
+
+    def __init__(self, audio_chunks_dir):
+        self.audio_chunks_dir = Path(audio_chunks_dir)
+        self.path = self.audio_chunks_dir / JOURNAL_FILENAME
+        self._lock = _lock_for(self.path)
+
+    def exists(self):
+        return self.path.exists()
+
+    def _legacy_entries(self):
+        """Entries for chunks written before this directory had a journal (no hash/duration)"""
+        lines = []
+        for chunk_number in sorted(scan_chunk_numbers(self.audio_chunks_dir)):
+            file_name = f"chunk_{chunk_number:05}.wav"
+            try:
+                size = (self.audio_chunks_dir / file_name).stat().st_size
+            except OSError:
+                continue
+            lines.append(json.dumps({"chunk": chunk_number, "file": file_name, "bytes": size, "legacy": True},
+                                    separators=(",", ":")) + "\n")
+        return lines
+
+    def _append(self, entry):
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            with open(self.path, "a+b") as f:
+                lock_file_exclusive(f)
+                # First write into a pre-journal directory: adopt the chunks already there.
+                # Checked under the file lock, so concurrent writers adopt them only once.
+                f.seek(0, os.SEEK_END)
+                lines = self._legacy_entries() if f.tell() == 0 else []
+                # Terminate a torn line left by a crash so this entry stays readable
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        lines.insert(0, "\n")
+                f.write("".join(lines + [line]).encode("utf-8"))
+                f.flush()
+                if CHUNK_JOURNAL_FSYNC:
+                    os.fsync(f.fileno())
+
+    def record(self, chunk_number, file_name, size, digest, stats, params=None, asr=None, pack=None):
+        """
+        Record a completed chunk (call after the chunk file is in place)
+
+        `pack` ({"offset", "channels", "sample_width"}) marks a chunk stored in the
+        pack file; `size` is then its PCM byte length.
+        """
+        entry = {
+            "chunk": int(chunk_number),
+            "file": file_name,
+            "bytes": int(size),
+            "blake2b": digest,
+            **stats,
+            "params": _json_safe(params),
+            "time": round(time.time(), 3),
+        }
+        if asr:
+            entry["asr"] = _json_safe(asr)
+        if pack:
+            entry["pack"] = pack
+        self._append(entry)
+        _remember(self.audio_chunks_dir / file_name, entry)
+        return entry
+
+    def remove(self, chunk_number):
+        """Record that a chunk was deleted or quarantined"""
+        self._append({"chunk": int(chunk_number), "removed": True, "time": round(time.time(), 3)})
+
+    def annotate(self, chunk_number, **fields):
+        """Add fields to a recorded chunk's entry (e.g. an ASR result that arrives after the write)"""
+        self._append({"chunk": int(chunk_number), "annotate": _json_safe(fields), "time": round(time.time(), 3)})
+
+    def replay(self):
+        """
+        Replay the journal into the current chunk state
+
+        Returns:
+            dict: chunk number -> latest entry (removed chunks are dropped)
+        """
+        entries = {}
+        if not self.path.exists():
+            return entries
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                    chunk_number = int(entry["chunk"])
+                except (ValueError, KeyError, TypeError):
+                    # Torn append from a crash
+                    logging.warning(f"Skipping unreadable line {line_no} in {self.path}")
+                    continue
+                if entry.get("removed"):
+                    entries.pop(chunk_number, None)
+                elif "annotate" in entry:
+                    if chunk_number in entries:
+                        entries[chunk_number] = {**entries[chunk_number], **entry["annotate"]}
+                else:
+                    entries[chunk_number] = entry
+        return entries
+
+    def reset(self):
+        """Start a fresh journal (used when a book is reprocessed from scratch)"""
+        with self._lock:
+            self.path.unlink(missing_ok=True)
+
+
+def write_chunk_atomic(audio_segment, final_path, params=None, asr=None):
+    """
+    Save a chunk AudioSegment atomically and journal it
+
+    Args:
+        audio_segment: pydub AudioSegment with the final chunk audio
+        final_path: Destination `chunk_XXXXX.wav` path
+        params: TTS params used for the chunk (recorded in the journal)
+        asr: Optional {"text": transcript, "score": similarity} from ASR validation
+
+    Returns:
+        Path: final_path
+    """
+    final_path = Path(final_path)
+    with io.BytesIO() as buffer:
+        audio_segment.export(buffer, format="wav")
+        data = buffer.getvalue()
+
+    chunk_number = chunk_number_from_name(final_path.name)
+    if chunk_number is not None and use_pack(final_path.parent):
+        from modules.chunk_pack import ChunkPack
+        ChunkPack(final_path.parent).append(chunk_number, data, params, asr)
+        return final_path
+
+    tmp_path = final_path.with_name(f".{final_path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, final_path)
+
+    if chunk_number is not None:
+        try:
+            ChunkJournal(final_path.parent).record(
+                chunk_number,
+                final_path.name,
+                len(data),
+                hashlib.blake2b(data, digest_size=16).hexdigest(),
+                wav_stats(data),
+                params,
+                asr,
+            )
+        except OSError as e:
+            # The chunk itself is safe on disk; it will just be regenerated on resume
+            logging.warning(f"Could not journal {final_path.name}: {e}")
+    return final_path
+
+
+def use_pack(audio_chunks_dir):
+    """New chunks for this directory go into the pack (configured, or the book already has one)"""
+    return CHUNK_STORAGE == "pack" or (Path(audio_chunks_dir) / PACK_FILENAME).exists()
+
+
+def packed_entry_valid(audio_chunks_dir, entry):
+    """A packed chunk is intact while the pack still covers its byte range"""
+    try:
+        pack_size = (Path(audio_chunks_dir) / PACK_FILENAME).stat().st_size
+    except OSError:
+        return False
+    return pack_size >= entry["pack"]["offset"] + entry["bytes"]
+
+
+def journal_chunk_file(chunk_path, params=None):
+    """
+    Journal a chunk file that was put in place by a move (revision accepted,
+    quarantined chunk restored) rather than by write_chunk_atomic
+    """
+    chunk_path = Path(chunk_path)
+    chunk_number = chunk_number_from_name(chunk_path.name)
+    if chunk_number is None:
+        return
+    try:
+        data = chunk_path.read_bytes()
+        try:
+            stats = wav_stats(data)
+        except (wave.Error, EOFError):
+            # Not a PCM WAV (e.g. edited in an external tool and saved as float)
+            stats = {"duration": round(wav_header_duration(chunk_path), 4)}
+        ChunkJournal(chunk_path.parent).record(
+            chunk_number, chunk_path.name, len(data),
+            hashlib.blake2b(data, digest_size=16).hexdigest(), stats, params,
+        )
+    except OSError as e:
+        logging.warning(f"Could not journal {chunk_path.name}: {e}")
+
+
+def journal_chunk_removed(chunk_path):
+    """Journal that a chunk file left the audio chunks directory"""
+    chunk_path = Path(chunk_path)
+    chunk_number = chunk_number_from_name(chunk_path.name)
+    if chunk_number is None:
+        return
+    try:
+        ChunkJournal(chunk_path.parent).remove(chunk_number)
+    except OSError as e:
+        logging.warning(f"Could not journal removal of {chunk_path.name}: {e}")
+
+
+def scan_chunk_numbers(audio_chunks_dir):
+    """Chunk numbers present on disk (single directory listing, no file validation)"""
+    numbers = set()
+    with os.scandir(audio_chunks_dir) as it:
+        for dir_entry in it:
+            chunk_number = chunk_number_from_name(dir_entry.name)
+            if chunk_number is not None:
+                numbers.add(chunk_number)
+    return numbers
+
+
+def _scan_chunk_sizes(audio_chunks_dir):
+    """Chunk number -> byte size of the chunk files on disk (single directory listing)"""
+    sizes = {}
+    with os.scandir(audio_chunks_dir) as it:
+        for dir_entry in it:
+            chunk_number = chunk_number_from_name(dir_entry.name)
+            if chunk_number is not None:
+                try:
+                    sizes[chunk_number] = dir_entry.stat().st_size
+                except OSError:
+                    continue
+    return sizes
+
+
+def completed_chunk_numbers(audio_chunks_dir):
+    """
+    Completed chunk numbers for a directory: journal replay when a journal exists,
+    otherwise a directory listing (books started before the journal existed)
+
+    Journaled chunks only count while they are still intact on disk: the file is
+    present with its journaled size (one listing of the directory), or the pack
+    still covers a packed chunk. Chunks deleted, quarantined or truncated outside
+    the journal are regenerated.
+    """
+    journal = ChunkJournal(audio_chunks_dir)
+    if not journal.exists():
+        return scan_chunk_numbers(audio_chunks_dir)
+
+    entries = journal.replay()
+    sizes = _scan_chunk_sizes(audio_chunks_dir)
+    try:
+        pack_size = (Path(audio_chunks_dir) / PACK_FILENAME).stat().st_size
+    except OSError:
+        pack_size = None
+
+    completed = set()
+    for chunk_number, entry in entries.items():
+        if "pack" in entry:
+            intact = pack_size is not None and pack_size >= entry["pack"]["offset"] + entry["bytes"]
+        else:
+            intact = sizes.get(chunk_number) == entry.get("bytes")
+        if intact:
+            completed.add(chunk_number)
+    stale = len(entries) - len(completed)
+    if stale:
+        logging.warning(f"{stale} journaled chunks in {audio_chunks_dir} are missing or changed on disk; "
+                        f"they will be regenerated")
+    return completed
+
+
+# ============================================================================
+# CHUNK AUDIO MANIFEST
+# ============================================================================
+# Journal entries double as the per-chunk audio manifest (duration, samples,
+# peak, RMS), so summaries never decode chunk audio. Entries are trusted while
+# the file still has the journaled byte size (one stat).
+
+# Entries journaled by this process, for duration lookups right after a write
+_RECENT_LIMIT = 4096
+_recent_entries = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+def _remember(path, entry):
+    with _recent_lock:
+        _recent_entries[str(Path(path))] = entry
+        _recent_entries.move_to_end(str(Path(path)))
+        while len(_recent_entries) > _RECENT_LIMIT:
+            _recent_entries.popitem(last=False)
+
+
+def wav_header_duration(wav_path):
+    """Duration from the WAV header only (no sample data is read)"""
+    try:
+        with wave.open(str(wav_path), "rb") as wf:
+            return wf.getnframes() / float(wf.getframerate())
+    except (wave.Error, EOFError):
+        # Float/extensible WAVs: soundfile also reads only the header
+        import soundfile as sf
+        return sf.info(str(wav_path)).duration
+
+
+def _entry_matches(path, entry):
+    if entry is None or "duration" not in entry:
+        return False
+    if "pack" in entry:
+        return packed_entry_valid(Path(path).parent, entry)
+    try:
+        return Path(path).stat().st_size == entry.get("bytes")
+    except OSError:
+        return False
+
+
+class ChunkManifest:
+    """Per-chunk audio stats for one audio chunks directory (journal replayed once)"""
+
+    def __init__(self, audio_chunks_dir):
+        self.audio_chunks_dir = Path(audio_chunks_dir)
+        self.entries = ChunkJournal(audio_chunks_dir).replay()
+
+    def stats(self, chunk_path):
+        """Journaled stats for a chunk file, or None if unknown/changed since journaling"""
+        chunk_path = Path(chunk_path)
+        entry = self.entries.get(chunk_number_from_name(chunk_path.name))
+        return entry if _entry_matches(chunk_path, entry) else None
+
+    def duration(self, chunk_path):
+        entry = self.stats(chunk_path)
+        return entry["duration"] if entry else wav_header_duration(chunk_path)
+
+    def total_duration(self, chunk_paths):
+        return sum(self.duration(p) for p in chunk_paths)
+
+    def loudness(self, chunk_path):
+        """Journaled loudness summary, measured from the file when not journaled"""
+        entry = self.stats(chunk_path)
+        if entry and "loudness" in entry:
+            return entry["loudness"]
+        import soundfile as sf
+        samples, sample_rate = sf.read(str(chunk_path), dtype="float32")
+        return measure_chunk(samples, sample_rate)
+
+
+def chunk_duration(chunk_path):
+    """Duration of one chunk: this process's journal entry if fresh, else the WAV header"""
+    with _recent_lock:
+        entry = _recent_entries.get(str(Path(chunk_path)))
+    if _entry_matches(chunk_path, entry):
+        return entry["duration"]
+    return wav_header_duration(chunk_path)
+
+
+def chunk_written(chunk_path):
+    """True if the chunk file exists or this process just journaled it (packed chunks have no file)"""
+    with _recent_lock:
+        entry = _recent_entries.get(str(Path(chunk_path)))
+    return _entry_matches(chunk_path, entry) or Path(chunk_path).exists()
+
+
+def total_chunk_duration(chunk_paths):
+    """Summed duration of chunk files, grouped by directory so each journal is replayed once"""
+    manifests = {}
+    total = 0.0
+    for chunk_path in chunk_paths:
+        chunk_path = Path(chunk_path)
+        manifest = manifests.get(chunk_path.parent)
+        if manifest is None:
+            manifest = manifests[chunk_path.parent] = ChunkManifest(chunk_path.parent)
+        total += manifest.duration(chunk_path)
+    return total
+
+
+def book_loudness(chunk_paths):
+    """
+    Integrated loudness (LUFS) and true peak (dBTP) of the concatenated chunks,
+    summed from the manifest so the final encode needs no analysis pass
+
+    Returns:
+        dict: {"integrated_lufs", "true_peak_dbtp", "chunks"}, or None if a chunk
+        could not be measured
+    """
+    manifests = {}
+    accumulator = LoudnessAccumulator()
+    for chunk_path in chunk_paths:
+        chunk_path = Path(chunk_path)
+        manifest = manifests.get(chunk_path.parent)
+        if manifest is None:
+            manifest = manifests[chunk_path.parent] = ChunkManifest(chunk_path.parent)
+        try:
+            accumulator.add(manifest.loudness(chunk_path))
+        except Exception as e:
+            logging.warning(f"No loudness measurement for {chunk_path.name}: {e}")
+            return None
+    return accumulator.summary()
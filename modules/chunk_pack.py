@@ -0,0 +1,452 @@
+"""
+Chunk Audio Pack
+================
+
+Optional single-file storage for chunk audio (CHUNK_STORAGE = "pack"), so a
+book is one `chunks.pack` instead of tens of thousands of loose WAV files.
+
+- `audio_chunks/chunks.pack` is append-only raw PCM. Each chunk's samples are
+  appended, fsync'd, and only then journaled. The chunk journal entry
+  (modules/chunk_journal.py) carries the byte offset and sample format, so the
+  journal is the pack index. Later entries win: a regenerated chunk is appended
+  again, and the old bytes become dead space until the next export/pack.
+- Readers memory-map the pack and slice chunks out by offset. Chunks keep their
+  logical `chunk_XXXXX.wav` paths. The helpers below accept those paths and
+  work for loose files, packed chunks, or a mix (e.g. a book started with loose
+  files and continued packed).
+- The path helpers keep one open ChunkPack (index + mapping) per directory and
+  reuse it until the journal's size or mtime changes, so reading every chunk of
+  a book replays the journal once, not once per chunk.
+- `python -m modules.chunk_pack export <book>` writes loose WAV files back out
+  (and drops the pack) for tools that need real files; `pack` does the reverse.
+"""
+
+import io
+import os
+import mmap
+import wave
+import shutil
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from config.config import CHUNK_JOURNAL_FSYNC, AUDIOBOOK_ROOT
+from modules.chunk_journal import (
+    ChunkJournal, JOURNAL_FILENAME, PACK_FILENAME, _lock_for, chunk_number_from_name, journal_chunk_file, lock_file_exclusive,
+    packed_entry_valid, scan_chunk_numbers, use_pack, wav_stats,
+)
+
+# Entry fields that are not audio stats (everything else is copied on export/pack)
+_ENTRY_FIELDS = {"chunk", "file", "bytes", "blake2b", "params", "time", "asr", "pack", "legacy"}
+
+
+class ChunkPack:
+    """Append-only PCM pack for one audio chunks directory, indexed by its chunk journal"""
+
+    def __init__(self, audio_chunks_dir):
+        self.audio_chunks_dir = Path(audio_chunks_dir)
+        self.path = self.audio_chunks_dir / PACK_FILENAME
+        self.journal = ChunkJournal(self.audio_chunks_dir)
+        self._lock = _lock_for(self.path)
+        self._file = None
+        self._map = None
+        self._entries = None
+
+    def exists(self):
+        return self.path.exists()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = self._file = None
+
+    # ------------------------------------------------------------------ writing
+
+    def append(self, chunk_number, wav_data, params=None, asr=None):
+        """
+        Store a chunk from in-memory WAV bytes
+
+        Returns:
+            dict: the journal entry
+        """
+        with wave.open(io.BytesIO(wav_data), "rb") as wf:
+            fmt = {"channels": wf.getnchannels(), "sample_width": wf.getsampwidth()}
+            pcm = wf.readframes(wf.getnframes())
+
+        with self._lock:
+            with open(self.path, "ab") as f:
+                lock_file_exclusive(f)
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                f.write(pcm)
+                f.flush()
+                if CHUNK_JOURNAL_FSYNC:
+                    os.fsync(f.fileno())
+            entry = self.journal.record(
+                chunk_number, f"chunk_{chunk_number:05}.wav", len(pcm),
+                hashlib.blake2b(pcm, digest_size=16).hexdigest(), wav_stats(wav_data),
+                params, asr, pack={"offset": offset, **fmt},
+            )
+        # A loose copy from before the book was packed is now stale
+        (self.audio_chunks_dir / entry["file"]).unlink(missing_ok=True)
+        self._entries = None
+        return entry
+
+    def reset(self):
+        """Drop the pack (fresh reprocessing; the journal is reset separately)"""
+        self.close()
+        with _pack_cache_lock:
+            cached = _pack_cache.pop(self.audio_chunks_dir, None)
+            if cached is not None:
+                cached[1].close()
+        self.path.unlink(missing_ok=True)
+        self._entries = None
+
+    # ------------------------------------------------------------------ reading
+
+    def entries(self):
+        """Chunk number -> journal entry, for chunks whose latest version is packed"""
+        if self._entries is None:
+            self._entries = {n: e for n, e in self.journal.replay().items() if "pack" in e}
+        return self._entries
+
+    def entry(self, chunk_number):
+        return self.entries().get(chunk_number)
+
+    def _view(self, end):
+        # Remap when the pack has grown past the current mapping
+        if self._map is None or len(self._map) < end:
+            self.close()
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def read_pcm(self, entry):
+        """Raw PCM bytes of a packed chunk"""
+        start = entry["pack"]["offset"]
+        end = start + entry["bytes"]
+        return self._view(end)[start:end]
+
+    def read(self, entry):
+        """
+        Samples of a packed chunk
+
+        Returns:
+            tuple: (float32 array, shape (frames,) or (frames, channels), sample_rate)
+        """
+        pcm = self.read_pcm(entry)
+        fmt = entry["pack"]
+        if fmt["sample_width"] != 2:
+            samples, sample_rate = _decode_wav(self.wav_bytes(entry))
+            return samples, sample_rate
+        samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+        if fmt["channels"] > 1:
+            samples = samples.reshape(-1, fmt["channels"])
+        return samples, entry["sample_rate"]
+
+    def wav_bytes(self, entry):
+        """A complete WAV file for a packed chunk"""
+        with io.BytesIO() as buf:
+            with wave.open(buf, "wb") as wf:
+                wf.setnchannels(entry["pack"]["channels"])
+                wf.setsampwidth(entry["pack"]["sample_width"])
+                wf.setframerate(entry["sample_rate"])
+                wf.writeframes(self.read_pcm(entry))
+            return buf.getvalue()
+
+
+def _decode_wav(data):
+    import soundfile as sf
+    samples, sample_rate = sf.read(io.BytesIO(data), dtype="float32")
+    return samples, sample_rate
+
+
+# Directory -> (journal size, journal mtime, ChunkPack) for the path helpers below
+_pack_cache = {}
+_pack_cache_lock = threading.Lock()
+
+
+def _cached_pack(audio_chunks_dir):
+    """
+    Shared ChunkPack for a directory (index replayed once), or None without a pack
+
+    The cached pack is replaced whenever the journal's size or mtime changes (new
+    chunks, removals, annotations). Callers hold `_pack_cache_lock` while reading.
+    """
+    audio_chunks_dir = Path(audio_chunks_dir)
+    if not (audio_chunks_dir / PACK_FILENAME).exists():
+        return None
+    try:
+        st = (audio_chunks_dir / JOURNAL_FILENAME).stat()
+        version = (st.st_size, st.st_mtime_ns)
+    except OSError:
+        version = None
+    cached = _pack_cache.get(audio_chunks_dir)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    if cached is not None:
+        cached[1].close()
+    pack = ChunkPack(audio_chunks_dir)
+    _pack_cache[audio_chunks_dir] = (version, pack)
+    return pack
+
+
+def _packed_entry(pack, chunk_path):
+    """Journal entry if this chunk's current version lives in the (cached) pack"""
+    if pack is None:
+        return None
+    entry = pack.entry(chunk_number_from_name(Path(chunk_path).name))
+    if entry and packed_entry_valid(pack.audio_chunks_dir, entry):
+        return entry
+    return None
+
+
+# ============================================================================
+# PATH-BASED HELPERS (loose files and packed chunks alike)
+# ============================================================================
+
+def list_chunk_paths(audio_chunks_dir):
+    """
+    Sorted `chunk_XXXXX.wav` paths of all chunks in a directory, packed or loose
+
+    Packed chunks have no file on disk; pass the paths to the helpers below.
+    """
+    audio_chunks_dir = Path(audio_chunks_dir)
+    numbers = scan_chunk_numbers(audio_chunks_dir)
+    with _pack_cache_lock:
+        pack = _cached_pack(audio_chunks_dir)
+        if pack is not None:
+            numbers |= {n for n, e in pack.entries().items() if packed_entry_valid(audio_chunks_dir, e)}
+    return [audio_chunks_dir / f"chunk_{n:05}.wav" for n in sorted(numbers)]
+
+
+def chunk_available(chunk_path):
+    """True if the chunk exists as a file or in its directory's pack"""
+    if Path(chunk_path).exists():
+        return True
+    with _pack_cache_lock:
+        return _packed_entry(_cached_pack(Path(chunk_path).parent), chunk_path) is not None
+
+
+def read_chunk_audio(chunk_path):
+    """
+    Decode one chunk without extracting it
+
+    Returns:
+        tuple: (float32 samples, sample_rate)
+    """
+    chunk_path = Path(chunk_path)
+    if not chunk_path.exists():
+        with _pack_cache_lock:
+            pack = _cached_pack(chunk_path.parent)
+            entry = _packed_entry(pack, chunk_path)
+            if entry is None:
+                raise FileNotFoundError(f"Chunk not found: {chunk_path}")
+            return pack.read(entry)
+    import soundfile as sf
+    return sf.read(str(chunk_path), dtype="float32")
+
+
+def chunk_wav_bytes(chunk_path):
+    """Complete WAV bytes of a chunk (e.g. to pipe into a player)"""
+    chunk_path = Path(chunk_path)
+    if chunk_path.exists():
+        return chunk_path.read_bytes()
+    with _pack_cache_lock:
+        pack = _cached_pack(chunk_path.parent)
+        entry = _packed_entry(pack, chunk_path)
+        if entry is None:
+            raise FileNotFoundError(f"Chunk not found: {chunk_path}")
+        return pack.wav_bytes(entry)
+
+
+def extract_chunk(chunk_path, dest_path):
+    """
+    Move a chunk out of the audio chunks directory (archive, quarantine)
+
+    Loose files are moved; packed chunks are written out as a WAV (the pack is
+    append-only, so the caller journals the removal or replacement).
+    """
+    chunk_path = Path(chunk_path)
+    if chunk_path.exists():
+        shutil.move(str(chunk_path), str(dest_path))
+    else:
+        Path(dest_path).write_bytes(chunk_wav_bytes(chunk_path))
+    return Path(dest_path)
+
+
+def place_chunk_file(src_path, chunk_path, params=None):
+    """Install a finished WAV (accepted revision, restored quarantine file) as a chunk"""
+    src_path, chunk_path = Path(src_path), Path(chunk_path)
+    if use_pack(chunk_path.parent):
+        ChunkPack(chunk_path.parent).append(chunk_number_from_name(chunk_path.name), src_path.read_bytes(), params)
+        src_path.unlink()
+    else:
+        shutil.move(str(src_path), str(chunk_path))
+        journal_chunk_file(chunk_path, params)
+    return chunk_path
+
+
+def combine_chunks_to_wav(chunk_paths, output_path):
+    """
+    Concatenate chunks into one WAV, reading packed chunks straight from the pack map
+
+    All chunks must share one sample format (true for anything the renderer wrote).
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    packs = {}
+    entries = {}
+    missing = []
+    for p in chunk_paths:
+        p = Path(p)
+        if p.exists():
+            continue
+        if p.parent not in packs:
+            packs[p.parent] = ChunkPack(p.parent)
+        entry = packs[p.parent].entry(chunk_number_from_name(p.name))
+        if entry is None or not packed_entry_valid(p.parent, entry):
+            missing.append(str(p))
+        else:
+            entries[p] = entry
+    if missing:
+        raise FileNotFoundError(f"Missing chunks: {missing[:5]}" + (f" ... and {len(missing) - 5} more" if len(missing) > 5 else ""))
+
+    logging.info(f"Combining {len(chunk_paths)} chunks ({len(entries)} from pack) into {output_path}")
+    out = None
+    fmt = None
+    try:
+        out = wave.open(str(output_path), "wb")
+        for p in chunk_paths:
+            p = Path(p)
+            entry = entries.get(p)
+            if entry is not None:
+                chunk_fmt = (entry["pack"]["channels"], entry["pack"]["sample_width"], entry["sample_rate"])
+                pcm = packs[p.parent].read_pcm(entry)
+            else:
+                with wave.open(str(p), "rb") as wf:
+                    chunk_fmt = (wf.getnchannels(), wf.getsampwidth(), wf.getframerate())
+                    pcm = wf.readframes(wf.getnframes())
+            if fmt is None:
+                fmt = chunk_fmt
+                out.setnchannels(fmt[0])
+                out.setsampwidth(fmt[1])
+                out.setframerate(fmt[2])
+            elif chunk_fmt != fmt:
+                raise ValueError(f"{p.name} has format {chunk_fmt}, expected {fmt}")
+            out.writeframes(pcm)
+    finally:
+        if out is not None:
+            out.close()
+        for pack in packs.values():
+            pack.close()
+    return output_path
+
+
+# ============================================================================
+# PACK / EXPORT
+# ============================================================================
+
+def _stats_of(entry):
+    return {k: v for k, v in entry.items() if k not in _ENTRY_FIELDS}
+
+
+def export_pack(audio_chunks_dir, remove_pack=True):
+    """
+    Write every packed chunk out as a loose `chunk_XXXXX.wav` (journaled as a file)
+
+    Returns:
+        int: chunks exported
+    """
+    audio_chunks_dir = Path(audio_chunks_dir)
+    pack = ChunkPack(audio_chunks_dir)
+    if not pack.exists():
+        return 0
+    exported = 0
+    with pack:
+        for chunk_number, entry in sorted(pack.entries().items()):
+            if not packed_entry_valid(audio_chunks_dir, entry):
+                logging.warning(f"Skipping chunk {chunk_number}: pack is truncated")
+                continue
+            data = pack.wav_bytes(entry)
+            final_path = audio_chunks_dir / entry["file"]
+            tmp_path = final_path.with_name(f".{final_path.name}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, final_path)
+            pack.journal.record(
+                chunk_number, entry["file"], len(data), hashlib.blake2b(data, digest_size=16).hexdigest(),
+                _stats_of(entry), entry.get("params"), entry.get("asr"),
+            )
+            exported += 1
+    if remove_pack:
+        pack.reset()
+    return exported
+
+
+def pack_loose_chunks(audio_chunks_dir):
+    """
+    Move every loose chunk file of a directory into its pack
+
+    Returns:
+        int: chunks packed
+    """
+    audio_chunks_dir = Path(audio_chunks_dir)
+    pack = ChunkPack(audio_chunks_dir)
+    journaled = pack.journal.replay()
+    packed = 0
+    for chunk_number in sorted(scan_chunk_numbers(audio_chunks_dir)):
+        chunk_path = audio_chunks_dir / f"chunk_{chunk_number:05}.wav"
+        entry = journaled.get(chunk_number, {})
+        pack.append(chunk_number, chunk_path.read_bytes(), entry.get("params"), entry.get("asr"))
+        packed += 1
+    return packed
+
+
+def _resolve_audio_chunks_dir(path):
+    path = Path(path)
+    for candidate in (path, path / "TTS" / "audio_chunks", AUDIOBOOK_ROOT / path / "TTS" / "audio_chunks"):
+        if (candidate / PACK_FILENAME).exists() or (candidate / "chunks.journal").exists() or candidate.name == "audio_chunks":
+            if candidate.is_dir():
+                return candidate
+    raise SystemExit(f"❌ No audio chunks directory found for {path}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pack or export chunk audio for a book")
+    parser.add_argument("command", choices=["export", "pack", "info"])
+    parser.add_argument("book", help="Book name, book folder or audio_chunks folder")
+    parser.add_argument("--keep-pack", action="store_true", help="export: keep chunks.pack after writing loose files")
+    args = parser.parse_args()
+
+    audio_chunks_dir = _resolve_audio_chunks_dir(args.book)
+    if args.command == "export":
+        count = export_pack(audio_chunks_dir, remove_pack=not args.keep_pack)
+        print(f"✅ Exported {count} chunks to {audio_chunks_dir}")
+    elif args.command == "pack":
+        count = pack_loose_chunks(audio_chunks_dir)
+        print(f"✅ Packed {count} chunks into {audio_chunks_dir / PACK_FILENAME}")
+    else:
+        pack = ChunkPack(audio_chunks_dir)
+        entries = pack.entries() if pack.exists() else {}
+        live = sum(e["bytes"] for e in entries.values())
+        size = pack.path.stat().st_size if pack.exists() else 0
+        loose = len(scan_chunk_numbers(audio_chunks_dir))
+        print(f"📦 {audio_chunks_dir}")
+        print(f"   Packed chunks: {len(entries)}  Loose chunks: {loose}")
+        print(f"   Pack size: {size / 1e6:.1f} MB ({(size - live) / 1e6:.1f} MB superseded)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""
+CPU Thread Topology Autotuner
+=============================
+
+Several render processes, each using torch's default thread count,
+oversubscribe the cores. This module benchmarks worker layouts on the current
+machine. A layout is a number of render worker processes, the intra-op threads
+per process, and the micro-batch size. The best layout is saved per host and
+applied to CPU runs.
+
+- `cpu_topology` reads the physical cores (hyperthread siblings grouped) and
+  their NUMA nodes from sysfs, limited to the CPUs this process may run on.
+- `plan_cpu_sets` gives each worker its own physical cores. It fills one NUMA
+  node before moving to the next, and uses hyperthread siblings only when the
+  layout needs more threads than there are cores.
+- `autotune` loads the model once and runs render pools (modules/render_pool.py)
+  over a short fixed text set. It tries every processes x threads layout at
+  batch 1, then the AUTOTUNE_BATCH_SIZES for the fastest layout. The results go
+  to CPU_TUNING_FILE, keyed by host.
+
+    python -m modules.cpu_tuning --voice Voice_Samples/narrator.wav
+    python -m modules.cpu_tuning --show
+
+Explicit RENDER_WORKER_PROCESSES / RENDER_WORKER_THREADS settings take
+precedence over the saved profile.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import platform
+from pathlib import Path
+
+# Add project root to path for imports
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.config import (
+    USE_CPU_TUNING, CPU_TUNING_FILE, CPU_PIN_WORKERS, AUTOTUNE_BATCH_SIZES,
+    RENDER_WORKER_PROCESSES, RENDER_WORKER_THREADS,
+)
+
+# Fixed benchmark text set (mixed lengths, like real chunks)
+BENCH_TEXTS = [
+    "The rain had stopped by the time she reached the station.",
+    "He folded the letter twice, slipped it into his coat, and said nothing.",
+    "Outside, the market was already loud with traders calling their prices across the square.",
+    "\"You're late,\" she said.",
+    "It took three days to cross the valley, and on the last night the wind never once let up.",
+    "Nobody in the village remembered who had planted the orchard, only that it had always been there.",
+    "The engine coughed, caught, and settled into a steady rhythm.",
+    "By morning the river had risen almost to the doorstep, brown and fast and full of branches.",
+]
+TEXTS_PER_PROCESS = 4
+
+_profile_cache = {}
+
+
+# ---------------------------------------------------------------- topology
+
+def _parse_cpulist(text):
+    """'0-3,8-11' -> [0, 1, 2, 3, 8, 9, 10, 11]"""
+    cpus = []
+    for part in text.strip().split(","):
+        if "-" in part:
+            lo, hi = part.split("-")
+            cpus.extend(range(int(lo), int(hi) + 1))
+        elif part:
+            cpus.append(int(part))
+    return cpus
+
+
+def available_cpus():
+    """Logical CPUs this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def cpu_topology():
+    """
+    Physical cores of the available CPUs, ordered by NUMA node
+
+    Returns:
+        dict: {"cores": [[logical cpus of one core], ...], "core_nodes": [node per core],
+               "logical_cpus": int, "numa_nodes": int}
+    """
+    cpus = available_cpus()
+    node_of = {}
+    for node_dir in Path("/sys/devices/system/node").glob("node[0-9]*"):
+        try:
+            for cpu in _parse_cpulist((node_dir / "cpulist").read_text()):
+                node_of[cpu] = int(node_dir.name[4:])
+        except (OSError, ValueError):
+            continue
+
+    cores = {}
+    for cpu in cpus:
+        topo = Path(f"/sys/devices/system/cpu/cpu{cpu}/topology")
+        try:
+            key = (int((topo / "physical_package_id").read_text()), int((topo / "core_id").read_text()))
+        except (OSError, ValueError):
+            key = (0, cpu)  # no sysfs topology: treat every CPU as its own core
+        cores.setdefault(key, []).append(cpu)
+
+    ordered = sorted((sorted(group) for group in cores.values()), key=lambda g: (node_of.get(g[0], 0), g[0]))
+    return {
+        "cores": ordered,
+        "core_nodes": [node_of.get(group[0], 0) for group in ordered],
+        "logical_cpus": len(cpus),
+        "numa_nodes": len(set(node_of.get(c, 0) for c in cpus)),
+    }
+
+
+def plan_cpu_sets(processes, threads, topology=None):
+    """
+    Disjoint CPU sets for `processes` workers with `threads` threads each
+
+    Cores are handed out in NUMA order, so a worker stays on one node when it
+    fits. Hyperthread siblings are used only after every core has one thread.
+    """
+    topology = topology or cpu_topology()
+    cores = topology["cores"]
+    slots = [group[0] for group in cores]
+    depth = max(len(group) for group in cores)
+    for level in range(1, depth):
+        slots += [group[level] for group in cores if len(group) > level]
+    return [[slots[(rank * threads + i) % len(slots)] for i in range(threads)] for rank in range(processes)]
+
+
+def pin_current_process(cpus):
+    """Restrict this process to `cpus` (no-op where affinity is unsupported)"""
+    if cpus and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError as e:
+            logging.warning(f"Could not pin process to CPUs {cpus}: {e}")
+
+
+# ---------------------------------------------------------------- profiles
+
+def host_key():
+    """Identifies this machine's CPU layout in CPU_TUNING_FILE"""
+    model = platform.processor()
+    try:
+        for line in Path("/proc/cpuinfo").read_text().splitlines():
+            if line.startswith("model name"):
+                model = line.split(":", 1)[1].strip()
+                break
+    except OSError:
+        pass
+    return f"{socket.gethostname()}|{model}|{len(available_cpus())} cpus"
+
+
+def _read_profiles():
+    try:
+        return json.loads(Path(CPU_TUNING_FILE).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def load_profile():
+    """Saved tuning profile for this host, or None"""
+    key = host_key()
+    if key not in _profile_cache:
+        _profile_cache[key] = _read_profiles().get(key)
+    return _profile_cache[key]
+
+
+def save_profile(profile):
+    """Store `profile` for this host (other hosts' entries are kept)"""
+    path = Path(CPU_TUNING_FILE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    profiles = _read_profiles()
+    profiles[host_key()] = profile
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(profiles, indent=2))
+    os.replace(tmp, path)
+    _profile_cache[host_key()] = profile
+
+
+def worker_layout():
+    """
+    CPU render layout: explicit config first, then this host's saved profile
+
+    Returns:
+        tuple: (processes, threads per process, micro-batch size or None).
+        processes == 0 means render in-process.
+    """
+    profile = (load_profile() if USE_CPU_TUNING else None) or {}
+    processes = RENDER_WORKER_PROCESSES
+    if processes <= 0 and profile.get("processes", 1) > 1:
+        processes = profile["processes"]
+    threads = RENDER_WORKER_THREADS or profile.get("threads") or 0
+    if not threads:
+        threads = max(1, len(cpu_topology()["cores"]) // max(1, processes))
+    return processes, threads, profile.get("batch_size")
+
+
+def apply_cpu_tuning():
+    """Set torch's thread counts for in-process CPU rendering from the saved profile"""
+    processes, threads, batch_size = worker_layout()
+    if processes > 0:
+        return  # the render workers set their own threads
+    import torch
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # only settable before the first parallel op
+    print(f"🧮 CPU layout: {threads} threads" + (f", micro-batch {batch_size}" if batch_size else ""))
+
+
+# ---------------------------------------------------------------- benchmark
+
+def _bench_task(cpus, threads, batch_size, texts):
+    """Render worker task: generate `texts` with the given threads/pinning; returns audio seconds"""
+    import torch
+    from modules.render_pool import worker_state
+
+    model = worker_state()["model"]
+    torch.set_num_threads(threads)
+    pin_current_process(cpus)
+    audio_seconds = 0.0
+    with torch.inference_mode():
+        for i in range(0, len(texts), batch_size):
+            group = texts[i:i + batch_size]
+            if batch_size > 1 and hasattr(model, "generate_batch"):
+                wavs = model.generate_batch(group, disable_watermark=True)
+            else:
+                wavs = [model.generate(text, disable_watermark=True) for text in group]
+            audio_seconds += sum(w.shape[-1] for w in wavs) / model.sr
+    return audio_seconds
+
+
+def candidate_layouts(topology, max_processes=None):
+    """(processes, threads) pairs: process counts up to the core count, all cores or half of them per layout"""
+    n_cores = len(topology["cores"])
+    limit = min(n_cores, max_processes or n_cores)
+    layouts = []
+    for processes in (1, 2, 3, 4, 6, 8, 12, 16, 24, 32):
+        if processes > limit:
+            break
+        full = n_cores // processes
+        for threads in sorted({full, max(1, full // 2)}):
+            layouts.append((processes, threads))
+    return layouts
+
+
+def autotune(voice_path, max_processes=None, batch_sizes=AUTOTUNE_BATCH_SIZES):
+    """
+    Benchmark CPU render layouts on this host and save the fastest
+
+    Args:
+        voice_path: Voice sample used for the benchmark conditionals
+        max_processes: Upper bound on worker processes (default: physical cores)
+        batch_sizes: Micro-batch sizes tried for the fastest processes x threads layout
+
+    Returns:
+        dict: The saved profile
+    """
+    from modules.tts_engine import load_optimized_model, prewarm_model_with_voice
+    from modules.file_manager import ensure_voice_sample_compatibility
+    from modules.render_pool import start_render_pool
+
+    topology = cpu_topology()
+    print(f"🧮 CPU topology: {len(topology['cores'])} cores / {topology['logical_cpus']} logical CPUs, "
+          f"{topology['numa_nodes']} NUMA node(s)")
+
+    compatible_voice = ensure_voice_sample_compatibility(voice_path)
+    model = prewarm_model_with_voice(load_optimized_model("cpu"), compatible_voice)
+    job = {
+        "device": "cpu", "compatible_voice": str(compatible_voice), "tts_params": {},
+        "quality_params": None, "config_params": None, "asr_enabled": False, "asr_config": {},
+        "threads": 1, "cpu_sets": None,
+    }
+    results = []
+
+    def run(pool, processes, threads, batch_size):
+        cpu_sets = plan_cpu_sets(processes, threads, topology) if CPU_PIN_WORKERS else [None] * processes
+        per_process = max(batch_size, TEXTS_PER_PROCESS)
+        start = time.perf_counter()
+        futures = [pool.submit(_bench_task, cpu_sets[rank], threads, batch_size,
+                               [BENCH_TEXTS[(rank * per_process + i) % len(BENCH_TEXTS)] for i in range(per_process)])
+                   for rank in range(processes)]
+        audio_seconds = sum(f.result() for f in futures)
+        elapsed = time.perf_counter() - start
+        result = {"processes": processes, "threads": threads, "batch_size": batch_size,
+                  "realtime_factor": round(audio_seconds / elapsed, 3)}
+        results.append(result)
+        print(f"   {processes} proc × {threads} threads × batch {batch_size}: {result['realtime_factor']:.2f}x realtime")
+
+    # Stage 1: processes x threads at batch 1, one pool per process count
+    layouts = candidate_layouts(topology, max_processes)
+    for processes in sorted({p for p, _ in layouts}):
+        pool = start_render_pool(model, job, processes)
+        try:
+            for p, threads in layouts:
+                if p == processes:
+                    run(pool, processes, threads, 1)
+        finally:
+            pool.shutdown(wait=True)
+
+    # Stage 2: batch sizes for the fastest layout
+    best = max(results, key=lambda r: r["realtime_factor"])
+    pool = start_render_pool(model, job, best["processes"])
+    try:
+        for batch_size in batch_sizes:
+            if batch_size != 1:
+                run(pool, best["processes"], best["threads"], batch_size)
+    finally:
+        pool.shutdown(wait=True)
+
+    best = max(results, key=lambda r: r["realtime_factor"])
+    profile = dict(best, tuned_at=time.strftime("%Y-%m-%d %H:%M:%S"),
+                   cores=len(topology["cores"]), numa_nodes=topology["numa_nodes"], results=results)
+    save_profile(profile)
+    print(f"✅ Best CPU layout: {best['processes']} proc × {best['threads']} threads × batch {best['batch_size']} "
+          f"({best['realtime_factor']:.2f}x realtime), saved to {CPU_TUNING_FILE}")
+    return profile
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark and save the CPU render layout for this host")
+    parser.add_argument("--voice", help="Voice sample for the benchmark")
+    parser.add_argument("--max-processes", type=int, default=None, help="Upper bound on worker processes")
+    parser.add_argument("--batch-sizes", default=",".join(str(b) for b in AUTOTUNE_BATCH_SIZES),
+                        help="Comma-separated micro-batch sizes to try")
+    parser.add_argument("--show", action="store_true", help="Print this host's saved profile and exit")
+    args = parser.parse_args()
+
+    if args.show or not args.voice:
+        topology = cpu_topology()
+        print(f"Host: {host_key()}")
+        print(f"Cores: {len(topology['cores'])}, NUMA nodes: {topology['numa_nodes']}")
+        print(json.dumps(load_profile(), indent=2) if load_profile() else "No saved profile (run with --voice)")
+        return
+    autotune(args.voice, args.max_processes, tuple(int(b) for b in args.batch_sizes.split(",")))
+
+
+if __name__ == "__main__":
+    main()
@@ -179,8 +179,55 @@ def convert_to_m4b_with_peak_normalization(wav_path, temp_m4b_path, target_db=-3
     process.wait()
     print("\n✅ Conversion with normalization complete.")
 
-def convert_to_m4b_with_loudness_normalization(wav_path, temp_m4b_path, custom_speed=None, custom_sample_rate=None):
-    """Convert WAV to M4B with two-pass loudness normalization"""
+def convert_to_m4b_with_manifest_gain(wav_path, temp_m4b_path, measurement, custom_speed=None, custom_sample_rate=None):
+    """
+    Convert WAV to M4B applying one known linear gain, computed from the loudness
+    accumulated per chunk at render time (no analysis pass over the WAV)
+    """
+    from modules.loudness import normalization_gain_db
+
+    gain_db = normalization_gain_db(measurement, TARGET_LUFS, TARGET_PEAK_DB)
+    print(f"📊 Book loudness from chunk manifest: {measurement['integrated_lufs']} LUFS, "
+          f"true peak {measurement['true_peak_dbtp']} dBTP → gain {gain_db:+.2f} dB")
+
+    speed_to_use = custom_speed if custom_speed is not None else ATEMPO_SPEED
+    audio_filters = [f"volume={gain_db:.2f}dB"]
+    if speed_to_use != 1.0:
+        audio_filters.append(f"atempo={speed_to_use}")
+
+    cmd = [
+        "ffmpeg", "-y",
+        "-i", str(wav_path),
+        "-af", ",".join(audio_filters),
+        "-ar", str(M4B_SAMPLE_RATE),
+        "-c:a", "aac",
+        str(temp_m4b_path)
+    ]
+
+    start_time = time.time()
+    process = subprocess.Popen(cmd, stderr=subprocess.PIPE, text=True)
+
+    audio_secs = 0.0
+    for line in process.stderr:
+        match = re.search(r"time=(\d{2}):(\d{2}):(\d{2})\.(\d{2})", line)
+        if match:
+            h, m, s, ms = map(int, match.groups())
+            audio_secs = h * 3600 + m * 60 + s + ms / 100
+            elapsed = time.time() - start_time
+            factor = audio_secs / elapsed if elapsed > 0 else 0.0
+            print(f"📼 FFmpeg (normalizing): {match.group(0)} | {factor:.2f}x realtime", end='\r')
+
+    process.wait()
+    print("\n✅ Single-pass loudness normalization complete.")
+
+def convert_to_m4b_with_loudness_normalization(wav_path, temp_m4b_path, custom_speed=None, custom_sample_rate=None, chunk_paths=None):
+    """
+    Convert WAV to M4B with loudness normalization
+
+    With `chunk_paths` (the chunks the WAV was combined from) and USE_MANIFEST_LOUDNESS,
+    the book loudness comes from the chunk manifest and the encode is single-pass;
+    otherwise ffmpeg analyzes the WAV first (two passes).
+    """
     if not is_ffmpeg_available():
         error_msg = ffmpeg_error_message()
         print(f"❌ Cannot convert to M4B: {error_msg}")
@@ -190,6 +237,13 @@ def convert_to_m4b_with_loudness_normalization(wav_path, temp_m4b_path, custom_s
 
     print("🚀 Converting to m4b with loudness normalization...")
 
+    if chunk_paths and USE_MANIFEST_LOUDNESS:
+        from modules.chunk_journal import book_loudness
+        measurement = book_loudness(chunk_paths)
+        if measurement and measurement["integrated_lufs"] is not None:
+            return convert_to_m4b_with_manifest_gain(wav_path, temp_m4b_path, measurement, custom_speed, custom_sample_rate)
+        print("⚠️ Chunk loudness unavailable, analyzing combined audio...")
+
     # Step 1: Analyze audio loudness
     print("📊 Analyzing audio loudness...")
     analyze_cmd = [
@@ -291,8 +345,13 @@ def convert_to_m4b_with_simple_normalization(wav_path, temp_m4b_path, target_db=
     process.wait()
     print("\n✅ Simple normalization complete.")
 
-def convert_to_m4b(wav_path, temp_m4b_path, custom_speed=None, custom_sample_rate=None):
-    """Convert WAV to M4B with configurable normalization and optional custom speed/sample rate"""
+def convert_to_m4b(wav_path, temp_m4b_path, custom_speed=None, custom_sample_rate=None, chunk_paths=None):
+    """
+    Convert WAV to M4B with configurable normalization and optional custom speed/sample rate
+
+    Pass `chunk_paths` when the WAV was combined from audio chunks, so loudness
+    normalization can use the per-chunk loudness manifest instead of an analysis pass.
+    """
     if not is_ffmpeg_available():
         error_msg = ffmpeg_error_message()
         print(f"❌ Cannot convert to M4B: {error_msg}")
@@ -323,7 +382,7 @@ def convert_to_m4b(wav_path, temp_m4b_path, custom_speed=None, custom_sample_rat
 
     elif NORMALIZATION_TYPE == "loudness":
         # EBU R128 loudness normalization (recommended for audiobooks)
-        return convert_to_m4b_with_loudness_normalization(wav_path, temp_m4b_path, custom_speed, custom_sample_rate)
+        return convert_to_m4b_with_loudness_normalization(wav_path, temp_m4b_path, custom_speed, custom_sample_rate, chunk_paths)
 
     elif NORMALIZATION_TYPE == "peak":
         # Peak normalization
@@ -479,7 +538,11 @@ def find_book_files(book_dir):
 # ============================================================================
 
 def combine_audio_chunks(chunk_paths, output_path):
-    """Combine audio chunks into single file using FFmpeg"""
+    """Combine audio chunks into single file using FFmpeg (packed books are read from the pack)"""
+    if chunk_paths and (chunk_paths[0].parent / "chunks.pack").exists():
+        from modules.chunk_pack import combine_chunks_to_wav
+        return combine_chunks_to_wav(chunk_paths, output_path)
+
     logging.info(f"Combining {len(chunk_paths)} audio chunks into {output_path}")
     
     # Validate input files exist
@@ -534,7 +597,10 @@ def combine_audio_chunks(chunk_paths, output_path):
     return output_path
 
 def get_audio_files_in_directory(directory, pattern="chunk_*.wav"):
-    """Get sorted list of audio files matching pattern"""
+    """Get sorted list of audio files matching pattern (packed chunks included, see chunk_pack)"""
+    if pattern == "chunk_*.wav" and (directory / "chunks.pack").exists():
+        from modules.chunk_pack import list_chunk_paths
+        return list_chunk_paths(directory)
     chunk_paths = sorted([f for f in directory.glob(pattern)
                          if re.fullmatch(r'chunk_\d{3,}\.wav', f.name)],
                         key=chunk_sort_key)
@@ -554,10 +620,38 @@ def verify_audio_file(wav_path):
         return False
 
 def verify_chunk_completeness(audio_chunks_dir, expected_count):
-    """Verify all expected chunks exist and are valid"""
+    """
+    Verify all expected chunks exist and are valid
+
+    With a chunk journal, a chunk is valid when its file is still the size that was
+    journaled (one stat per chunk); books without a journal open every file.
+    """
+    from modules.chunk_journal import ChunkJournal, packed_entry_valid
+
     missing_chunks = []
     invalid_chunks = []
 
+    journal = ChunkJournal(audio_chunks_dir)
+    if journal.exists():
+        entries = journal.replay()
+        for i in range(1, expected_count + 1):
+            entry = entries.get(i)
+            if entry is None:
+                missing_chunks.append(i)
+                continue
+            if "pack" in entry:
+                if not packed_entry_valid(audio_chunks_dir, entry):
+                    invalid_chunks.append(i)
+                continue
+            try:
+                size = (audio_chunks_dir / entry["file"]).stat().st_size
+            except OSError:
+                missing_chunks.append(i)
+                continue
+            if size != entry.get("bytes", size):
+                invalid_chunks.append(i)
+        return missing_chunks, invalid_chunks
+
     for i in range(1, expected_count + 1):
         chunk_path = audio_chunks_dir / f"chunk_{i:05}.wav"
 
@@ -20,6 +20,8 @@ sys.path.append(str(project_root))
 from config.config import *
 from modules.tts_engine import load_optimized_model, process_one_chunk, prewarm_model_with_voice
 from modules.file_manager import setup_book_directories, list_voice_samples, ensure_voice_sample_compatibility
+from modules.chunk_journal import ChunkJournal
+from modules.chunk_pack import ChunkPack
 from wrapper.chunk_loader import load_chunks
 from src.chatterbox.tts import punc_norm
 from modules.progress_tracker import log_chunk_progress, log_run
@@ -128,6 +130,8 @@ def generate_audiobook_from_json(json_path, voice_name, temp_setting=None):
         print("🧹 Clearing old audio chunks...")
         for wav_file in audio_chunks_dir.glob("*.wav"):
             wav_file.unlink()
+        ChunkJournal(audio_chunks_dir).reset()
+        ChunkPack(audio_chunks_dir).reset()
 
         # Process chunks
         start_time = time.time()
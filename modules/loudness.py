@@ -0,0 +1,156 @@
+"""
+Incremental EBU R128 / ITU-R BS.1770 loudness measurement
+
+Each chunk is measured once, when it is written. The result is stored in the
+chunk manifest (modules/chunk_journal.py): a histogram of its 400 ms gating
+block loudness, plus its true peak. Histograms add up in any order, so the
+book's integrated loudness and true peak come from the manifest. The final
+encode then applies one known linear gain instead of running a separate ffmpeg
+loudnorm analysis pass over the combined WAV.
+
+Gating blocks do not span chunk boundaries, and gating uses 0.25 LU bins.
+Both differences from a whole-file measurement are far below audible level.
+"""
+
+import math
+
+import numpy as np
+
+BLOCK_SEC = 0.4                 # Gating block length
+STEP_SEC = 0.1                  # 75% block overlap
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+BIN_LU = 0.25                   # Histogram resolution
+TRUE_PEAK_OVERSAMPLE = 4
+
+
+def _k_weighting_coeffs(fs):
+    """BS.1770 K-weighting (high shelf + RLB high-pass) biquads for any sample rate"""
+    # Stage 1: high shelf
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * f0 / fs)
+    vh = 10 ** (gain_db / 20.0)
+    vb = vh ** 0.4996667741545416
+    a0 = 1.0 + k / q + k * k
+    b_shelf = [(vh + vb * k / q + k * k) / a0, 2.0 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0]
+    a_shelf = [1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+
+    # Stage 2: high-pass
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / fs)
+    a0 = 1.0 + k / q + k * k
+    b_hp = [1.0, -2.0, 1.0]
+    a_hp = [1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+    return (b_shelf, a_shelf), (b_hp, a_hp)
+
+
+def _block_energies(samples, fs):
+    """Mean-square energy of each 400 ms gating block (channel energies summed)"""
+    from scipy.signal import lfilter
+
+    (b1, a1), (b2, a2) = _k_weighting_coeffs(fs)
+    x = np.asarray(samples, dtype=np.float64)
+    if x.ndim == 1:
+        x = x[:, None]
+    weighted = lfilter(b2, a2, lfilter(b1, a1, x, axis=0), axis=0)
+
+    step = int(round(STEP_SEC * fs))
+    n_steps = weighted.shape[0] // step
+    if n_steps < 4:
+        return np.zeros(0)
+    # 100 ms sub-block energies, then each block is the mean of 4 consecutive sub-blocks
+    sub = np.square(weighted[:n_steps * step]).reshape(n_steps, step, -1).mean(axis=1).sum(axis=1)
+    window = np.convolve(sub, np.ones(4) / 4.0, mode="valid")
+    return window
+
+
+def _energy_to_lufs(energy):
+    return -0.691 + 10.0 * np.log10(np.maximum(energy, 1e-20))
+
+
+def true_peak_dbtp(samples):
+    """True peak (dBTP) via 4x polyphase oversampling"""
+    from scipy.signal import resample_poly
+
+    x = np.asarray(samples, dtype=np.float64)
+    if x.size == 0:
+        return -math.inf
+    upsampled = resample_poly(x, TRUE_PEAK_OVERSAMPLE, 1, axis=0)
+    peak = max(float(np.abs(upsampled).max()), float(np.abs(x).max()))
+    return 20.0 * math.log10(peak) if peak > 0 else -math.inf
+
+
+def measure_chunk(samples, fs):
+    """
+    Loudness summary of one chunk for the manifest
+
+    Returns:
+        dict: {"hist": [[bin, block_count, energy_sum], ...], "tp": true peak dBTP}
+    """
+    energies = _block_energies(samples, fs)
+    hist = {}
+    if energies.size:
+        lufs = _energy_to_lufs(energies)
+        keep = lufs > ABSOLUTE_GATE_LUFS
+        for b, e in zip(np.floor(lufs[keep] / BIN_LU).astype(int), energies[keep]):
+            count, total = hist.get(int(b), (0, 0.0))
+            hist[int(b)] = (count + 1, total + float(e))
+    tp = true_peak_dbtp(samples)
+    return {
+        "hist": [[b, c, float(f"{e:.6g}")] for b, (c, e) in sorted(hist.items())],
+        "tp": round(tp, 2) if math.isfinite(tp) else None,
+    }
+
+
+class LoudnessAccumulator:
+    """Sums chunk loudness summaries into book-level integrated loudness and true peak"""
+
+    def __init__(self):
+        self.bins = {}
+        self.true_peak = -math.inf
+        self.chunks = 0
+
+    def add(self, summary):
+        for b, count, energy in summary.get("hist", ()):
+            c, e = self.bins.get(b, (0, 0.0))
+            self.bins[b] = (c + count, e + energy)
+        if summary.get("tp") is not None:
+            self.true_peak = max(self.true_peak, summary["tp"])
+        self.chunks += 1
+
+    def integrated_lufs(self):
+        """Gated integrated loudness (LUFS), or None for silence"""
+        count = sum(c for c, _ in self.bins.values())
+        if not count:
+            return None
+        # Relative gate from the mean energy of all blocks above the absolute gate
+        mean_energy = sum(e for _, e in self.bins.values()) / count
+        relative_gate = float(_energy_to_lufs(mean_energy)) + RELATIVE_GATE_LU
+        gated = [(c, e) for b, (c, e) in self.bins.items() if (b + 1) * BIN_LU > relative_gate]
+        gated_count = sum(c for c, _ in gated)
+        if not gated_count:
+            return None
+        return float(_energy_to_lufs(sum(e for _, e in gated) / gated_count))
+
+    def summary(self):
+        integrated = self.integrated_lufs()
+        return {
+            "integrated_lufs": round(integrated, 2) if integrated is not None else None,
+            "true_peak_dbtp": round(self.true_peak, 2) if math.isfinite(self.true_peak) else None,
+            "chunks": self.chunks,
+        }
+
+
+def normalization_gain_db(measurement, target_lufs, max_true_peak_db):
+    """
+    Linear gain that brings the book to target loudness without pushing the true
+    peak above `max_true_peak_db` (what loudnorm's linear mode aims for)
+    """
+    integrated = measurement.get("integrated_lufs")
+    if integrated is None:
+        return 0.0
+    gain = target_lufs - integrated
+    true_peak = measurement.get("true_peak_dbtp")
+    if true_peak is not None:
+        gain = min(gain, max_true_peak_db - true_peak)
+    return gain
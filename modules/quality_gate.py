@@ -0,0 +1,303 @@
+"""
+Tiered Quality Gate
+===================
+
+Cheap signal checks on every generated chunk decide which chunks get the
+expensive validation (MFCC spectral analysis, ASR). Each check is a vectorized
+pass over the raw T3/S3Gen output and gives a risk in 0..1:
+
+- tokens: speech tokens T3 produced vs the count expected from the text.
+  Runaway decoding is too long, truncated chunks are too short. When the
+  generator's count is not available (e.g. scoring wavs from disk) it is
+  estimated from the audio length (seconds x 25).
+- duration: voiced span (first to last voiced 20 ms frame) vs the expected
+  speech length. Catches takes that are mostly silence or mumble.
+- gap: longest silence inside the voiced span past QUALITY_GATE_MAX_GAP_MS
+  (the mid-chunk drop)
+- drone: voiced energy that barely varies (hum, buzz, held tones)
+- clipping: share of samples at full scale
+- silent: no voiced frame at all
+
+The chunk's risk is 1 - prod(1 - risk_i). Chunks at or above
+QUALITY_GATE_RISK_THRESHOLD get full validation. So does a random
+QUALITY_GATE_SAMPLE_RATE share of the others, so the gate's miss rate is
+measured during the run. Everything else skips the mid-drop and MFCC checks;
+ASR still runs on it when ASR is enabled. The gate is off by default
+(ENABLE_QUALITY_GATE) until its threshold is calibrated on labeled takes.
+
+The checks only mean something on raw generator output: trimmed chunk files
+have lost the leading/trailing silence and T3's token count. With
+QUALITY_GATE_SAVE_TAKES every take is saved untrimmed to TTS/gate_takes with
+its text and token count (takes.jsonl), whether or not the gate is on.
+`python -m modules.quality_gate <gate_takes>` scores those takes exactly as
+the live gate does and reports precision/recall against full validation (or
+against a labels file) over a range of thresholds.
+"""
+
+import json
+import math
+import random
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from config.config import (
+    QUALITY_GATE_RISK_THRESHOLD, QUALITY_GATE_SAMPLE_RATE,
+    QUALITY_GATE_LENGTH_TOLERANCE, QUALITY_GATE_MAX_GAP_MS,
+)
+
+SPEECH_TOKENS_PER_SEC = 25     # S3 speech token rate
+FRAME_MS = 20
+VOICED_DB = -40.0              # Frame RMS (dBFS) above which a frame counts as voiced
+DRONE_CV = 0.25                # Coefficient of variation of voiced RMS below which energy is "flat"
+CLIP_LEVEL = 0.999
+CLIP_SHARE_MAX = 0.01          # Share of clipped samples that counts as full risk
+TAKES_LOG = "takes.jsonl"      # One line per saved take: file, take id, text, speech_tokens
+
+
+def _length_risk(ratio):
+    """0 within the tolerance band around 1.0, rising to 1 at twice the band's log-width"""
+    if ratio <= 0:
+        return 1.0
+    band = math.log(1.0 + QUALITY_GATE_LENGTH_TOLERANCE)
+    return float(min(1.0, max(0.0, (abs(math.log(ratio)) - band) / band)))
+
+
+def _longest_run(mask):
+    """Length of the longest run of True values"""
+    if not mask.any():
+        return 0
+    padded = np.concatenate(([0], mask.astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    return int((edges[1::2] - edges[::2]).max())
+
+
+def signal_checks(samples, sr, text, speech_tokens=None):
+    """
+    Cheap checks on one take
+
+    Args:
+        samples: Mono float32 samples (untrimmed generator output)
+        sr: Sample rate
+        text: The chunk's text
+        speech_tokens: Speech tokens T3 produced for the take, or None to
+            estimate them from the audio length
+
+    Returns:
+        tuple: (risk, checks) where checks maps each check to its risk and measurement
+    """
+    from modules.render_plan import estimate_speech_tokens
+
+    y = np.asarray(samples, dtype=np.float32).reshape(-1)
+    expected_tokens = max(1, estimate_speech_tokens(text or ""))
+    if speech_tokens is None:
+        tokens, source = len(y) / sr * SPEECH_TOKENS_PER_SEC, "duration"
+    else:
+        tokens, source = speech_tokens, "t3"
+    checks = {"tokens": {"risk": _length_risk(tokens / expected_tokens),
+                         "ratio": round(tokens / expected_tokens, 3), "source": source}}
+
+    frame = max(1, int(sr * FRAME_MS / 1000))
+    n_frames = len(y) // frame
+    rms = np.sqrt(np.mean(y[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1)) if n_frames else np.zeros(0)
+    voiced = 20 * np.log10(rms + 1e-10) > VOICED_DB
+
+    if not voiced.any():
+        checks["silent"] = {"risk": 1.0}
+    else:
+        first, last = np.flatnonzero(voiced)[[0, -1]]
+        span_tokens = (last - first + 1) * FRAME_MS / 1000 * SPEECH_TOKENS_PER_SEC
+        checks["duration"] = {"risk": _length_risk(span_tokens / expected_tokens),
+                              "ratio": round(span_tokens / expected_tokens, 3)}
+        gap_ms = _longest_run(~voiced[first:last + 1]) * FRAME_MS
+        checks["gap"] = {"risk": float(min(1.0, max(0.0, gap_ms / QUALITY_GATE_MAX_GAP_MS - 1.0))), "ms": gap_ms}
+        voiced_rms = rms[voiced]
+        cv = float(voiced_rms.std() / voiced_rms.mean())
+        checks["drone"] = {"risk": float(min(1.0, max(0.0, (DRONE_CV - cv) / DRONE_CV))), "cv": round(cv, 3)}
+
+    clipped = float(np.mean(np.abs(y) >= CLIP_LEVEL)) if len(y) else 0.0
+    checks["clipping"] = {"risk": min(1.0, clipped / CLIP_SHARE_MAX), "share": round(clipped, 5)}
+
+    risk = 1.0 - float(np.prod([1.0 - c["risk"] for c in checks.values()]))
+    return risk, checks
+
+
+class QualityGate:
+    """Risk screening for one run, with counts of what full validation found"""
+
+    def __init__(self, risk_threshold=QUALITY_GATE_RISK_THRESHOLD, sample_rate=QUALITY_GATE_SAMPLE_RATE, seed=None,
+                 takes_dir=None):
+        self.risk_threshold = risk_threshold
+        self.sample_rate = sample_rate
+        self.takes_dir = Path(takes_dir) if takes_dir else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.saved = 0
+        self.screened = 0
+        self.escalated = 0
+        self.sampled = 0
+        self.outcomes = {"escalated": [0, 0], "sampled": [0, 0]}  # [validated, failed]
+
+    def assess(self, samples, sr, text, speech_tokens=None):
+        """
+        Screen one take (`speech_tokens`: T3's count for it, if known)
+
+        Returns:
+            dict: risk, checks, reason ("escalated", "sampled" or "passed") and
+                full (True if the take should get full validation)
+        """
+        risk, checks = signal_checks(samples, sr, text, speech_tokens)
+        with self._lock:
+            self.screened += 1
+            if risk >= self.risk_threshold:
+                reason = "escalated"
+                self.escalated += 1
+            elif self._rng.random() < self.sample_rate:
+                reason = "sampled"
+                self.sampled += 1
+            else:
+                reason = "passed"
+        return {"risk": risk, "checks": checks, "reason": reason, "full": reason != "passed"}
+
+    def save_take(self, take_id, samples, sr, text, speech_tokens=None):
+        """Save one raw take with its text and T3 token count for offline evaluation"""
+        if self.takes_dir is None:
+            return
+        import soundfile as sf
+
+        with self._lock:
+            self.saved += 1
+            name = f"take_{self.saved:06}.wav"
+        self.takes_dir.mkdir(parents=True, exist_ok=True)
+        sf.write(str(self.takes_dir / name), np.asarray(samples, dtype=np.float32).reshape(-1), sr)
+        record = {"file": name, "take": take_id, "text": text, "speech_tokens": speech_tokens}
+        with self._lock:
+            with open(self.takes_dir / TAKES_LOG, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def record_full(self, decision, passed):
+        """Outcome of the full validation a screened take received"""
+        if not decision or decision["reason"] not in self.outcomes:
+            return
+        with self._lock:
+            counts = self.outcomes[decision["reason"]]
+            counts[0] += 1
+            counts[1] += 0 if passed else 1
+
+    def summary(self):
+        """Lines describing how many chunks were skipped and what the validated ones showed"""
+        with self._lock:
+            if not self.screened:
+                return []
+            skipped = self.screened - self.escalated - self.sampled
+            lines = [f"🚦 Quality gate: {self.screened} takes screened, {self.escalated} escalated, "
+                     f"{self.sampled} sampled, {skipped} ({skipped / self.screened:.0%}) skipped MFCC/ASR"]
+            validated, failed = self.outcomes["escalated"]
+            if validated:
+                lines.append(f"   escalated takes failing full validation: {failed}/{validated} "
+                             f"(gate precision {failed / validated:.0%})")
+            validated, failed = self.outcomes["sampled"]
+            if validated:
+                lines.append(f"   sampled low-risk takes failing full validation: {failed}/{validated} "
+                             f"(~{failed / validated * skipped:.0f} missed among skipped takes)")
+            return lines
+
+
+_gate = QualityGate()
+
+
+def get_quality_gate():
+    return _gate
+
+
+def reset_quality_gate(takes_dir=None):
+    """Fresh gate (and counts) for a new run, saving takes to `takes_dir` if given"""
+    global _gate
+    _gate = QualityGate(takes_dir=takes_dir)
+    return _gate
+
+
+def precision_recall(risks, bad, threshold):
+    """Precision, recall and escalation share of `risk >= threshold` against `bad` labels"""
+    flagged = [r >= threshold for r in risks]
+    tp = sum(1 for f, b in zip(flagged, bad) if f and b)
+    fp = sum(1 for f, b in zip(flagged, bad) if f and not b)
+    fn = sum(1 for f, b in zip(flagged, bad) if not f and b)
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    return precision, recall, sum(flagged) / len(flagged) if flagged else 0.0
+
+
+def main():
+    """Gate risk vs full validation (or labels) for the raw takes saved during a run"""
+    import time
+    import argparse
+    import soundfile as sf
+    from pydub import AudioSegment
+    from config.config import QUALITY_THRESHOLD
+    from modules.audio_processor import evaluate_chunk_quality, validate_output_matches_input
+
+    ap = argparse.ArgumentParser(description="Precision/recall of the tiered quality gate against full validation")
+    ap.add_argument("takes", help=f"Folder of raw takes saved with QUALITY_GATE_SAVE_TAKES (TTS/gate_takes, with {TAKES_LOG})")
+    ap.add_argument("--labels", help="JSON mapping take file names to true/\"bad\" (bad) or false/\"good\"; "
+                                     "default: full validation decides")
+    ap.add_argument("--asr", action="store_true", help="Include ASR similarity in full validation")
+    ap.add_argument("--thresholds", default="0.1,0.2,0.3,0.4,0.5,0.6", help="Risk thresholds to report")
+    args = ap.parse_args()
+
+    takes_dir = Path(args.takes)
+    try:
+        records = [json.loads(line) for line in (takes_dir / TAKES_LOG).read_text(encoding="utf-8").splitlines() if line.strip()]
+    except (OSError, ValueError) as e:
+        print(f"❌ Cannot read {takes_dir / TAKES_LOG}: {e}")
+        return 1
+    records = [r for r in records if (takes_dir / r["file"]).exists()]
+    if not records:
+        print(f"❌ No saved takes in {takes_dir} (render with QUALITY_GATE_SAVE_TAKES = True)")
+        return 1
+
+    labels = None
+    if args.labels:
+        raw = json.loads(Path(args.labels).read_text(encoding="utf-8"))
+        labels = {name: value in (True, "bad") for name, value in raw.items()}
+        records = [r for r in records if r["file"] in labels]
+
+    asr_model = None
+    if args.asr and labels is None:
+        from modules.asr_manager import load_asr_model_adaptive
+        asr_model, _ = load_asr_model_adaptive()
+
+    risks, bad = [], []
+    gate_seconds = full_seconds = 0.0
+    for record in records:
+        path = takes_dir / record["file"]
+        samples, sr = sf.read(str(path), dtype="float32")
+        start = time.perf_counter()
+        risk, _ = signal_checks(samples, sr, record["text"], record.get("speech_tokens"))
+        gate_seconds += time.perf_counter() - start
+        risks.append(risk)
+        if labels is not None:
+            bad.append(labels[record["file"]])
+            continue
+        # Full validation as the engine runs it: on the in-memory take, not the file
+        start = time.perf_counter()
+        segment = AudioSegment.from_wav(str(path))
+        score = evaluate_chunk_quality(segment, None, include_spectral=True)
+        if asr_model is not None:
+            score *= validate_output_matches_input(segment, record["text"], asr_model)
+        full_seconds += time.perf_counter() - start
+        bad.append(score < QUALITY_THRESHOLD)
+
+    print(f"🚦 {len(records)} takes, {sum(bad)} bad ({'labels' if labels is not None else 'full validation'}); "
+          f"cheap checks {gate_seconds / len(records) * 1000:.1f} ms/take"
+          + (f", full validation {full_seconds / len(records) * 1000:.1f} ms/take" if full_seconds else ""))
+    for threshold in [float(t) for t in args.thresholds.split(",") if t.strip()]:
+        precision, recall, share = precision_recall(risks, bad, threshold)
+        print(f"   risk >= {threshold:.2f}: precision {precision:.2f}, recall {recall:.2f}, "
+              f"{share:.0%} of takes get full validation")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
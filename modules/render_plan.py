@@ -0,0 +1,325 @@
+"""
+Render Plan
+===========
+
+Plans a book's render from chunks_info.json before any audio is generated:
+
+- estimates each chunk's speech-token length from its text
+- bin-packs chunks with identical TTS parameters (everything process_batch passes
+  to generate_batch must match) into length-sorted batches, starting a new batch
+  when the size cap or the length ratio (padding waste) would be exceeded
+- predicts each batch's cost (T3 decode steps for the longest sequence, scaled by
+  batch size and CFG, plus a per-call cost), orders batches longest-first, and
+  predicts the total runtime over the worker count
+
+The plan is saved as render_plan.json next to chunks_info.json.
+`process_book_folder` prints the prediction and runs the plan's batches as its
+micro-batches (and render pool ranges). A plan whose fingerprint still matches the
+chunks and whose planning settings (device, workers, batch caps, length ratio,
+adaptive batching) match the run's is reused, so a plan made or edited offline
+is executed as written. Any other plan is rebuilt.
+After a complete render, the measured/predicted ratio is saved per host and
+device in RENDER_PLAN_CALIBRATION_FILE and scales later predictions.
+
+    python -m modules.render_plan Text_Input/<book>/chunks_info.json --device cpu --workers 2
+"""
+
+import os
+import sys
+import json
+import time
+import heapq
+import hashlib
+import logging
+import argparse
+from pathlib import Path
+
+# Add project root to path for imports
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.config import (
+    RENDER_PLAN_FILE, RENDER_PLAN_COST_MODEL, RENDER_PLAN_CALIBRATION_FILE,
+    ENABLE_ADAPTIVE_BATCHING, ADAPTIVE_BATCH_MAX,
+)
+
+PLAN_VERSION = 1
+SPEECH_TOKENS_PER_SEC = 25    # S3 speech token rate
+CHARS_PER_SECOND = 14.5       # Narration pace (~150 wpm) used to estimate speech length
+TOKEN_OVERHEAD = 10           # Start/stop tokens and trailing silence per chunk
+BATCH_PARAMS = ("exaggeration", "cfg_weight", "temperature", "min_p", "top_p", "repetition_penalty")
+
+
+def estimate_speech_tokens(text):
+    """Rough T3 speech-token count for a chunk's text"""
+    return int(len(text.strip()) / CHARS_PER_SECOND * SPEECH_TOKENS_PER_SEC) + TOKEN_OVERHEAD
+
+
+def param_key(tts_params):
+    """Chunks can share a generate_batch call only if these values match"""
+    return tuple(round(float(tts_params.get(p, 0.0)), 3) for p in BATCH_PARAMS)
+
+
+def plan_fingerprint(chunks):
+    """Hash of chunk order, text and batch parameters (a plan is only valid for these)"""
+    h = hashlib.sha1()
+    for position, chunk in enumerate(chunks):
+        h.update(f"{chunk.get('index', position)}|{chunk.get('text', '')}|"
+                 f"{param_key(chunk.get('tts_params', {}))}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def plan_settings(device="cuda", max_batch=None, workers=1, sub_batch=None, len_ratio=None):
+    """Planning arguments a saved plan must have been built with to be reused"""
+    if len_ratio is None:
+        len_ratio = float(os.environ.get('GENTTS_MICROBATCH_LEN_RATIO', '1.8'))
+    return {
+        "device": str(device),
+        "workers": max(1, workers),
+        "max_batch": max_batch,
+        "sub_batch": sub_batch,
+        "len_ratio": len_ratio,
+        "adaptive_batching": ENABLE_ADAPTIVE_BATCHING,
+    }
+
+
+def _device_kind(device):
+    return "cuda" if str(device).startswith("cuda") else str(device).split(":")[0]
+
+
+def cost_model(device):
+    """Cost-model coefficients for `device`, scaled by this host's calibration"""
+    kind = _device_kind(device)
+    model = dict(RENDER_PLAN_COST_MODEL.get(kind, RENDER_PLAN_COST_MODEL["cpu"]))
+    model["calibration"] = load_calibration().get(kind, 1.0)
+    return model
+
+
+def batch_cost(tokens, cfg_enabled, model, sub_batch=None):
+    """
+    Predicted seconds for one batch of chunks with these speech-token estimates
+
+    The batch decodes until its longest sequence ends; each step costs more with
+    every extra sequence (CFG runs a conditional and an unconditional row per
+    chunk). `sub_batch` splits the batch like the adaptive batch controller does.
+    """
+    tokens = sorted(tokens)
+    step = sub_batch or len(tokens)
+    seconds = 0.0
+    for i in range(0, len(tokens), step):
+        part = tokens[i:i + step]
+        rows = len(part) * (2 if cfg_enabled else 1)
+        seconds += (model["call_overhead"]
+                    + max(part) * model["step_seconds"] * (1 + model["batch_scaling"] * (rows - 1)))
+    return seconds * model["calibration"]
+
+
+def _makespan(costs, workers):
+    """Longest-first schedule of `costs` on `workers` (list is already sorted descending)"""
+    finish = [0.0] * max(1, workers)
+    for cost in costs:
+        heapq.heapreplace(finish, finish[0] + cost)
+    return max(finish)
+
+
+def build_render_plan(chunks, device="cuda", max_batch=None, workers=1, sub_batch=None, len_ratio=None):
+    """
+    Bin-pack enriched chunks into batches and predict the render time
+
+    Args:
+        chunks: Chunk dicts from chunks_info.json (text, index, tts_params)
+        device: Render device (selects the cost model)
+        max_batch: Most chunks per batch (default: ADAPTIVE_BATCH_MAX with adaptive
+            batching, else 4 with CFG and 8 without, as create_parameter_microbatches)
+        workers: Concurrent batches (threads or render worker processes)
+        sub_batch: Size generate_batch is called with inside a batch (default: the
+            adaptive controller's starting size with adaptive batching, else the batch)
+        len_ratio: Longest/shortest text ratio allowed in one batch
+
+    Returns:
+        dict: The plan (see save_render_plan)
+    """
+    settings = plan_settings(device, max_batch, workers, sub_batch, len_ratio)
+    len_ratio = settings["len_ratio"]
+    model = cost_model(device)
+
+    groups = {}
+    for position, chunk in enumerate(chunks):
+        key = param_key(chunk.get("tts_params", {}))
+        groups.setdefault(key, []).append((chunk.get("index", position), estimate_speech_tokens(chunk.get("text", ""))))
+
+    batches = []
+    for key, members in groups.items():
+        cfg_enabled = key[BATCH_PARAMS.index("cfg_weight")] > 0.0
+        default = 4 if cfg_enabled else 8
+        cap = max_batch or (ADAPTIVE_BATCH_MAX if ENABLE_ADAPTIVE_BATCHING else default)
+        calls = min(cap, sub_batch or (default if ENABLE_ADAPTIVE_BATCHING else cap))
+        members.sort(key=lambda m: m[1], reverse=True)
+        current = []
+        for index, tokens in members + [(None, None)]:
+            if current and (index is None or len(current) >= cap or current[0][1] > len_ratio * tokens):
+                sizes = [t for _, t in current]
+                batches.append({
+                    "chunks": [i for i, _ in current],
+                    "tokens": sizes,
+                    "params": dict(zip(BATCH_PARAMS, key)),
+                    "padding": round(1 - sum(sizes) / (max(sizes) * len(sizes)), 3),
+                    "predicted_seconds": round(batch_cost(sizes, cfg_enabled, model, calls), 2),
+                })
+                current = []
+            if index is not None:
+                current.append((index, tokens))
+
+    # Longest first: keeps workers evenly loaded to the end of the book
+    batches.sort(key=lambda b: b["predicted_seconds"], reverse=True)
+    for number, batch in enumerate(batches):
+        batch["id"] = number
+
+    costs = [b["predicted_seconds"] for b in batches]
+    speech_tokens = sum(sum(b["tokens"]) for b in batches)
+    return {
+        "version": PLAN_VERSION,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "fingerprint": plan_fingerprint(chunks),
+        **settings,
+        "cost_model": model,
+        "total_chunks": len(chunks),
+        "predicted_audio_seconds": round(speech_tokens / SPEECH_TOKENS_PER_SEC, 1),
+        "predicted_seconds": round(_makespan(costs, workers), 1),
+        "batches": batches,
+    }
+
+
+def plan_path(text_chunks_dir):
+    return Path(text_chunks_dir) / RENDER_PLAN_FILE
+
+
+def save_render_plan(plan, path):
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(plan, indent=1))
+    os.replace(tmp, path)
+
+
+def load_render_plan(path, chunks, settings=None):
+    """The saved plan if it was made for exactly these chunks (and `settings`, if given), else None"""
+    try:
+        plan = json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return None
+    if plan.get("version") != PLAN_VERSION or plan.get("fingerprint") != plan_fingerprint(chunks):
+        return None
+    changed = [k for k, v in (settings or {}).items() if plan.get(k) != v]
+    if changed:
+        logging.info(f"Render plan {path} was built with different {', '.join(changed)}; rebuilding")
+        return None
+    return plan
+
+
+def load_or_build_plan(text_chunks_dir, chunks, **kwargs):
+    """Reuse render_plan.json if it matches `chunks` and the planning arguments, otherwise build and save a new plan"""
+    path = plan_path(text_chunks_dir)
+    plan = load_render_plan(path, chunks, plan_settings(**kwargs))
+    if plan is not None:
+        print(f"🗺️ Using existing render plan: {path}")
+        return plan
+    plan = build_render_plan(chunks, **kwargs)
+    save_render_plan(plan, path)
+    return plan
+
+
+def plan_batches(plan, chunks):
+    """
+    The plan's batches as lists of chunk dicts, in plan order
+
+    Only chunks present in `chunks` are returned, so a slice of the book (an outer
+    BATCH_SIZE window) runs its part of the plan.
+    """
+    by_index = {chunk.get("index", position): chunk for position, chunk in enumerate(chunks)}
+    batches = []
+    for batch in plan["batches"]:
+        members = [by_index[i] for i in batch["chunks"] if i in by_index]
+        if members:
+            batches.append(members)
+    return batches
+
+
+def describe_plan(plan):
+    """Summary lines: batch count, padding, predicted runtime and realtime factor"""
+    from datetime import timedelta
+    batches = plan["batches"]
+    sizes = [len(b["chunks"]) for b in batches]
+    padded = sum(max(b["tokens"]) * len(b["tokens"]) for b in batches)
+    useful = sum(sum(b["tokens"]) for b in batches)
+    seconds, audio = plan["predicted_seconds"], plan["predicted_audio_seconds"]
+    lines = [
+        f"🗺️ Render plan: {plan['total_chunks']} chunks in {len(batches)} batches "
+        f"(avg {sum(sizes) / max(1, len(sizes)):.1f}, max {max(sizes, default=0)}), "
+        f"padding {1 - useful / max(1, padded):.1%}",
+        f"   Predicted: {timedelta(seconds=int(seconds))} for ~{timedelta(seconds=int(audio))} of audio "
+        f"on {plan['device']} × {plan['workers']} ({audio / seconds if seconds else 0:.2f}x realtime, "
+        f"calibration {plan['cost_model']['calibration']:.2f})",
+    ]
+    return lines
+
+
+# ---------------------------------------------------------------- calibration
+
+def load_calibration():
+    """This host's {device kind: measured/predicted} factors"""
+    from modules.cpu_tuning import host_key
+    try:
+        return json.loads(Path(RENDER_PLAN_CALIBRATION_FILE).read_text()).get(host_key(), {})
+    except (OSError, ValueError):
+        return {}
+
+
+def record_plan_actual(plan, actual_seconds, weight=0.5):
+    """Fold a complete render's measured time into this host's calibration for the device"""
+    from modules.cpu_tuning import host_key
+    predicted = plan["predicted_seconds"] / plan["cost_model"]["calibration"]
+    if predicted <= 0 or actual_seconds <= 0:
+        return
+    path = Path(RENDER_PLAN_CALIBRATION_FILE)
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        data = {}
+    kind = _device_kind(plan["device"])
+    host = data.setdefault(host_key(), {})
+    ratio = min(10.0, max(0.1, actual_seconds / predicted))
+    host[kind] = round(host.get(kind, ratio) * (1 - weight) + ratio * weight, 3)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2))
+    os.replace(tmp, path)
+    logging.info(f"Render plan calibration ({kind}): predicted {plan['predicted_seconds']:.0f}s, "
+                 f"actual {actual_seconds:.0f}s, factor now {host[kind]:.2f}")
+
+
+def main():
+    from wrapper.chunk_loader import load_chunks
+
+    parser = argparse.ArgumentParser(description="Plan a book render from chunks_info.json")
+    parser.add_argument("chunks_json", help="Path to chunks_info.json")
+    parser.add_argument("--device", default="cuda", help="Render device for the cost model (default: cuda)")
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent batches (default: 1)")
+    parser.add_argument("--max-batch", type=int, default=None, help="Most chunks per batch")
+    parser.add_argument("--out", default=None, help=f"Plan file (default: {RENDER_PLAN_FILE} next to the JSON)")
+    args = parser.parse_args()
+
+    json_path = Path(args.chunks_json)
+    if not json_path.exists():
+        print(f"❌ JSON file not found: {json_path}")
+        sys.exit(1)
+    chunks = load_chunks(str(json_path))
+    plan = build_render_plan(chunks, device=args.device, max_batch=args.max_batch, workers=args.workers)
+    out = Path(args.out) if args.out else plan_path(json_path.parent)
+    save_render_plan(plan, out)
+    for line in describe_plan(plan):
+        print(line)
+    print(f"📁 Plan saved to: {out}")
+
+
+if __name__ == "__main__":
+    main()
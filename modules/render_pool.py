@@ -0,0 +1,250 @@
+"""
+Render Worker Pool
+==================
+
+CPU rendering with several worker processes that share one copy of the model
+weights (RENDER_WORKER_PROCESSES > 0).
+
+- The parent loads and prewarms the model as usual. Then `share_weights` moves
+  the T3 and S3Gen weights into one shared-memory buffer per component, and the
+  parent's own modules are re-pointed at that buffer.
+- Workers are forked from a fork server that has already imported torch and the
+  engine. Each worker attaches to the shared buffers: its modules are built
+  without random init and use the shared tensors in place. The voice
+  conditionals come from the parent, so workers never load the voice encoder or
+  the S3 tokenizer. Every worker runs one warm-up generation before taking work.
+- Worker count, threads per worker and micro-batch size come from
+  `cpu_tuning.worker_layout` (explicit config, else this host's autotuned
+  profile). With CPU_PIN_WORKERS each worker is pinned to its own cores.
+- `process_book_folder` dispatches ranges of RENDER_RANGE_SIZE consecutive
+  chunks (or the render plan's batches) to the workers. They run the normal
+  process_batch / process_one_chunk path and write through the chunk journal
+  (and pack), which lock across processes. A range whose worker fails is
+  rendered again in the parent process once the pool is done; if that fails
+  too the render stops before the book is assembled.
+
+So N workers cost about one model's RAM plus their own activations. With CUDA,
+the weights already live in VRAM, so the in-process thread workers are used
+instead.
+"""
+
+import os
+import time
+import logging
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config.config import RENDER_WORKER_PROCESSES, RENDER_RANGE_SIZE, CPU_PIN_WORKERS
+from modules.cpu_tuning import worker_layout, plan_cpu_sets, pin_current_process
+
+WARMUP_TEXT = "sixth sick sheik's sixth sheep's sick, and red leather, yellow leather."
+
+# Per-process state of a render worker (set by _init_worker)
+_worker = {}
+
+
+def render_pool_enabled(device):
+    """True if chunks for this device should go to render worker processes"""
+    if str(device) != "cpu":
+        if RENDER_WORKER_PROCESSES > 0:
+            logging.warning(f"⚠️ RENDER_WORKER_PROCESSES needs device 'cpu' (got '{device}'); rendering in-process")
+        return False
+    return worker_layout()[0] > 0
+
+
+def _mp_context():
+    import torch.multiprocessing as mp  # registers the shared-tensor pickling
+    if "forkserver" in mp.get_all_start_methods():
+        ctx = mp.get_context("forkserver")
+        # Workers fork from a server that has already paid these imports
+        ctx.set_forkserver_preload(["torch", "src.chatterbox.tts", "modules.tts_engine", "modules.render_pool"])
+        return ctx
+    return mp.get_context("spawn")
+
+
+def worker_state():
+    """This render worker's {"model", "asr_model", "job"} (inside a worker process)"""
+    return _worker
+
+
+def _init_worker(bundle, job, rank_counter, ready_counter):
+    """Worker initializer: pin, attach to the shared weights, apply the run settings, warm up"""
+    import torch
+    from src.chatterbox.checkpoint import format_timings
+    from src.chatterbox.tts import ChatterboxTTS
+    from modules import tts_engine
+    from modules.real_tts_optimizer import optimize_chatterbox_model
+
+    with rank_counter.get_lock():
+        rank = rank_counter.value
+        rank_counter.value += 1
+    if job.get("cpu_sets"):
+        pin_current_process(job["cpu_sets"][rank % len(job["cpu_sets"])])
+    torch.set_num_threads(job["threads"])
+    tts_engine.apply_runtime_overrides(job["quality_params"], job["config_params"])
+
+    model = ChatterboxTTS.from_shared(bundle, job["device"])
+    optimize_chatterbox_model(model)
+    if model.conds is None:
+        model.prepare_conditionals(job["compatible_voice"])
+
+    tts_params = job["tts_params"]
+    model.generate(
+        WARMUP_TEXT,
+        exaggeration=tts_params.get("exaggeration", 0.5),
+        cfg_weight=tts_params.get("cfg_weight", 0.5),
+        temperature=tts_params.get("temperature", 0.9),
+        disable_watermark=True,
+    )
+
+    asr_model = None
+    if job["asr_enabled"]:
+        from modules.asr_manager import load_asr_model_adaptive
+        asr_model, _ = load_asr_model_adaptive(job["asr_config"])
+
+    _worker.update(model=model, asr_model=asr_model, job=job)
+    with ready_counter.get_lock():
+        ready_counter.value += 1
+    print(f"🧵 Render worker {os.getpid()} ready ({job['threads']} threads, {format_timings(model.load_timings)})")
+
+
+def _ping(_):
+    return os.getpid()
+
+
+def _render_range(chunks):
+    """Render a range of chunk dicts in this worker; returns [(index, wav_path, duration)]"""
+    from src.chatterbox.tts import punc_norm
+    from modules import tts_engine
+    from modules.chunk_journal import chunk_written
+    from modules.audio_processor import get_chunk_audio_duration
+    from modules.progress_tracker import log_run
+    from config.config import ENABLE_BATCH_BINNING
+
+    job, model, asr_model = _worker["job"], _worker["model"], _worker["asr_model"]
+    text_chunks_dir, audio_chunks_dir = Path(job["text_chunks_dir"]), Path(job["audio_chunks_dir"])
+    voice_path, log_path = Path(job["voice_path"]), Path(job["log_path"])
+    run_args = (job["start_time"], job["total_chunks"], punc_norm, job["basename"], log_run, log_path,
+                job["device"], model, asr_model)
+
+    results = []
+    if job["use_vader"]:
+        for chunk_data in chunks:
+            results.append(tts_engine.process_one_chunk(
+                chunk_data["index"], chunk_data["text"], text_chunks_dir, audio_chunks_dir,
+                voice_path, chunk_data.get("tts_params", job["tts_params"]), *run_args,
+                boundary_type=chunk_data.get("boundary_type", "none"), enable_asr=job["asr_enabled"],
+            ))
+    else:
+        if ENABLE_BATCH_BINNING:
+            groups = tts_engine.create_parameter_microbatches(chunks, max_batch=job.get("batch_size"))
+        else:
+            groups = [chunks]
+        for group in groups:
+            results.extend(tts_engine.process_batch(
+                group, text_chunks_dir, audio_chunks_dir, voice_path, job["tts_params"], *run_args,
+                enable_asr=job["asr_enabled"],
+            ))
+
+    return [(idx, str(wav_path), get_chunk_audio_duration(wav_path))
+            for idx, wav_path in results if wav_path and chunk_written(wav_path)]
+
+
+def start_render_pool(model, job, workers):
+    """
+    Start `workers` prewarmed render processes attached to `model`'s shared weights
+
+    Returns once every worker has finished its warm-up; the caller shuts the pool down.
+    """
+    start = time.time()
+    bundle = model.share_weights()
+    ctx = _mp_context()
+    ready = ctx.Value("i", 0)
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                               initializer=_init_worker, initargs=(bundle, job, ctx.Value("i", 0), ready))
+    # One ping per worker makes the executor start them all; a worker that is
+    # already warm may answer several pings, so wait for every initializer
+    list(pool.map(_ping, range(workers)))
+    while ready.value < workers:
+        pool.submit(_ping, None).result()  # raises if a worker died while starting
+        time.sleep(0.1)
+    print(f"🧵 {workers} render workers ready in {time.time() - start:.1f}s (shared weights)")
+    return pool
+
+
+def render_chunks_in_pool(model, chunks, job, ranges=None):
+    """
+    Render `chunks` with a prewarmed pool of worker processes sharing `model`'s weights
+
+    Args:
+        model: Loaded, prewarmed CPU model (its weights are moved to shared memory)
+        chunks: Enriched chunk dicts (text, index, tts_params, boundary_type)
+        job: Run settings for the workers (see process_book_folder)
+        ranges: Chunk lists to dispatch, in order (e.g. render plan batches); default
+            is consecutive ranges of RENDER_RANGE_SIZE
+
+    Returns:
+        tuple: ([(index, wav_path)], total_audio_duration)
+    """
+    from modules import tts_engine
+    from modules.progress_tracker import log_chunk_progress
+
+    workers, threads, batch_size = worker_layout()
+    cpu_sets = plan_cpu_sets(workers, threads) if CPU_PIN_WORKERS else None
+    job = dict(job, threads=threads, batch_size=batch_size, cpu_sets=cpu_sets)
+    print(f"🧮 Render layout: {workers} processes × {threads} threads"
+          + (f", micro-batch {batch_size}" if batch_size else "") + (", pinned" if cpu_sets else ""))
+
+    pool = start_render_pool(model, job, workers)
+    results, total_audio_duration = [], 0.0
+    failed = []
+    try:
+        if ranges is None:
+            ranges = [chunks[i:i + RENDER_RANGE_SIZE] for i in range(0, len(chunks), RENDER_RANGE_SIZE)]
+        futures = [pool.submit(_render_range, chunk_range) for chunk_range in ranges]
+        for fut in as_completed(futures):
+            if tts_engine.shutdown_requested:
+                for pending in futures:
+                    pending.cancel()
+            if fut.cancelled():
+                continue
+            try:
+                rendered = fut.result()
+            except Exception as e:
+                chunk_range = ranges[futures.index(fut)]
+                logging.error(f"Render worker range failed (chunks {_range_label(chunk_range)}), "
+                              f"retrying in-process after the pool: {e}")
+                failed.append(chunk_range)
+                continue
+            for idx, wav_path, duration in rendered:
+                results.append((idx, Path(wav_path)))
+                total_audio_duration += duration
+            log_chunk_progress(len(results) - 1, job["total_chunks"], job["start_time"], total_audio_duration)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    if failed and not tts_engine.shutdown_requested:
+        # The parent's model still uses the shared weights; render the ranges here
+        asr_model = None
+        if job["asr_enabled"]:
+            from modules.asr_manager import load_asr_model_adaptive
+            asr_model, _ = load_asr_model_adaptive(job["asr_config"])
+        _worker.update(model=model, asr_model=asr_model, job=job)
+        for chunk_range in failed:
+            print(f"🔁 Rendering chunks {_range_label(chunk_range)} in-process after a worker failure")
+            try:
+                rendered = _render_range(chunk_range)
+            except Exception as e:
+                raise RuntimeError(f"Chunks {_range_label(chunk_range)} failed in a render worker and in-process; "
+                                   f"not assembling an incomplete book") from e
+            for idx, wav_path, duration in rendered:
+                results.append((idx, Path(wav_path)))
+                total_audio_duration += duration
+            log_chunk_progress(len(results) - 1, job["total_chunks"], job["start_time"], total_audio_duration)
+    return results, total_audio_duration
+
+
+def _range_label(chunk_range):
+    """1-based chunk numbers a range covers, e.g. '00012-00019'"""
+    numbers = [chunk["index"] + 1 for chunk in chunk_range]
+    return f"{min(numbers):05}-{max(numbers):05}"
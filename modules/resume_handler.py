@@ -55,9 +55,12 @@ from modules.text_processor import smart_punctuate, sentence_chunk_text
 from modules.file_manager import (
     setup_book_directories, find_book_files, list_voice_samples,
     ensure_voice_sample_compatibility, get_audio_files_in_directory,
-    combine_audio_chunks, convert_to_m4b, add_metadata_to_m4b
+    combine_audio_chunks, convert_to_m4b, add_metadata_to_m4b, chunk_sort_key
 )
 from modules.audio_processor import get_chunk_audio_duration, pause_for_chunk_review
+from modules.chunk_journal import completed_chunk_numbers, ChunkManifest, total_chunk_duration, chunk_written
+from modules.chunk_pack import list_chunk_paths
+from modules.watermark import apply_deferred_watermark
 from modules.progress_tracker import setup_logging, log_chunk_progress, log_run
 
 def analyze_existing_chunks(audio_chunks_dir):
@@ -73,52 +76,41 @@ def analyze_existing_chunks(audio_chunks_dir):
     4. Overall completion status and progress percentage
     
     ANALYSIS PROCESS:
-    - Scans directory for chunk_XXXXX.wav files
-    - Extracts chunk numbers and sorts them
+    - Replays the chunk completion journal (audio_chunks/chunks.journal) and keeps
+      the chunks whose file is still on disk at its journaled size (one listing)
+    - Falls back to a single directory listing for books without a journal
     - Identifies highest completed chunk number
     - Detects gaps in the sequence (missing chunk numbers)
     - Calculates resume point and missing chunks list
-    
+
+    Chunks are written atomically and journaled after the rename, so journaled
+    chunks still on disk are complete and no file is opened (O(n) overall).
+
     PARAMETERS:
     - audio_chunks_dir: Path to directory containing generated audio chunks
-    
+
     RETURNS:
     - resume_chunk_number: Next chunk number to start processing from
     - missing_chunks: List of chunk numbers that need regeneration
-    
+
     EDGE CASES HANDLED:
     - Empty directory (start from beginning)
-    - No valid chunks found (start from beginning)  
+    - No valid chunks found (start from beginning)
     - Gaps in sequence (targeted regeneration)
     - Out-of-order chunk numbers (robust sorting)
     """
     if not audio_chunks_dir.exists():
         return 0, []
 
-    chunk_paths = get_audio_files_in_directory(audio_chunks_dir)
-
-    if not chunk_paths:
-        return 0, []
-
-    # Find the highest chunk number
-    chunk_numbers = []
-    for chunk_path in chunk_paths:
-        import re
-        match = re.match(r"chunk_(\d+)\.wav", chunk_path.name)
-        if match:
-            chunk_numbers.append(int(match.group(1)))
+    chunk_numbers = completed_chunk_numbers(audio_chunks_dir)
 
     if not chunk_numbers:
         return 0, []
 
-    chunk_numbers.sort()
     last_chunk_number = max(chunk_numbers)
 
-    # Check for gaps in sequence
-    missing_chunks = []
-    for i in range(1, last_chunk_number + 1):
-        if i not in chunk_numbers:
-            missing_chunks.append(i)
+    # Check for gaps in sequence (set membership)
+    missing_chunks = [i for i in range(1, last_chunk_number + 1) if i not in chunk_numbers]
 
     print(f"📊 Existing chunks analysis:")
     print(f"   Total chunks found: {GREEN}{len(chunk_numbers)}{RESET}")
@@ -226,11 +218,11 @@ def process_book_folder_resume(book_dir, voice_path, tts_params, device, start_c
         print(f"🔄 Resuming from chunk {start_chunk}")
         print(f"📊 Skipping chunks 1-{start_chunk-1} (already completed)")
 
-        # Check which chunks already exist
+        # Check which chunks already exist (loose files or packed)
+        available = {p.name for p in list_chunk_paths(audio_chunks_dir)}
         existing_chunks = []
         for i in range(start_chunk-1):
-            chunk_path = audio_chunks_dir / f"chunk_{i+1:05}.wav"
-            if chunk_path.exists():
+            if f"chunk_{i+1:05}.wav" in available:
                 existing_chunks.append(i+1)
 
         print(f"✅ Found {len(existing_chunks)} existing chunks")
@@ -279,10 +271,10 @@ def process_book_folder_resume(book_dir, voice_path, tts_params, device, start_c
     total_audio_duration = 0.0
     if start_chunk > 1:
         print("📊 Calculating existing audio duration...")
-        for i in range(start_chunk-1):
-            chunk_path = audio_chunks_dir / f"chunk_{i+1:05}.wav"
-            if chunk_path.exists():
-                total_audio_duration += get_chunk_audio_duration(chunk_path)
+        manifest = ChunkManifest(audio_chunks_dir)
+        for chunk_path in list_chunk_paths(audio_chunks_dir):
+            if chunk_sort_key(chunk_path) < start_chunk:
+                total_audio_duration += manifest.duration(chunk_path)
         print(f"📊 Existing audio: {timedelta(seconds=int(total_audio_duration))}")
 
     # Initialize performance optimizations
@@ -395,7 +387,7 @@ def process_book_folder_resume(book_dir, voice_path, tts_params, device, start_c
                 for fut in as_completed(futures):
                     try:
                         idx, wav_path = fut.result()
-                        if wav_path and wav_path.exists():
+                        if wav_path and chunk_written(wav_path):
                             # Measure actual audio duration for this chunk
                             chunk_duration = get_chunk_audio_duration(wav_path)
                             total_audio_duration += chunk_duration
@@ -429,10 +421,11 @@ def process_book_folder_resume(book_dir, voice_path, tts_params, device, start_c
     pause_for_chunk_review(quarantine_dir)
 
     # Collect ALL chunk paths (both existing and newly created)
+    available = {p.name for p in list_chunk_paths(audio_chunks_dir)}
     chunk_paths = []
     for i in range(total_chunks):
         chunk_path = audio_chunks_dir / f"chunk_{i+1:05}.wav"
-        if chunk_path.exists():
+        if chunk_path.name in available:
             chunk_paths.append(chunk_path)
         else:
             logging.warning(f"Missing chunk file: chunk_{i+1:05}.wav")
@@ -448,7 +441,7 @@ def process_book_folder_resume(book_dir, voice_path, tts_params, device, start_c
     elapsed_td = timedelta(seconds=int(elapsed_total))
 
     # Get total audio duration from ALL chunks
-    total_audio_duration_final = sum(get_chunk_audio_duration(chunk_path) for chunk_path in chunk_paths)
+    total_audio_duration_final = total_chunk_duration(chunk_paths)
     audio_duration_td = timedelta(seconds=int(total_audio_duration_final))
     realtime_factor = total_audio_duration_final / elapsed_total if elapsed_total > 0 else 0.0
 
@@ -461,11 +454,12 @@ def process_book_folder_resume(book_dir, voice_path, tts_params, device, start_c
     combined_wav_path = output_root / f"{book_dir.name} [{voice_path.stem}].wav"
     print("\n💾 Saving WAV file...")
     combine_audio_chunks(chunk_paths, combined_wav_path)
+    apply_deferred_watermark(combined_wav_path)
 
     # M4B conversion
     temp_m4b_path = output_root / "output.m4b"
     final_m4b_path = output_root / f"{book_dir.name}[{voice_path.stem}].m4b"
-    convert_to_m4b(combined_wav_path, temp_m4b_path)
+    convert_to_m4b(combined_wav_path, temp_m4b_path, chunk_paths=chunk_paths)
     add_metadata_to_m4b(temp_m4b_path, final_m4b_path, cover_file, nfo_file)
 
     logging.info(f"Audiobook created: {final_m4b_path}")
@@ -18,6 +18,8 @@ from typing import List, Dict, Tuple, Optional
 from collections import defaultdict
 import torch
 
+from modules.watermark import chunk_watermark_disabled
+
 logger = logging.getLogger(__name__)
 
 
@@ -239,7 +241,8 @@ class SequenceBatchProcessor:
                 temperature=params.get('temperature', 0.8),
                 min_p=params.get('min_p', 0.05),
                 top_p=params.get('top_p', 1.0),
-                repetition_penalty=params.get('repetition_penalty', 1.2)
+                repetition_penalty=params.get('repetition_penalty', 1.2),
+                disable_watermark=chunk_watermark_disabled()
             )
             batch_time = time.time() - batch_start
 
@@ -273,7 +276,8 @@ class SequenceBatchProcessor:
                 temperature=params.get('temperature', 0.8),
                 min_p=params.get('min_p', 0.05),
                 top_p=params.get('top_p', 1.0),
-                repetition_penalty=params.get('repetition_penalty', 1.2)
+                repetition_penalty=params.get('repetition_penalty', 1.2),
+                disable_watermark=chunk_watermark_disabled()
             )
             chunk_time = time.time() - chunk_start
 
@@ -0,0 +1,221 @@
+"""
+Smart Reload Manager
+====================
+
+Decides when reloading the TTS model mid-book pays for itself.
+
+Each rendered chunk is recorded with its speech tokens (audio seconds x 25) and
+the wall time it took, giving a tokens/sec sample, plus the memory in use
+(allocated VRAM on CUDA, RSS on CPU). After a (re)load:
+
+- the first SMART_RELOAD_WARMUP_CHUNKS chunks are skipped
+- the next SMART_RELOAD_WINDOW samples form the baseline
+- the latest SMART_RELOAD_WINDOW samples are compared with the baseline
+
+A reload is recommended when the recent window is slower than the baseline by
+at least SMART_RELOAD_MIN_DEGRADATION percent, the Welch t-statistic exceeds
+SMART_RELOAD_T_THRESHOLD, and the projected time saved over the remaining chunks
+(remaining tokens at the current rate vs at the baseline rate) is at least
+SMART_RELOAD_MIN_ROI x the reload cost. The reload cost is measured: the initial
+load, then each reload. Memory growth past SMART_RELOAD_MEMORY_GROWTH_MB since the
+last (re)load forces a reset regardless of speed.
+"""
+
+import math
+import time
+import logging
+import threading
+from statistics import mean, median, variance
+
+from config.config import (
+    SMART_RELOAD_WARMUP_CHUNKS, SMART_RELOAD_WINDOW, SMART_RELOAD_MIN_DEGRADATION,
+    SMART_RELOAD_T_THRESHOLD, SMART_RELOAD_MIN_ROI, SMART_RELOAD_MEMORY_GROWTH_MB,
+)
+
+SPEECH_TOKENS_PER_SEC = 25     # S3 speech token rate
+DEFAULT_RELOAD_COST = 30.0     # Seconds, until a load has been measured
+
+
+def estimate_tokens_in_text(text):
+    """Speech tokens a chunk of text is expected to produce"""
+    from modules.render_plan import estimate_speech_tokens
+    return estimate_speech_tokens(text or "")
+
+
+def welch_t(baseline, recent):
+    """Welch's t-statistic for mean(baseline) > mean(recent) (0 if either sample is too small)"""
+    if len(baseline) < 2 or len(recent) < 2:
+        return 0.0
+    se = math.sqrt(variance(baseline) / len(baseline) + variance(recent) / len(recent))
+    if se == 0:
+        return math.inf if mean(baseline) > mean(recent) else 0.0
+    return (mean(baseline) - mean(recent)) / se
+
+
+class SmartReloadManager:
+    """Per-run throughput and memory tracking with reload decisions"""
+
+    def __init__(self, device=None):
+        self.device = device
+        self._lock = threading.Lock()
+        self.reload_cost = None
+        self.reloads = []
+        self._start_epoch(0)
+
+    def _start_epoch(self, chunk_idx):
+        self.epoch_start = chunk_idx
+        self.chunks_since_reload = 0
+        self.baseline = []
+        self.recent = []
+        self.baseline_memory = None
+        self.memory = None
+        self.tokens_seen = 0
+        self.seconds_seen = 0.0
+
+    def _memory(self):
+        if self.device is None:
+            return None
+        try:
+            from modules.batch_controller import current_memory
+            return current_memory(self.device)
+        except Exception:
+            return None
+
+    def set_load_cost(self, seconds):
+        """Cost of loading (and prewarming) the model, measured at the start of the run"""
+        with self._lock:
+            if seconds > 0:
+                self.reload_cost = seconds
+
+    def track_chunk(self, chunk_idx, seconds, tokens):
+        """Record one rendered chunk: wall seconds it took and speech tokens it produced"""
+        with self._lock:
+            self.chunks_since_reload += 1
+            if seconds <= 0 or tokens <= 0:
+                return
+            self.tokens_seen += tokens
+            self.seconds_seen += seconds
+            if self.chunks_since_reload <= SMART_RELOAD_WARMUP_CHUNKS:
+                return
+            rate = tokens / seconds
+            self.memory = self._memory()
+            if len(self.baseline) < SMART_RELOAD_WINDOW:
+                self.baseline.append(rate)
+                if len(self.baseline) == SMART_RELOAD_WINDOW and self.memory is not None:
+                    self.baseline_memory = self.memory
+            else:
+                self.recent.append(rate)
+                del self.recent[:-SMART_RELOAD_WINDOW]
+
+    def _memory_growth_mb(self):
+        if self.memory is None or self.baseline_memory is None:
+            return 0.0
+        return (self.memory - self.baseline_memory) / (1024 * 1024)
+
+    def get_statistics(self):
+        with self._lock:
+            baseline = median(self.baseline) if len(self.baseline) == SMART_RELOAD_WINDOW else None
+            current = mean(self.recent) if len(self.recent) >= 2 else None
+            degradation = (baseline - current) / baseline * 100 if baseline and current else 0.0
+            return {
+                "baseline_performance": baseline,
+                "current_performance": current,
+                "performance_degradation_pct": degradation,
+                "chunks_since_reload": self.chunks_since_reload,
+                "memory_growth_mb": self._memory_growth_mb(),
+                "reload_cost": self.reload_cost,
+                "reloads": len(self.reloads),
+            }
+
+    def should_reload(self, remaining_chunks):
+        """
+        Decide whether to reload before rendering `remaining_chunks` more chunks
+
+        Returns:
+            dict: should_reload, reason, degradation_pct, t_stat, memory_growth_mb and
+                economics (remaining_time, time_saved, reload_cost, roi)
+        """
+        with self._lock:
+            reload_cost = self.reload_cost or DEFAULT_RELOAD_COST
+            tokens_per_chunk = self.tokens_seen / self.chunks_since_reload if self.chunks_since_reload else 0
+            remaining_tokens = remaining_chunks * tokens_per_chunk
+            decision = {
+                "should_reload": False,
+                "reason": "",
+                "degradation_pct": 0.0,
+                "t_stat": 0.0,
+                "memory_growth_mb": self._memory_growth_mb(),
+                "economics": {"remaining_time": 0.0, "time_saved": 0.0, "reload_cost": reload_cost, "roi": 0.0},
+            }
+
+            if decision["memory_growth_mb"] >= SMART_RELOAD_MEMORY_GROWTH_MB and remaining_chunks > 0:
+                decision["should_reload"] = True
+                decision["reason"] = (f"memory grew {decision['memory_growth_mb']:.0f} MB since the last load "
+                                      f"(limit {SMART_RELOAD_MEMORY_GROWTH_MB} MB)")
+                return decision
+
+            if len(self.baseline) < SMART_RELOAD_WINDOW or len(self.recent) < SMART_RELOAD_WINDOW:
+                needed = 2 * SMART_RELOAD_WINDOW + SMART_RELOAD_WARMUP_CHUNKS
+                decision["reason"] = f"collecting samples ({self.chunks_since_reload}/{needed} chunks since load)"
+                return decision
+
+            baseline_rate, current_rate = median(self.baseline), mean(self.recent)
+            degradation = (baseline_rate - current_rate) / baseline_rate * 100
+            t_stat = welch_t(self.baseline, self.recent)
+            remaining_time = remaining_tokens / current_rate if current_rate > 0 else 0.0
+            time_saved = remaining_time - remaining_tokens / baseline_rate
+            roi = time_saved / reload_cost
+            decision.update(degradation_pct=degradation, t_stat=t_stat)
+            decision["economics"].update(remaining_time=remaining_time, time_saved=time_saved, roi=roi)
+
+            if degradation < SMART_RELOAD_MIN_DEGRADATION:
+                decision["reason"] = f"{degradation:.1f}% slowdown is below {SMART_RELOAD_MIN_DEGRADATION:.0f}%"
+            elif t_stat < SMART_RELOAD_T_THRESHOLD:
+                decision["reason"] = f"{degradation:.1f}% slowdown not significant (t={t_stat:.2f})"
+            elif roi < SMART_RELOAD_MIN_ROI:
+                decision["reason"] = (f"{degradation:.1f}% slowdown, but saving {time_saved:.0f}s over "
+                                      f"{remaining_chunks} chunks does not cover a {reload_cost:.0f}s reload")
+            else:
+                decision["should_reload"] = True
+                decision["reason"] = (f"{current_rate:.1f} tok/s vs baseline {baseline_rate:.1f} tok/s "
+                                      f"(t={t_stat:.2f}); reload saves ~{time_saved:.0f}s for {reload_cost:.0f}s")
+            return decision
+
+    def record_reload(self, chunk_idx, seconds=None):
+        """A reload happened before `chunk_idx`; start a new baseline and update the reload cost"""
+        with self._lock:
+            if seconds:
+                self.reload_cost = seconds if self.reload_cost is None else 0.5 * (self.reload_cost + seconds)
+            self.reloads.append((time.time(), chunk_idx, seconds))
+            logging.info(f"Smart reload at chunk {chunk_idx + 1}" + (f" took {seconds:.1f}s" if seconds else ""))
+            self._start_epoch(chunk_idx)
+
+
+_manager = SmartReloadManager()
+
+
+def get_reload_manager():
+    return _manager
+
+
+def reset_reload_manager(device=None):
+    """Fresh manager for a new run on `device`"""
+    global _manager
+    _manager = SmartReloadManager(device)
+    return _manager
+
+
+def set_model_load_cost(seconds):
+    _manager.set_load_cost(seconds)
+
+
+def track_chunk_performance(chunk_idx, seconds, tokens):
+    _manager.track_chunk(chunk_idx, seconds, tokens)
+
+
+def should_reload_model(remaining_chunks):
+    return _manager.should_reload(remaining_chunks)
+
+
+def record_model_reload(chunk_idx, seconds=None):
+    _manager.record_reload(chunk_idx, seconds)
@@ -0,0 +1,99 @@
+"""
+Startup Import Profiler
+=======================
+
+`--profile-startup` for the CLI and GUI entry points. The target modules are
+re-imported in a fresh interpreter under `python -X importtime`, and the import
+log is rendered as a cumulative-time tree, so you can see which import makes a
+command slow to start.
+
+    python main_launcher.py --profile-startup            # menu startup
+    python main_launcher.py --profile-startup repair     # menu + repair tool imports
+    python chatterbox_gui.py --profile-startup
+"""
+
+import re
+import sys
+import subprocess
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def collect_import_times(modules):
+    """
+    Import `modules` in a clean interpreter and parse its -X importtime log
+
+    Returns:
+        list: (depth, module, self_us, cumulative_us) in import order
+    """
+    code = "; ".join(f"import {m}" for m in modules) or "pass"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, cwd=str(PROJECT_ROOT))
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cum_us, indent, name = match.groups()
+            rows.append(((len(indent) - 1) // 2, name, int(self_us), int(cum_us)))
+    if result.returncode != 0:
+        tail = [l for l in result.stderr.splitlines() if not l.startswith("import time:")]
+        print("\n".join(tail[-8:]))
+    return rows
+
+
+def build_tree(rows):
+    """
+    Nest the flat importtime rows (children are logged before their parent)
+
+    Returns:
+        list: root nodes, each {"name", "self_us", "cum_us", "children"}
+    """
+    pending = {}  # depth -> children waiting for their parent
+    roots = []
+    for depth, name, self_us, cum_us in rows:
+        node = {"name": name, "self_us": self_us, "cum_us": cum_us,
+                "children": pending.pop(depth + 1, [])}
+        if depth == 0:
+            roots.append(node)
+        else:
+            pending.setdefault(depth, []).append(node)
+    return roots
+
+
+def format_tree(roots, min_ms=5.0, max_depth=6):
+    """Render nodes at or above `min_ms` cumulative time, slowest first within a level"""
+    lines = []
+
+    def walk(node, prefix, depth):
+        cum_ms = node["cum_us"] / 1000.0
+        lines.append(f"{cum_ms:9.1f} ms {node['self_us'] / 1000.0:8.1f} ms  {prefix}{node['name']}")
+        if depth >= max_depth:
+            return
+        for child in sorted(node["children"], key=lambda n: -n["cum_us"]):
+            if child["cum_us"] / 1000.0 >= min_ms:
+                walk(child, prefix + "  ", depth + 1)
+
+    for root in sorted(roots, key=lambda n: -n["cum_us"]):
+        if root["cum_us"] / 1000.0 >= min_ms:
+            walk(root, "", 1)
+    return lines
+
+
+def profile_startup(modules, label="startup", min_ms=5.0, max_depth=6):
+    """Print the import-time tree for importing `modules`; returns total seconds"""
+    rows = collect_import_times(modules)
+    roots = build_tree(rows)
+    total_us = sum(r["cum_us"] for r in roots)
+    print(f"\n⏱️  Import profile: {label} ({', '.join(modules)})")
+    print(f"{'cumulative':>12} {'self':>11}  module (≥ {min_ms:g} ms shown)")
+    for line in format_tree(roots, min_ms, max_depth):
+        print(line)
+    print(f"\nTotal import time: {total_us / 1e6:.2f}s across {len(rows)} modules")
+    heavy = [name for name in ("torch", "torchaudio", "transformers", "librosa", "PyQt5", "whisper")
+             if any(r[1] == name for r in rows)]
+    if heavy:
+        print(f"Heavy packages loaded: {', '.join(heavy)}")
+    return total_us / 1e6
@@ -100,6 +100,15 @@ from modules.file_manager import (
     combine_audio_chunks, get_audio_files_in_directory, convert_to_m4b, add_metadata_to_m4b
 )
 from modules.progress_tracker import setup_logging, log_chunk_progress, log_run
+from modules.chunk_journal import ChunkJournal, write_chunk_atomic, total_chunk_duration, chunk_written, use_pack
+from modules.chunk_pack import ChunkPack
+from modules.watermark import apply_deferred_watermark, chunk_watermark_disabled
+from modules.batch_controller import get_batch_controller, is_oom_error, log_batch_controller_summary
+from modules.smart_reload_manager import (
+    reset_reload_manager, should_reload_model, record_model_reload, track_chunk_performance,
+    estimate_tokens_in_text, set_model_load_cost, SPEECH_TOKENS_PER_SEC,
+)
+from modules.quality_gate import get_quality_gate, reset_quality_gate
 
 # Global shutdown flag
 shutdown_requested = False
@@ -280,8 +289,14 @@ def monitor_vram_usage(operation_name=""):
         return allocated, reserved
     return 0, 0
 
-def get_optimal_workers():
+def get_optimal_workers(device=None):
     """Dynamic worker allocation based on VRAM usage"""
+    if device == "cpu" and USE_CPU_TUNING:
+        # torch already spreads one generation over the tuned thread count; more
+        # generation threads would only oversubscribe the cores
+        from modules.cpu_tuning import load_profile
+        if load_profile():
+            return 1
     if not USE_DYNAMIC_WORKERS:
         return MAX_WORKERS
 
@@ -433,6 +448,11 @@ def load_optimized_model(device, *, force_reload: bool = False):
 
     logging.info("🚀 Loading ChatterboxTTS with REAL performance optimizations...")
 
+    # CPU thread layout from this host's autotuned profile (modules/cpu_tuning.py)
+    if device == 'cpu' and USE_CPU_TUNING:
+        from modules.cpu_tuning import apply_cpu_tuning
+        apply_cpu_tuning()
+
 
 
     # Global cache: reuse existing model if same device
@@ -531,12 +551,14 @@ def process_batch(
     voice_path, tts_params, start_time, total_chunks,
     punc_norm, basename, log_run_func, log_path, device,
     model, asr_model, seed=0,
-    enable_asr=None
+    enable_asr=None, asr_service=None
 ):
     if seed != 0:
         set_seed(seed)
     """
     Process a batch of chunks using the batch-enabled TTS model.
+
+    With `asr_service`, each written chunk is queued for ASR validation.
     """
     from pydub import AudioSegment
     import io
@@ -549,6 +571,7 @@ def process_batch(
     shared_tts_params = batch[0].get("tts_params", tts_params)
     supported_params = {"exaggeration", "cfg_weight", "temperature", "min_p", "top_p", "repetition_penalty"}
     tts_args = {k: v for k, v in shared_tts_params.items() if k in supported_params}
+    tts_args["disable_watermark"] = chunk_watermark_disabled()
 
     # 2. Generate audio in a batch (heuristic: only if lengths are similar and group size >1)
     try_batch = True
@@ -580,29 +603,40 @@ def process_batch(
     except Exception:
         try_batch = True
 
+    token_counts = []
     if try_batch:
         try:
             with torch.no_grad():
                 # Try full batch with OOM backoff
                 import gc as _gc
+                def generate_counted(text_list):
+                    # T3 speech-token counts of each successful call, in output order
+                    subwavs = model.generate_batch(text_list, **tts_args)
+                    token_counts.extend(_speech_token_counts(model, len(subwavs)))
+                    return subwavs
                 def gen_with_backoff(text_list):
+                    if ENABLE_ADAPTIVE_BATCHING:
+                        # Sub-batch size chosen from measured throughput and peak memory
+                        controller = get_batch_controller(
+                            device, float(tts_args.get("cfg_weight", 0.0)) > 0.0, _adaptive_initial_size(device))
+                        return controller.run(text_list, generate_counted, model.sr)
                     size = len(text_list)
                     bs = size
                     results = []
                     while bs >= 1:
                         try:
                             if bs == size:
-                                return model.generate_batch(text_list, **tts_args)
+                                return generate_counted(text_list)
                             else:
                                 results.clear()
+                                token_counts.clear()
                                 for j in range(0, size, bs):
                                     subtexts = text_list[j:j+bs]
-                                    subwavs = model.generate_batch(subtexts, **tts_args)
+                                    subwavs = generate_counted(subtexts)
                                     results.extend(subwavs)
                                 return results
-                        except RuntimeError as _e:
-                            msg = str(_e).lower()
-                            if 'out of memory' in msg or 'cuda oom' in msg:
+                        except (RuntimeError, MemoryError) as _e:
+                            if is_oom_error(_e):
                                 try:
                                     if torch.cuda.is_available():
                                         torch.cuda.empty_cache()
@@ -610,7 +644,7 @@ def process_batch(
                                     pass
                                 _gc.collect()
                                 new_bs = max(1, bs // 2)
-                                logging.warning(f"⚠️ CUDA OOM at microbatch={bs}. Retrying with {new_bs}.")
+                                logging.warning(f"⚠️ OOM at microbatch={bs}. Retrying with {new_bs}.")
                                 if new_bs == bs:
                                     # Cannot reduce further
                                     raise
@@ -637,7 +671,7 @@ def process_batch(
             chunk = chunk_data['text']
             boundary_type = chunk_data.get("boundary_type", "none")
             chunk_tts_params = chunk_data.get("tts_params", tts_params)
-            result = process_one_chunk(i, chunk, text_chunks_dir, audio_chunks_dir, voice_path, chunk_tts_params, start_time, total_chunks, punc_norm, basename, log_run_func, log_path, device, model, asr_model, boundary_type=boundary_type, enable_asr=enable_asr)
+            result = process_one_chunk(i, chunk, text_chunks_dir, audio_chunks_dir, voice_path, chunk_tts_params, start_time, total_chunks, punc_norm, basename, log_run_func, log_path, device, model, asr_model, boundary_type=boundary_type, enable_asr=enable_asr, asr_service=asr_service)
             results.append(result)
         return results
 
@@ -654,6 +688,8 @@ def process_batch(
             wav_tensor = wav_tensor.unsqueeze(0)
 
         wav_np = wav_tensor.squeeze().cpu().numpy()
+        speech_tokens = token_counts[i] if len(token_counts) == len(wavs) else None
+        gate_decision = _gate_take(wav_tensor.cpu(), chunk_data['text'], model.sr, chunk_id_str, speech_tokens)
         with io.BytesIO() as wav_buffer:
             sf.write(wav_buffer, wav_np, model.sr, format='wav')
             wav_buffer.seek(0)
@@ -670,30 +706,243 @@ def process_batch(
 
         # Final save
         final_path = audio_chunks_dir / f"chunk_{chunk_id_str}.wav"
-        final_audio.export(final_path, format="wav")
+        write_chunk_atomic(final_audio, final_path, chunk_data.get("tts_params", tts_params))
         logging.info(f"✅ Saved final chunk from batch: {final_path.name}")
+        if asr_service is not None:
+            asr_service.submit(chunk_index, final_audio, punc_norm(chunk_data['text']), final_path,
+                               tts_params=chunk_data.get("tts_params", tts_params))
 
         batch_results.append((chunk_index, final_path))
 
     return batch_results
 
+def _print_reload_decision(decision):
+    economics = decision['economics']
+    print(f"\n🧠 Smart reload triggered: {decision['reason']}")
+    print(f"   📊 Performance degradation: {decision['degradation_pct']:.1f}% (t={decision['t_stat']:.2f}), "
+          f"memory growth: {decision['memory_growth_mb']:.0f} MB")
+    print(f"   💰 Economics: saves ~{economics['time_saved']:.0f}s for a {economics['reload_cost']:.0f}s reload "
+          f"({economics['roi']:.1f}x ROI)")
+
+
+def _adaptive_initial_size(device):
+    """Starting micro-batch size for the batch controller (autotuned CPU size if any)"""
+    if str(device) == "cpu" and USE_CPU_TUNING:
+        from modules.cpu_tuning import worker_layout
+        return worker_layout()[2]
+    return None
+
+def _wav_to_audio_segment(wav, sr):
+    """Convert a generated wav tensor to an in-memory AudioSegment"""
+    import io
+    import soundfile as sf
+    from pydub import AudioSegment
+
+    wav_np = wav.squeeze().numpy()
+    with io.BytesIO() as wav_buffer:
+        sf.write(wav_buffer, wav_np, sr, format='wav')
+        wav_buffer.seek(0)
+        return AudioSegment.from_wav(wav_buffer)
+
+
+def _speech_token_counts(model, n_wavs):
+    """T3 speech-token count per wave of the model's last generate call (None where unknown)"""
+    counts = getattr(model, "last_speech_token_counts", None) or []
+    return list(counts) if len(counts) == n_wavs else [None] * n_wavs
+
+
+def _gate_take(wav, chunk, sr, chunk_id_str, speech_tokens=None):
+    """Quality gate decision for one take (None when the gate is disabled)
+
+    `speech_tokens` is T3's token count for the take; without it the gate
+    estimates the count from the audio length. With QUALITY_GATE_SAVE_TAKES the
+    take is also saved for evaluating the gate, even while the gate is off.
+    """
+    if QUALITY_GATE_SAVE_TAKES:
+        get_quality_gate().save_take(chunk_id_str, wav.squeeze().numpy(), sr, chunk, speech_tokens)
+    if not ENABLE_QUALITY_GATE:
+        return None
+    decision = get_quality_gate().assess(wav.squeeze().numpy(), sr, chunk, speech_tokens)
+    if decision["full"]:
+        risky = {name: round(c["risk"], 2) for name, c in decision["checks"].items() if c["risk"] > 0}
+        logging.info(f"🚦 {chunk_id_str}: risk {decision['risk']:.2f} ({decision['reason']}) {risky}")
+    return decision
+
+
+def _score_chunk_audio(wav, chunk, sr, asr_model, asr_enabled, punc_norm, chunk_id_str, gate_decision=None):
+    """
+    Score one generated take of a chunk (mid-drop, composite quality, ASR similarity).
+
+    With the quality gate on, takes its cheap checks consider low-risk skip the
+    mid-drop and spectral checks. ASR still runs when it is enabled; without it
+    such takes score 1.0.
+
+    Returns:
+        tuple: (audio_segment, quality_score, asr_score, asr_text)
+    """
+    audio_segment = _wav_to_audio_segment(wav, sr)
+
+    if gate_decision is None:
+        gate_decision = _gate_take(wav, chunk, sr, chunk_id_str)
+    # The gate only spares the signal/spectral checks; ASR runs whenever it is enabled
+    gate_passed = gate_decision is not None and not gate_decision["full"]
+    if gate_passed and not (asr_enabled and asr_model is not None):
+        return audio_segment, 1.0, 1.0, ""
+
+    # Enhanced quality validation
+    quality_score = 1.0  # Start with perfect score
+
+    if not gate_passed:
+        # Legacy mid-energy drop check (converted to score)
+        if ENABLE_MID_DROP_CHECK and has_mid_energy_drop(wav, sr):
+            quality_score *= 0.3  # Significant penalty for mid-drop
+            logging.info(f"⚠️ Mid-chunk energy drop detected in {chunk_id_str}")
+
+        # Enhanced quality validation (if enabled)
+        if ENABLE_REGENERATION_LOOP:
+            from modules.audio_processor import evaluate_chunk_quality
+            # Pass existing ASR model to avoid loading duplicate
+            # Without ASR for this chunk, pass no reference text (it would load its own ASR model)
+            composite_score = evaluate_chunk_quality(audio_segment, chunk if asr_enabled else None,
+                                                     include_spectral=True, asr_model=asr_model)
+            quality_score *= composite_score
+            logging.info(f"📊 Quality score for {chunk_id_str}: {quality_score:.3f} (composite: {composite_score:.3f})")
+
+    # ASR validation (memory-based processing)
+    asr_score = 1.0  # Default to passed if ASR disabled
+    asr_text = ""
+    if asr_enabled and asr_model is not None:
+        from modules.audio_processor import calculate_text_similarity, ASR_TRANSCRIBE_LOCK
+        try:
+            # Process ASR completely in memory - no disk writes
+            samples = np.array(audio_segment.get_array_of_samples())
+            if audio_segment.channels == 2:
+                samples = samples.reshape((-1, 2)).mean(axis=1)
+
+            # Normalize to float32 for ASR model
+            audio_np = samples.astype(np.float32) / audio_segment.max_possible_amplitude
+            with ASR_TRANSCRIBE_LOCK:
+                result = asr_model.transcribe(audio_np)
+
+            if not isinstance(result, dict) or "text" not in result:
+                raise ValueError(f"Invalid ASR result type: {type(result)}")
+
+            asr_text = result.get("text", "").strip()
+            asr_score = calculate_text_similarity(punc_norm(chunk), asr_text)
+            logging.info(f"🎤 ASR similarity for chunk {chunk_id_str}: {asr_score:.3f} - Expected: '{punc_norm(chunk)}' Got: '{asr_text}'")
+
+        except Exception as e:
+            logging.error(f"❌ ASR failed for {chunk_id_str}: {e}")
+            asr_score = 0.8  # Use neutral score instead of 0 to avoid regeneration
+
+        # Include ASR score in overall quality
+        quality_score *= asr_score
+
+    get_quality_gate().record_full(gate_decision, quality_score >= QUALITY_THRESHOLD)
+    return audio_segment, quality_score, asr_score, asr_text
+
+
+def _log_chunk_performance(i, chunk, seconds, wav, sr):
+    """Append a performance.log row (the audio_seconds column feeds the token budget calibration)"""
+    audio_seconds = wav.shape[-1] / sr if wav is not None else 0.0
+    with open("performance.log", "a") as perf_log:
+        perf_log.write(f"{i},{len(chunk)},{seconds:.4f},{audio_seconds:.3f}\n")
+
+
+def _generate_best_of_k(model, i, chunk, tts_args, k, asr_model, asr_enabled, punc_norm, chunk_id_str):
+    """
+    Generate K takes of a chunk in one batched T3 pass, score them all and keep the best.
+
+    Scoring runs per candidate in threads; Whisper calls on the shared ASR model
+    are serialized by ASR_TRANSCRIBE_LOCK. The kept candidate gets the chunk's
+    performance.log row, timed by the batched generation.
+
+    Take 1 uses the chunk's TTS params. The others use temperatures stepped
+    REGEN_TEMPERATURE_ADJUSTMENT below and above it (lower first, as the retry loop
+    does), passed per row to the batched sampler. The remaining params apply to the
+    whole call.
+
+    Returns:
+        tuple: (wav, audio_segment, quality_score, asr_score, asr_text), or None if the
+        chunk cannot be batched (inline pauses, long text) or batched generation failed,
+        in which case the caller uses the sequential regeneration loop.
+    """
+    from src.chatterbox.tts import parse_pause_tags
+
+    if not hasattr(model, 'generate_batch') or len(chunk) > 300:
+        return None
+    segments = parse_pause_tags(chunk)
+    if len(segments) != 1 or segments[0][1] != 0.0:
+        return None
+
+    base_temperature = float(tts_args.get("temperature", 0.8))
+    temperatures = []
+    for c in range(k):
+        step = (c + 1) // 2 * (-1 if c % 2 else 1)  # 0, -1, +1, -2, +2, ...
+        temperatures.append(min(TTS_PARAM_MAX_TEMPERATURE, max(TTS_PARAM_MIN_TEMPERATURE,
+                                base_temperature + step * REGEN_TEMPERATURE_ADJUSTMENT)))
+    batch_args = dict(tts_args, temperature=temperatures)
+
+    chunk_start_time = time.time()
+    try:
+        with torch.no_grad():
+            with _GPU_INFER_LOCK:
+                wavs = model.generate_batch([chunk] * k, **batch_args, disable_watermark=chunk_watermark_disabled())
+                token_counts = _speech_token_counts(model, len(wavs))
+    except Exception as e:
+        if "out of memory" in str(e).lower() and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        logging.warning(f"⚠️ Best-of-{k} generation failed for chunk {chunk_id_str}, using regeneration loop: {e}")
+        return None
+    if len(wavs) != k:
+        logging.warning(f"⚠️ Best-of-{k} returned {len(wavs)} candidates for chunk {chunk_id_str}, using regeneration loop")
+        return None
+    generation_seconds = time.time() - chunk_start_time
+    logging.info(f"🎲 Generated {len(wavs)} candidates for chunk {chunk_id_str} in {generation_seconds:.2f}s "
+                 f"(temperatures: {', '.join(f'{t:.2f}' for t in temperatures)})")
+
+    wavs = [w.detach().cpu() for w in wavs]
+    wavs = [w.unsqueeze(0) if w.dim() == 1 else w for w in wavs]
+
+    # CPU-side spectral scoring overlaps across candidates; ASR calls take turns
+    with ThreadPoolExecutor(max_workers=len(wavs)) as executor:
+        scored = list(executor.map(
+            lambda c: _score_chunk_audio(
+                wavs[c], chunk, model.sr, asr_model, asr_enabled, punc_norm, f"{chunk_id_str}#{c + 1}",
+                _gate_take(wavs[c], chunk, model.sr, f"{chunk_id_str}#{c + 1}", token_counts[c])),
+            range(len(wavs))
+        ))
+
+    best = max(range(len(scored)), key=lambda c: scored[c][1])
+    logging.info(f"🏆 Chunk {chunk_id_str}: kept candidate {best + 1}/{len(scored)} at temperature "
+                 f"{temperatures[best]:.2f} (scores: {', '.join(f'{s[1]:.3f}' for s in scored)})")
+    _log_chunk_performance(i, chunk, generation_seconds, wavs[best], model.sr)
+    return (wavs[best],) + scored[best]
+
+
 def process_one_chunk(
     i, chunk, text_chunks_dir, audio_chunks_dir,
     voice_path, tts_params, start_time, total_chunks,
     punc_norm, basename, log_run_func, log_path, device,
     model, asr_model, seed=0, boundary_type="none",
-    enable_asr=None
+    enable_asr=None, asr_service=None
 ):
     if seed != 0:
         set_seed(seed)
-    """Enhanced chunk processing with quality control, contextual silence, and deep cleanup"""
+    """Enhanced chunk processing with quality control, contextual silence, and deep cleanup
+
+    With `asr_service`, ASR runs in the resident ASR process after the chunk is
+    written instead of inline here.
+    """
     import difflib
     from pydub import AudioSegment
 
     chunk_id_str = f"{i+1:05}"
-    chunk_path = text_chunks_dir / f"chunk_{chunk_id_str}.txt"
-    with open(chunk_path, 'w', encoding='utf-8') as cf:
-        cf.write(chunk)
+    # Packed books keep chunk text in chunks_info.json only
+    if not use_pack(audio_chunks_dir):
+        chunk_path = text_chunks_dir / f"chunk_{chunk_id_str}.txt"
+        with open(chunk_path, 'w', encoding='utf-8') as cf:
+            cf.write(chunk)
 
     chunk_audio_path = audio_chunks_dir / f"chunk_{chunk_id_str}.wav"
 
@@ -777,10 +1026,28 @@ def process_one_chunk(
     # Enhanced regeneration loop with quality validation
     max_attempts = MAX_REGENERATION_ATTEMPTS if ENABLE_REGENERATION_LOOP else 2
     current_tts_params = tts_params.copy()
+    # Use parameter if provided, otherwise fall back to config (inline ASR only without the ASR service)
+    asr_enabled = (enable_asr if enable_asr is not None else ENABLE_ASR) and asr_service is None
+    final_quality = 1.0
 
     # Debug: Log the initial parameters for this chunk
     logging.info(f"🎛️ Chunk {chunk_id_str} initial TTS params: exag={current_tts_params.get('exaggeration', 'N/A'):.3f}, cfg={current_tts_params.get('cfg_weight', 'N/A'):.3f}, temp={current_tts_params.get('temperature', 'N/A'):.3f}, min_p={current_tts_params.get('min_p', 'N/A'):.3f}")
 
+    # Best-of-K: one batched pass with K candidates replaces sequential retries
+    if ENABLE_REGENERATION_LOOP and ENABLE_BEST_OF_K and BEST_OF_K_CANDIDATES > 1:
+        supported_params = {"exaggeration", "cfg_weight", "temperature", "min_p", "top_p", "repetition_penalty"}
+        tts_args = {k: v for k, v in current_tts_params.items() if k in supported_params}
+        best = _generate_best_of_k(model, i, chunk, tts_args, BEST_OF_K_CANDIDATES,
+                                   asr_model, asr_enabled, punc_norm, chunk_id_str)
+        if best is not None:
+            wav, final_audio, quality_score, asr_score, asr_text = best
+            if quality_score < QUALITY_THRESHOLD:
+                logging.info(f"⚠️ No candidate above threshold for {chunk_id_str}, accepting best effort (final score: {quality_score:.3f})")
+            best_sim = asr_score if asr_enabled else 1.0
+            best_asr_text = asr_text if asr_enabled else ""
+            final_quality = quality_score
+            max_attempts = 0  # Skip the sequential regeneration loop
+
     for attempt_num in range(max_attempts):
         logging.info(f"🔁 Starting TTS for chunk {chunk_id_str}, attempt {attempt_num + 1}/{max_attempts}")
         if attempt_num > 0:
@@ -788,6 +1055,7 @@ def process_one_chunk(
         
         wav = None
         audio_segment = None
+        speech_tokens = None
         try:
             # Filter to only supported ChatterboxTTS parameters
             supported_params = {"exaggeration", "cfg_weight", "temperature", "min_p", "top_p", "repetition_penalty"}
@@ -798,7 +1066,8 @@ def process_one_chunk(
                 with torch.no_grad():
                     # Serialize GPU inference to prevent CUDA allocator internal asserts under multithreading
                     with _GPU_INFER_LOCK:
-                        wav = model.generate(chunk, **tts_args, disable_watermark=True).detach().cpu()
+                        wav = model.generate(chunk, **tts_args, disable_watermark=chunk_watermark_disabled()).detach().cpu()
+                        speech_tokens = _speech_token_counts(model, 1)[0]
             except RuntimeError as e:
                 if "probability tensor contains either" in str(e):
                     logging.warning(f"⚠️ Chunk {chunk_id_str} failed in mixed precision. Retrying in FP32...")
@@ -807,14 +1076,14 @@ def process_one_chunk(
                     with optimizer.fp32_fallback_mode():
                         with torch.no_grad():
                             with _GPU_INFER_LOCK:
-                                wav = model.generate(chunk, **tts_args, disable_watermark=True).detach().cpu()
+                                wav = model.generate(chunk, **tts_args, disable_watermark=chunk_watermark_disabled()).detach().cpu()
+                                speech_tokens = _speech_token_counts(model, 1)[0]
                     logging.info(f"✅ Chunk {chunk_id_str} successfully generated in FP32 fallback mode.")
                 else:
                     raise # Re-raise other runtime errors
             
             chunk_processing_time = time.time() - chunk_start_time
-            with open("performance.log", "a") as perf_log:
-                perf_log.write(f"{i},{len(chunk)},{chunk_processing_time:.4f}\n")
+            _log_chunk_performance(i, chunk, chunk_processing_time, wav, model.sr)
 
             if wav is None:
                 raise RuntimeError("Waveform is None after generation attempt.")
@@ -822,63 +1091,10 @@ def process_one_chunk(
             if wav.dim() == 1:
                 wav = wav.unsqueeze(0)
 
-            # Convert tensor to AudioSegment for in-memory processing
-            import io
-            import soundfile as sf
-            from pydub import AudioSegment
-
-            # Convert wav tensor to AudioSegment (in memory)
-            wav_np = wav.squeeze().numpy()
-            with io.BytesIO() as wav_buffer:
-                sf.write(wav_buffer, wav_np, model.sr, format='wav')
-                wav_buffer.seek(0)
-                audio_segment = AudioSegment.from_wav(wav_buffer)
-
-            # Enhanced quality validation
-            quality_score = 1.0  # Start with perfect score
-
-            # Legacy mid-energy drop check (converted to score)
-            if ENABLE_MID_DROP_CHECK and has_mid_energy_drop(wav, model.sr):
-                quality_score *= 0.3  # Significant penalty for mid-drop
-                logging.info(f"⚠️ Mid-chunk energy drop detected in {chunk_id_str}")
-
-            # Enhanced quality validation (if enabled)
-            if ENABLE_REGENERATION_LOOP:
-                from modules.audio_processor import evaluate_chunk_quality
-                # Pass existing ASR model to avoid loading duplicate
-                composite_score = evaluate_chunk_quality(audio_segment, chunk, include_spectral=True, asr_model=asr_model)
-                quality_score *= composite_score
-                logging.info(f"📊 Quality score for {chunk_id_str}: {quality_score:.3f} (composite: {composite_score:.3f})")
-
-            # ASR validation (memory-based processing)
-            asr_score = 1.0  # Default to passed if ASR disabled
-            # Use parameter if provided, otherwise fall back to config
-            asr_enabled = enable_asr if enable_asr is not None else ENABLE_ASR
-            if asr_enabled and asr_model is not None:
-                from modules.audio_processor import calculate_text_similarity
-                try:
-                    # Process ASR completely in memory - no disk writes
-                    samples = np.array(audio_segment.get_array_of_samples())
-                    if audio_segment.channels == 2:
-                        samples = samples.reshape((-1, 2)).mean(axis=1)
-
-                    # Normalize to float32 for ASR model
-                    audio_np = samples.astype(np.float32) / audio_segment.max_possible_amplitude
-                    result = asr_model.transcribe(audio_np)
-
-                    if not isinstance(result, dict) or "text" not in result:
-                        raise ValueError(f"Invalid ASR result type: {type(result)}")
-
-                    asr_text = result.get("text", "").strip()
-                    asr_score = calculate_text_similarity(punc_norm(chunk), asr_text)
-                    logging.info(f"🎤 ASR similarity for chunk {chunk_id_str}: {asr_score:.3f} - Expected: '{punc_norm(chunk)}' Got: '{asr_text}'")
-
-                except Exception as e:
-                    logging.error(f"❌ ASR failed for {chunk_id_str}: {e}")
-                    asr_score = 0.8  # Use neutral score instead of 0 to avoid regeneration
-
-                # Include ASR score in overall quality
-                quality_score *= asr_score
+            gate_decision = _gate_take(wav, chunk, model.sr, chunk_id_str, speech_tokens)
+            audio_segment, quality_score, asr_score, asr_text = _score_chunk_audio(
+                wav, chunk, model.sr, asr_model, asr_enabled, punc_norm, chunk_id_str, gate_decision
+            )
 
             # Final quality check with all validations
             if quality_score >= QUALITY_THRESHOLD or attempt_num == max_attempts - 1:
@@ -890,7 +1106,8 @@ def process_one_chunk(
                 # Quality acceptable or max attempts reached, continue with processing
                 final_audio = audio_segment
                 best_sim = asr_score if asr_enabled else 1.0
-                best_asr_text = asr_text if asr_enabled and 'asr_text' in locals() else ""
+                best_asr_text = asr_text if asr_enabled else ""
+                final_quality = quality_score
                 break
             else:
                 # Quality too low, adjust parameters for retry
@@ -931,8 +1148,11 @@ def process_one_chunk(
 
     # Final save - only disk write in entire process
     final_path = audio_chunks_dir / f"chunk_{chunk_id_str}.wav"
-    final_audio.export(final_path, format="wav")
+    asr_record = {"text": best_asr_text, "score": round(float(best_sim), 4)} if asr_enabled else None
+    write_chunk_atomic(final_audio, final_path, tts_params, asr=asr_record)
     logging.info(f"✅ Saved final chunk: {final_path.name}")
+    if asr_service is not None:
+        asr_service.submit(i, final_audio, punc_norm(chunk), final_path, final_quality, current_tts_params)
 
     # Emit one per-chunk sampling summary to console
     try:
@@ -951,7 +1171,7 @@ def process_one_chunk(
     # Log details - only log ASR failures
     if asr_enabled and best_sim < 0.8:
         log_run_func(f"ASR VALIDATION FAILED - Chunk {chunk_id_str}:\nExpected:\n{chunk}\nActual:\n{best_asr_text}\nSimilarity: {best_sim:.3f}\n" + "="*50, log_path)
-    elif not asr_enabled:
+    elif not asr_enabled and asr_service is None:
         log_run_func(f"Chunk {chunk_id_str}: Original text: {chunk}", log_path)
 
     # Silence already added in memory above - no disk processing needed
@@ -971,207 +1191,16 @@ def process_one_chunk(
 # MAIN BOOK PROCESSING FUNCTION
 # ============================================================================
 
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from wrapper.chunk_loader import save_chunks
+# Chunk preparation (VADER enrichment) lives in a torch-free module so text prep starts fast
+from modules.chunk_enrichment import smooth_sentiment_scores, generate_enriched_chunks
 
-def smooth_sentiment_scores(scores, index, method="rolling", window=3):
-    """
-    Apply sentiment smoothing to prevent harsh emotional transitions.
-
-    Args:
-        scores: List of compound sentiment scores
-        index: Current chunk index
-        method: "rolling" for moving average, "exp_decay" for exponential decay
-        window: Number of previous chunks to consider
+def create_parameter_microbatches(chunks, max_batch=None):
+    """Group chunks by their rounded TTS parameters for micro-batching efficiency.
 
-    Returns:
-        float: Smoothed sentiment score
+    `max_batch` overrides the per-batch cap (e.g. the autotuned CPU micro-batch size).
+    With ENABLE_ADAPTIVE_BATCHING, groups go up to ADAPTIVE_BATCH_MAX chunks of similar
+    length and process_batch's controller splits them.
     """
-    if index == 0:
-        return scores[0]
-
-    start_idx = max(0, index - window + 1)
-    window_scores = scores[start_idx:index + 1]
-
-    if method == "rolling":
-        return sum(window_scores) / len(window_scores)
-    elif method == "exp_decay":
-        weights = SENTIMENT_EXP_DECAY_WEIGHTS[:len(window_scores)]
-        weighted_sum = sum(w * s for w, s in zip(weights, reversed(window_scores)))
-        weight_sum = sum(weights[:len(window_scores)])
-        return weighted_sum / weight_sum if weight_sum > 0 else window_scores[-1]
-    else:
-        return scores[index]  # No smoothing
-
-def generate_enriched_chunks(text_file, output_dir, user_tts_params=None, quality_params=None, config_params=None, voice_name=None):
-    """Reads a text file, performs VADER sentiment analysis, and returns enriched chunks."""
-    analyzer = SentimentIntensityAnalyzer()
-
-    # Extract quality parameters for JSON generation (GUI overrides config)
-    if quality_params:
-        enable_smoothing = quality_params.get('sentiment_smoothing', ENABLE_SENTIMENT_SMOOTHING)
-        smoothing_window = quality_params.get('smoothing_window', SENTIMENT_SMOOTHING_WINDOW)
-        smoothing_method = quality_params.get('smoothing_method', SENTIMENT_SMOOTHING_METHOD)
-        print(f"🔧 JSON Generation: Using GUI smoothing settings - Enabled: {enable_smoothing}, Window: {smoothing_window}, Method: {smoothing_method}")
-    else:
-        enable_smoothing = ENABLE_SENTIMENT_SMOOTHING
-        smoothing_window = SENTIMENT_SMOOTHING_WINDOW
-        smoothing_method = SENTIMENT_SMOOTHING_METHOD
-        print(f"🔧 JSON Generation: Using config smoothing settings - Enabled: {enable_smoothing}")
-
-    # Extract VADER sensitivity parameters (GUI overrides config)
-    if config_params:
-        vader_exag_sensitivity = config_params.get('vader_exag_sensitivity', VADER_EXAGGERATION_SENSITIVITY)
-        vader_cfg_sensitivity = config_params.get('vader_cfg_sensitivity', VADER_CFG_WEIGHT_SENSITIVITY)
-        vader_temp_sensitivity = config_params.get('vader_temp_sensitivity', VADER_TEMPERATURE_SENSITIVITY)
-        print(f"🔧 JSON Generation: Using GUI VADER sensitivity - Exag: {vader_exag_sensitivity}, CFG: {vader_cfg_sensitivity}, Temp: {vader_temp_sensitivity}")
-    else:
-        vader_exag_sensitivity = VADER_EXAGGERATION_SENSITIVITY
-        vader_cfg_sensitivity = VADER_CFG_WEIGHT_SENSITIVITY
-        vader_temp_sensitivity = VADER_TEMPERATURE_SENSITIVITY
-        print(f"🔧 JSON Generation: Using config VADER sensitivity - Exag: {vader_exag_sensitivity}, CFG: {vader_cfg_sensitivity}, Temp: {vader_temp_sensitivity}")
-
-    raw_text = text_file.read_text(encoding='utf-8')
-    cleaned = smart_punctuate(raw_text)
-    # Allow GUI/runtime overrides for chunk sizing via config_params
-    try:
-        max_words_override = None
-        min_words_override = None
-        if config_params:
-            max_words_override = int(config_params.get('max_chunk_words', MAX_CHUNK_WORDS))
-            min_words_override = int(config_params.get('min_chunk_words', MIN_CHUNK_WORDS))
-        chunks = sentence_chunk_text(
-            cleaned,
-            max_words=max_words_override if max_words_override is not None else MAX_CHUNK_WORDS,
-            min_words=min_words_override if min_words_override is not None else MIN_CHUNK_WORDS,
-        )
-    except Exception:
-        # Fallback to config defaults if overrides invalid
-        chunks = sentence_chunk_text(cleaned)
-
-    # Use user-provided parameters as base, or fall back to config defaults
-    if user_tts_params:
-        base_exaggeration = user_tts_params.get('exaggeration', BASE_EXAGGERATION)
-        base_cfg_weight = user_tts_params.get('cfg_weight', BASE_CFG_WEIGHT)
-        base_temperature = user_tts_params.get('temperature', BASE_TEMPERATURE)
-        base_min_p = user_tts_params.get('min_p', DEFAULT_MIN_P)
-        base_top_p = user_tts_params.get('top_p', DEFAULT_TOP_P)
-        base_repetition_penalty = user_tts_params.get('repetition_penalty', DEFAULT_REPETITION_PENALTY)
-        use_vader = user_tts_params.get('use_vader', True)  # Default to True for backward compatibility
-
-    else:
-        base_exaggeration = BASE_EXAGGERATION
-        base_cfg_weight = BASE_CFG_WEIGHT
-        base_temperature = BASE_TEMPERATURE
-        base_min_p = DEFAULT_MIN_P
-        base_top_p = DEFAULT_TOP_P
-        base_repetition_penalty = DEFAULT_REPETITION_PENALTY
-        use_vader = True  # Default behavior
-
-    enriched = []
-    chunk_texts = [chunk_text for chunk_text, _ in chunks]
-
-    # First pass: collect all sentiment scores
-    raw_sentiment_scores = []
-    for chunk_text, _ in chunks:
-        sentiment_scores = analyzer.polarity_scores(chunk_text)
-        raw_sentiment_scores.append(sentiment_scores['compound'])
-
-    # Second pass: apply smoothing and generate parameters
-    for i, (chunk_text, is_para_end) in enumerate(chunks):
-        # Get original sentiment score
-        raw_compound_score = raw_sentiment_scores[i]
-
-        # Apply sentiment smoothing if enabled (uses GUI settings, not config)
-        if use_vader and enable_smoothing:
-            compound_score = smooth_sentiment_scores(
-                raw_sentiment_scores,
-                i,
-                method=smoothing_method,
-                window=smoothing_window
-            )
-            # Debug: Log sentiment changes
-            if abs(compound_score - raw_compound_score) > 0.1:
-                logging.info(f"📊 Chunk {i+1:05}: sentiment smoothed {raw_compound_score:.3f} → {compound_score:.3f}")
-        else:
-            compound_score = raw_compound_score
-
-        if use_vader:
-            # Apply VADER sentiment adjustments using smoothed score
-            exaggeration = base_exaggeration + (compound_score * vader_exag_sensitivity)
-            cfg_weight = base_cfg_weight + (compound_score * vader_cfg_sensitivity)
-            temperature = base_temperature + (compound_score * vader_temp_sensitivity)
-            min_p = base_min_p + (compound_score * VADER_MIN_P_SENSITIVITY)
-            repetition_penalty = base_repetition_penalty + (compound_score * VADER_REPETITION_PENALTY_SENSITIVITY)
-
-            # Clamp values to defined min/max (ensure JSON values respect bounds)
-            exaggeration = round(max(TTS_PARAM_MIN_EXAGGERATION, min(exaggeration, TTS_PARAM_MAX_EXAGGERATION)), 2)
-            cfg_weight = round(max(TTS_PARAM_MIN_CFG_WEIGHT, min(cfg_weight, TTS_PARAM_MAX_CFG_WEIGHT)), 2)
-            temperature = round(max(TTS_PARAM_MIN_TEMPERATURE, min(temperature, TTS_PARAM_MAX_TEMPERATURE)), 2)
-            min_p = round(max(TTS_PARAM_MIN_MIN_P, min(min_p, TTS_PARAM_MAX_MIN_P)), 3)
-            repetition_penalty = round(max(TTS_PARAM_MIN_REPETITION_PENALTY, min(repetition_penalty, TTS_PARAM_MAX_REPETITION_PENALTY)), 1)
-
-            # Debug: Log VADER-adjusted parameters for significant changes
-            if abs(exaggeration - base_exaggeration) > 0.05 or abs(cfg_weight - base_cfg_weight) > 0.05:
-                logging.info(f"🎭 Chunk {i+1:05}: VADER adjusted params - exag: {base_exaggeration:.2f}→{exaggeration:.2f}, cfg: {base_cfg_weight:.2f}→{cfg_weight:.2f}, sentiment: {compound_score:.3f}")
-        else:
-            # Use fixed base values (no VADER adjustment)
-            exaggeration = base_exaggeration
-            cfg_weight = base_cfg_weight
-            temperature = base_temperature
-            min_p = base_min_p
-            repetition_penalty = base_repetition_penalty
-
-        boundary_type = detect_content_boundaries(chunk_text, i, chunk_texts, is_para_end)
-
-        enriched.append({
-            "index": i,
-            "text": chunk_text,
-            "word_count": len(chunk_text.split()),
-            "boundary_type": boundary_type if boundary_type else "none",
-            "sentiment_compound": compound_score,  # Store smoothed score
-            "sentiment_raw": raw_compound_score,   # Store original score for reference
-            "tts_params": {
-                "exaggeration": exaggeration,
-                "cfg_weight": cfg_weight,
-                "temperature": temperature,
-                "min_p": min_p,
-                "top_p": base_top_p,  # Top-P remains constant (not adjusted by VADER)
-                "repetition_penalty": repetition_penalty
-            }
-        })
-
-    output_json_path = output_dir / "chunks_info.json"
-
-    # Add voice metadata if provided
-    if voice_name:
-        # Try metadata method first
-        try:
-            # Create metadata entry as first element
-            metadata = {
-                "_metadata": True,
-                "voice_used": voice_name,
-                "generation_timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "total_chunks": len(enriched)
-            }
-            enriched_with_metadata = [metadata] + enriched
-            save_chunks(output_json_path, enriched_with_metadata)
-            print(f"✅ Saved voice metadata: {voice_name}")
-        except Exception as e:
-            # Fallback to comment method if metadata fails
-            print(f"⚠️ Metadata method failed, using comment fallback: {e}")
-            save_chunks(output_json_path, enriched)
-
-            # Add voice as comment
-            from modules.voice_detector import add_voice_to_json
-            add_voice_to_json(output_json_path, voice_name, method="comment")
-    else:
-        save_chunks(output_json_path, enriched)
-
-    return enriched
-
-def create_parameter_microbatches(chunks):
-    """Group chunks by their rounded TTS parameters for micro-batching efficiency."""
     from collections import defaultdict
 
     # Group chunks by their TTS parameter combination
@@ -1202,49 +1231,31 @@ def create_parameter_microbatches(chunks):
         # SORT BY LENGTH - THE MISSING PIECE
         chunks_in_group.sort(key=lambda c: len(c.get('text', '')))
 
+        if ENABLE_ADAPTIVE_BATCHING:
+            # Larger groups of similar length; the batch controller picks the sub-batch size
+            ratio = float(os.environ.get('GENTTS_MICROBATCH_LEN_RATIO', '1.8'))
+            batch = []
+            for chunk in chunks_in_group:
+                if batch and (len(batch) >= ADAPTIVE_BATCH_MAX or
+                              len(chunk.get('text', '')) > ratio * max(1, len(batch[0].get('text', '')))):
+                    chunk_batches.append(batch)
+                    batch = []
+                batch.append(chunk)
+            if batch:
+                chunk_batches.append(batch)
+            continue
+
         # Split large groups into smaller batches to avoid memory issues
         # Use smaller microbatch when CFG is enabled (effective 2×B)
-        max_microbatch_size = 4 if (float(cfg) > 0.0) else 8
+        max_microbatch_size = max_batch or (4 if (float(cfg) > 0.0) else 8)
         for i in range(0, len(chunks_in_group), max_microbatch_size):
             batch = chunks_in_group[i:i + max_microbatch_size]
             chunk_batches.append(batch)
 
     return chunk_batches
 
-def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=False, enable_asr=None, quality_params=None, config_params=None, specific_text_file=None):
-    """Enhanced book processing with batch processing to prevent hangs"""
-
-    # Hard reset barrier at conversion start: behave like a fresh launch
-    # 1) Release any cached model and voice conditionals
-    try:
-        clear_voice_cache()
-        _release_global_tts_model()
-    except Exception:
-        pass
-
-    # 2) Aggressive CUDA + host cleanup (no extra console noise)
-    try:
-        if torch.cuda.is_available():
-            torch.cuda.synchronize()
-            torch.cuda.empty_cache()
-            torch.cuda.ipc_collect()
-            if hasattr(torch.cuda, 'reset_peak_memory_stats'):
-                torch.cuda.reset_peak_memory_stats()
-            if hasattr(torch._C, '_cuda_clearCublasWorkspaces'):
-                torch._C._cuda_clearCublasWorkspaces()
-    except Exception:
-        pass
-    try:
-        import gc
-        gc.collect(); gc.collect()
-    except Exception:
-        pass
-
-    # Start terminal logging to capture all output
-    start_terminal_logging("term.log")
-
-    print(f"🔍 DEBUG: Entering process_book_folder with book_dir='{book_dir}', voice_path='{voice_path}'")
-
+def apply_runtime_overrides(quality_params=None, config_params=None):
+    """Apply GUI quality/config parameters over the config defaults (render worker processes call this too)"""
     # Apply GUI quality parameters to override config defaults
     if quality_params:
         print(f"🔧 Applying GUI quality parameters: {quality_params}")
@@ -1339,6 +1350,42 @@ def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=F
         except Exception as _e:
             print(f"⚠️ Failed to apply GUI runtime overrides: {_e}")
 
+def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=False, enable_asr=None, quality_params=None, config_params=None, specific_text_file=None):
+    """Enhanced book processing with batch processing to prevent hangs"""
+
+    # Hard reset barrier at conversion start: behave like a fresh launch
+    # 1) Release any cached model and voice conditionals
+    try:
+        clear_voice_cache()
+        _release_global_tts_model()
+    except Exception:
+        pass
+
+    # 2) Aggressive CUDA + host cleanup (no extra console noise)
+    try:
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+            torch.cuda.empty_cache()
+            torch.cuda.ipc_collect()
+            if hasattr(torch.cuda, 'reset_peak_memory_stats'):
+                torch.cuda.reset_peak_memory_stats()
+            if hasattr(torch._C, '_cuda_clearCublasWorkspaces'):
+                torch._C._cuda_clearCublasWorkspaces()
+    except Exception:
+        pass
+    try:
+        import gc
+        gc.collect(); gc.collect()
+    except Exception:
+        pass
+
+    # Start terminal logging to capture all output
+    start_terminal_logging("term.log")
+
+    print(f"🔍 DEBUG: Entering process_book_folder with book_dir='{book_dir}', voice_path='{voice_path}'")
+
+    apply_runtime_overrides(quality_params, config_params)
+
     from src.chatterbox.tts import punc_norm
     print(f"🔍 DEBUG: Successfully imported punc_norm")
 
@@ -1369,6 +1416,8 @@ def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=F
         # Clear audio chunks
         for wav_file in audio_chunks_dir.glob("*.wav"):
             wav_file.unlink(missing_ok=True)
+        ChunkJournal(audio_chunks_dir).reset()
+        ChunkPack(audio_chunks_dir).reset()
 
         # Clear logs
         for log_file in output_root.glob("*.log"):
@@ -1434,8 +1483,10 @@ def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=F
 
     # Reset smart reload manager for new session
     if ENABLE_SMART_RELOAD:
-        reset_reload_manager()
+        reset_reload_manager(device)
         print(f"🧠 Smart reload manager initialized")
+    if ENABLE_QUALITY_GATE or QUALITY_GATE_SAVE_TAKES:
+        reset_quality_gate(takes_dir=tts_dir / "gate_takes" if QUALITY_GATE_SAVE_TAKES else None)
 
     all_results = []
 
@@ -1459,22 +1510,105 @@ def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=F
     # Prepare voice sample compatibility once; reload model per-batch below
     compatible_voice = ensure_voice_sample_compatibility(voice_path, output_dir=tts_dir)
 
-    for batch_start in range(0, total_chunks, BATCH_SIZE):
+    # CPU render worker processes sharing one copy of the weights (modules/render_pool.py)
+    from modules.render_pool import render_pool_enabled, render_chunks_in_pool
+    pooled = render_pool_enabled(device)
+
+    # Autotuned CPU micro-batch size for in-process rendering (None = default caps)
+    cpu_batch_size = None
+    if str(device) == "cpu" and USE_CPU_TUNING:
+        from modules.cpu_tuning import worker_layout
+        cpu_batch_size = worker_layout()[2]
+
+    # Render plan: batch membership, order and predicted runtime (modules/render_plan.py)
+    render_plan = None
+    render_start = time.time()
+    use_vader = tts_params.get('use_vader', True)
+    if ENABLE_RENDER_PLAN:
+        from modules.render_plan import load_or_build_plan, describe_plan, plan_batches
+        if pooled:
+            from modules.cpu_tuning import worker_layout
+            plan_workers = worker_layout()[0]
+        else:
+            plan_workers = get_optimal_workers(device)
+        try:
+            # VADER mode renders chunk by chunk, so it is planned as batches of one
+            render_plan = load_or_build_plan(
+                text_chunks_dir, all_chunks, device=device, workers=plan_workers,
+                max_batch=1 if use_vader else (None if ENABLE_ADAPTIVE_BATCHING else cpu_batch_size),
+                sub_batch=cpu_batch_size if ENABLE_ADAPTIVE_BATCHING else None,
+            )
+            for line in describe_plan(render_plan):
+                print(line)
+        except Exception as e:
+            logging.warning(f"⚠️ Render plan failed, using default batching: {e}")
+            render_plan = None
+
+    if pooled:
+        model = load_optimized_model(device, force_reload=True)
+        model = prewarm_model_with_voice(model, compatible_voice, tts_params)
+        asr_enabled = enable_asr if enable_asr is not None else ENABLE_ASR
+        all_results, total_audio_duration = render_chunks_in_pool(model, all_chunks, {
+            "device": device,
+            "voice_path": str(voice_path),
+            "compatible_voice": str(compatible_voice),
+            "tts_params": tts_params,
+            "quality_params": quality_params,
+            "config_params": config_params,
+            "use_vader": tts_params.get('use_vader', True),
+            "asr_enabled": asr_enabled,
+            "asr_config": (config_params or {}).get('asr_config', {}),
+            "text_chunks_dir": str(text_chunks_dir),
+            "audio_chunks_dir": str(audio_chunks_dir),
+            "basename": book_dir.name,
+            "log_path": str(log_path),
+            "start_time": start_time,
+            "total_chunks": total_chunks,
+        }, ranges=None if render_plan is None or use_vader else plan_batches(render_plan, all_chunks))
+        del model
+
+    # Resident ASR process validating chunks while synthesis continues (modules/asr_service.py)
+    asr_service = None
+    if not pooled and ENABLE_RESIDENT_ASR and (enable_asr if enable_asr is not None else ENABLE_ASR):
+        from modules.asr_service import start_asr_service
+        asr_service = start_asr_service((config_params or {}).get('asr_config', {}), log_path)
+    chunks_by_index = {chunk.get("index", n): chunk for n, chunk in enumerate(all_chunks)}
+
+    def run_asr_regenerations(model, requests):
+        """Re-render chunks the ASR service sent back, with parameters adjusted for a retry"""
+        from modules.audio_processor import adjust_parameters_for_retry
+        for request in requests:
+            chunk_data = chunks_by_index.get(request["chunk"])
+            if chunk_data is None or shutdown_requested:
+                continue
+            retry_params = adjust_parameters_for_retry(request["tts_params"] or chunk_data.get("tts_params", tts_params),
+                                                       request["quality"], request["attempt"] - 1)
+            print(f"🎤 Regenerating chunk {request['chunk'] + 1:05} after ASR score {request['score']:.2f} "
+                  f"(attempt {request['attempt'] + 1}/{MAX_REGENERATION_ATTEMPTS})")
+            process_one_chunk(
+                request["chunk"], chunk_data["text"], text_chunks_dir, audio_chunks_dir,
+                voice_path, retry_params, start_time, total_chunks,
+                punc_norm, book_dir.name, log_run, log_path, device,
+                model, None, boundary_type=chunk_data.get("boundary_type", "none"),
+                enable_asr=False, asr_service=asr_service
+            )
+
+    # In-process rendering (nothing left to do here when the pool rendered the book)
+    for batch_start in range(0, 0 if pooled else total_chunks, BATCH_SIZE):
         batch_end = min(batch_start + BATCH_SIZE, total_chunks)
         batch_chunks = all_chunks[batch_start:batch_end]
 
-        # Smart reload decision logic
+        # Smart reload decision logic (without it, the model is reloaded for every batch)
+        reload_model = True
         if ENABLE_SMART_RELOAD and batch_start > 0:
             remaining_chunks = total_chunks - batch_start
             reload_decision = should_reload_model(remaining_chunks)
 
             if reload_decision['should_reload']:
-                print(f"\n🧠 Smart reload triggered: {reload_decision['reason']}")
-                print(f"   📊 Performance degradation: {reload_decision['degradation_pct']:.1f}%")
-                print(f"   💰 Economics: {reload_decision['economics']['roi']:.1f}x ROI")
-                record_model_reload(batch_start)
+                _print_reload_decision(reload_decision)
             else:
-                print(f"\n🧠 Smart reload analysis: {reload_decision['reason']}")
+                print(f"\n🧠 Smart reload analysis: {reload_decision['reason']} - keeping the loaded model")
+                reload_model = False
 
         print(f"\n🔄 Processing batch: chunks {batch_start+1}-{batch_end}")
         # Inform logger about current batch size for per-chunk summaries
@@ -1499,7 +1633,7 @@ def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=F
         asr_device_used = None
         # Use parameter if provided, otherwise fall back to config
         asr_enabled = enable_asr if enable_asr is not None else ENABLE_ASR
-        if asr_enabled:
+        if asr_enabled and asr_service is None:
             from modules.asr_manager import load_asr_model_adaptive
 
             # Get ASR config from parameters
@@ -1513,19 +1647,23 @@ def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=F
                 asr_enabled = False
 
         # Reload TTS model at the top of each batch (honor BATCH_SIZE semantics)
-        model = load_optimized_model(device, force_reload=True)
+        load_start = time.time()
+        model = load_optimized_model(device, force_reload=reload_model)
         # Pre-warm model for selected voice
         model = prewarm_model_with_voice(model, compatible_voice, tts_params)
+        if ENABLE_SMART_RELOAD and reload_model:
+            if batch_start == 0:
+                set_model_load_cost(time.time() - load_start)
+            else:
+                record_model_reload(batch_start, time.time() - load_start)
 
         futures = []
         batch_results = []
 
         # Dynamic worker allocation
-        optimal_workers = get_optimal_workers()
+        optimal_workers = get_optimal_workers(device)
         print(f"🔧 Using {optimal_workers} workers for batch {batch_start+1}-{batch_end}")
 
-        use_vader = tts_params.get('use_vader', True)
-
         # ============================================================================
         # CLEAN PROCESSING WITH REAL OPTIMIZATIONS
         # ============================================================================
@@ -1545,13 +1683,16 @@ def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=F
 
             # Check if batch-binning is enabled for micro-batching by parameters
             from config.config import ENABLE_BATCH_BINNING
-            if ENABLE_BATCH_BINNING:
+            if render_plan is not None:
+                chunk_batches = plan_batches(render_plan, batch_chunks)
+                print(f"🗺️ Processing {len(batch_chunks)} chunks in {len(chunk_batches)} planned batches")
+            elif ENABLE_BATCH_BINNING:
                 try:
                     from modules.terminal_logger import log_only
                     log_only("🔗 BATCH-BINNING: Grouping chunks by rounded TTS parameters for micro-batching")
                 except Exception:
                     pass
-                chunk_batches = create_parameter_microbatches(batch_chunks)
+                chunk_batches = create_parameter_microbatches(batch_chunks, max_batch=cpu_batch_size)
                 try:
                     from modules.terminal_logger import log_only
                     log_only(f"📊 Processing {len(batch_chunks)} chunks in {len(chunk_batches)} parameter-grouped micro-batches")
@@ -1572,19 +1713,26 @@ def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=F
                         batch, text_chunks_dir, audio_chunks_dir,
                         voice_path, tts_params, start_time, total_chunks,
                         punc_norm, book_dir.name, log_run, log_path, device,
-                        model, asr_model, 0, asr_enabled
+                        model, asr_model, 0, asr_enabled, asr_service
                     ))
 
                 # Wait for batches to complete
+                last_done = time.time()
                 for fut in as_completed(futures):
                     try:
                         # process_batch returns a list of (idx, wav_path) tuples
                         results_list = fut.result()
+                        done_at = time.time()
                         for idx, wav_path in results_list:
-                            if wav_path and wav_path.exists():
+                            if wav_path and chunk_written(wav_path):
                                 chunk_duration = get_chunk_audio_duration(wav_path)
                                 total_audio_duration += chunk_duration
                                 batch_results.append((idx, wav_path))
+                                if ENABLE_SMART_RELOAD:
+                                    # A batch's chunks share its wall time
+                                    track_chunk_performance(idx, (done_at - last_done) / len(results_list),
+                                                            chunk_duration * SPEECH_TOKENS_PER_SEC)
+                        last_done = done_at
                         # Throttle ETA printing to avoid console spam; status layer still receives updates
                         if len(batch_results) == 1 or (len(batch_results) % 5) == 0 or len(batch_results) == len(batch_chunks):
                             log_chunk_progress(batch_start + len(batch_results) - 1, total_chunks, start_time, total_audio_duration)
@@ -1654,7 +1802,7 @@ def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=F
 
             # Create micro-batches by parameter groupings, or force per-chunk
             if ENABLE_VADER_MICRO_BATCHING:
-                micro_batches = create_parameter_microbatches(rounded_chunks)
+                micro_batches = create_parameter_microbatches(rounded_chunks, max_batch=cpu_batch_size)
                 try:
                     from modules.terminal_logger import log_only
                     log_only(f"🔗 VADER MICRO-BATCHING: Created {len(micro_batches)} micro-batches from {len(rounded_chunks)} chunks")
@@ -1665,6 +1813,24 @@ def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=F
 
             with ThreadPoolExecutor(max_workers=optimal_workers) as executor:
                 for microbatch_idx, microbatch in enumerate(micro_batches):
+                    chunks_done = batch_start + sum(len(mb) for mb in micro_batches[:microbatch_idx])
+
+                    # Previous micro-batch has finished, so the model can be swapped here
+                    if ENABLE_SMART_RELOAD and microbatch_idx > 0 and not shutdown_requested:
+                        reload_decision = should_reload_model(total_chunks - chunks_done)
+                        if reload_decision['should_reload']:
+                            _print_reload_decision(reload_decision)
+                            del model
+                            reload_start = time.time()
+                            _release_global_tts_model()
+                            model = load_optimized_model(device, force_reload=True)
+                            model = prewarm_model_with_voice(model, compatible_voice, tts_params)
+                            record_model_reload(chunks_done, time.time() - reload_start)
+
+                    # Chunks the ASR service failed since the last micro-batch
+                    if asr_service is not None and microbatch_idx > 0:
+                        run_asr_regenerations(model, asr_service.take_regenerations())
+
                     if ENABLE_VADER_MICRO_BATCHING:
                         try:
                             from modules.terminal_logger import log_only
@@ -1674,6 +1840,8 @@ def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=F
 
                     # Process all chunks in this micro-batch
                     microbatch_futures = []
+                    microbatch_start = time.time()
+                    texts_by_index = {c.get("index"): c.get("text", "") for c in microbatch if isinstance(c, dict)}
                     for i, chunk_data in enumerate(microbatch):
                         # Check for shutdown request
                         if shutdown_requested:
@@ -1704,7 +1872,7 @@ def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=F
                             voice_path, chunk_tts_params, start_time, total_chunks,
                             punc_norm, book_dir.name, log_run, log_path, device,
                             model, asr_model, boundary_type=boundary_type,
-                            enable_asr=asr_enabled
+                            enable_asr=asr_enabled, asr_service=asr_service
                         ))
 
                     # Wait for micro-batch to complete
@@ -1714,23 +1882,23 @@ def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=F
                     except Exception:
                         pass
                     completed_count = 0
+                    last_done = microbatch_start
 
                     for fut in as_completed(microbatch_futures):
                         try:
                             idx, wav_path = fut.result()
-                            if wav_path and wav_path.exists():
+                            if wav_path and chunk_written(wav_path):
                                 # Measure actual audio duration for this chunk
                                 chunk_duration = get_chunk_audio_duration(wav_path)
                                 total_audio_duration += chunk_duration
                                 batch_results.append((idx, wav_path))
 
-                                # Track chunk performance for smart reload
+                                # Track chunk performance for smart reload (time since the previous completion)
                                 if ENABLE_SMART_RELOAD:
-                                    chunk_idx = batch_start + sum(len(mb) for mb in micro_batches[:microbatch_idx]) + completed_count
-                                    elapsed_time = time.time() - start_time
-                                    processing_time_per_chunk = elapsed_time / chunk_idx if chunk_idx > 0 else 1.0
-                                    estimated_tokens = estimate_tokens_in_text(chunk.get('text', ''))
-                                    track_chunk_performance(chunk_idx, processing_time_per_chunk, estimated_tokens)
+                                    done_at = time.time()
+                                    tokens = chunk_duration * SPEECH_TOKENS_PER_SEC or estimate_tokens_in_text(texts_by_index.get(idx, ''))
+                                    track_chunk_performance(chunks_done + completed_count, done_at - last_done, tokens)
+                                    last_done = done_at
 
                                 # Update progress on every completed chunk; terminal logger throttles display
                                 completed_count += 1
@@ -1761,6 +1929,29 @@ def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=F
         all_results.extend(batch_results)
         print(f"✅ Batch {batch_start+1}-{batch_end} completed ({len(batch_results)} chunks)")
 
+    # Let ASR finish; regenerate what it sends back until it passes or runs out of attempts
+    if asr_service is not None:
+        while not shutdown_requested:
+            print("🎤 Waiting for ASR validation to finish...")
+            asr_service.wait_idle()
+            requests = asr_service.take_regenerations()
+            if not requests:
+                break
+            model = load_optimized_model(device)
+            model = prewarm_model_with_voice(model, compatible_voice, tts_params)
+            run_asr_regenerations(model, requests)
+            del model
+        print(asr_service.summary())
+        asr_service.close()
+
+    # Calibrate the plan's cost model with the measured time of a complete render
+    if render_plan is not None and not shutdown_requested and len(all_results) == total_chunks:
+        from modules.render_plan import record_plan_actual
+        render_elapsed = time.time() - render_start
+        print(f"🗺️ Render took {timedelta(seconds=int(render_elapsed))} "
+              f"(predicted {timedelta(seconds=int(render_plan['predicted_seconds']))})")
+        record_plan_actual(render_plan, render_elapsed)
+
     # Final processing
     quarantine_dir = audio_chunks_dir / "quarantine"
     pause_for_chunk_review(quarantine_dir)
@@ -1776,10 +1967,13 @@ def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=F
     elapsed_total = time.time() - start_time
     elapsed_td = timedelta(seconds=int(elapsed_total))
 
-    total_audio_duration_final = sum(get_chunk_audio_duration(chunk_path) for chunk_path in chunk_paths)
+    total_audio_duration_final = total_chunk_duration(chunk_paths)
     audio_duration_td = timedelta(seconds=int(total_audio_duration_final))
     realtime_factor = total_audio_duration_final / elapsed_total if elapsed_total > 0 else 0.0
 
+    log_batch_controller_summary()
+    for line in get_quality_gate().summary():
+        print(line)
     print(f"\n⏱️ TTS Processing Complete:")
     print(f"   Elapsed Time: {CYAN}{str(elapsed_td)}{RESET}")
     print(f"   Audio Duration: {GREEN}{str(audio_duration_td)}{RESET}")
@@ -1790,11 +1984,12 @@ def process_book_folder(book_dir, voice_path, tts_params, device, skip_cleanup=F
     combined_wav_path = output_root / f"{book_dir.name} [{voice_name}].wav"
     print("\n💾 Saving WAV file...")
     combine_audio_chunks(chunk_paths, combined_wav_path)
+    apply_deferred_watermark(combined_wav_path)
 
     # M4B conversion with normalization
     temp_m4b_path = output_root / "output.m4b"
     final_m4b_path = output_root / f"{book_dir.name}[{voice_name}].m4b"
-    convert_to_m4b(combined_wav_path, temp_m4b_path)
+    convert_to_m4b(combined_wav_path, temp_m4b_path, chunk_paths=chunk_paths)
     add_metadata_to_m4b(temp_m4b_path, final_m4b_path, cover_file, nfo_file)
 
     logging.info(f"Audiobook created: {final_m4b_path}")
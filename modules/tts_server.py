@@ -0,0 +1,513 @@
+"""
+Local TTS Synthesis Server
+Standalone HTTP entry point that keeps ChatterboxTTS resident for other tools
+
+Features:
+- Model loaded once; voice conditionals kept in an LRU cache
+- Concurrent requests batched through `generate_batch` (grouped by voice and params)
+- Full WAV responses, or chunked WAV streaming via `generate_stream`
+- Metrics: queue depth, batch size histogram, latency percentiles
+
+Endpoints:
+    POST /tts      {"text": "...", "voice": "name.wav", "stream": false, "exaggeration": 0.5, ...}
+    GET  /metrics  JSON metrics
+    GET  /health   {"status": "ok"}
+
+Usage:
+    python -m modules.tts_server --port 8765
+    curl -s -X POST localhost:8765/tts -d '{"text": "Hello there."}' -o hello.wav
+
+Only the Python standard library is used for serving; no GUI modules are imported.
+"""
+
+import io
+import json
+import logging
+import queue
+import struct
+import sys
+import threading
+import time
+import wave
+from collections import Counter, OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add project root to path for imports
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from config.config import (
+    VOICE_SAMPLES_DIR, SERVER_HOST, SERVER_PORT, SERVER_MAX_BATCH, SERVER_BATCH_WAIT_MS,
+    SERVER_VOICE_CACHE_SIZE, SERVER_LATENCY_WINDOW,
+)
+
+logger = logging.getLogger(__name__)
+
+# Request params forwarded to the model (all requests in a batch share them)
+TTS_PARAMS = {
+    "exaggeration": 0.5,
+    "cfg_weight": 0.5,
+    "temperature": 0.8,
+    "min_p": 0.05,
+    "top_p": 1.0,
+    "repetition_penalty": 1.2,
+}
+
+
+# ============================================================================
+# AUDIO ENCODING
+# ============================================================================
+
+def wav_to_pcm16(wav):
+    """Convert a 1×N float wave tensor/array to little-endian 16-bit PCM bytes"""
+    data = wav.squeeze().detach().cpu().numpy() if hasattr(wav, "detach") else np.asarray(wav).squeeze()
+    return (np.clip(data, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def encode_wav(pcm_bytes, sample_rate):
+    """Complete mono 16-bit WAV file"""
+    with io.BytesIO() as buf:
+        with wave.open(buf, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            wf.writeframes(pcm_bytes)
+        return buf.getvalue()
+
+
+def streaming_wav_header(sample_rate):
+    """WAV header for a stream of unknown length (sizes set to the maximum, as most players accept)"""
+    byte_rate = sample_rate * 2
+    return (b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, byte_rate, 2, 16)
+            + b"data" + struct.pack("<I", 0xFFFFFFFF))
+
+
+# ============================================================================
+# VOICE CONDITIONALS CACHE
+# ============================================================================
+
+class VoiceCache:
+    """LRU of prepared voice conditionals, keyed by voice file and modification time"""
+
+    def __init__(self, model, capacity=SERVER_VOICE_CACHE_SIZE, voices_dir=VOICE_SAMPLES_DIR):
+        self.model = model
+        self.capacity = capacity
+        self.voices_dir = Path(voices_dir).resolve()
+        self.default_conds = getattr(model, "conds", None)
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, voice):
+        """Map a voice name to a file inside the voice samples directory"""
+        if not voice:
+            return None
+        for candidate in (voice, f"{voice}.wav"):
+            path = (self.voices_dir / candidate).resolve()
+            if path.is_file() and self.voices_dir in path.parents:
+                return path
+        raise ValueError(f"Unknown voice: {voice}")
+
+    def activate(self, voice_path):
+        """Set the model's conditionals for a voice (caller holds the model lock)"""
+        if voice_path is None:
+            if self.default_conds is None:
+                raise ValueError("No voice given and the model has no built-in voice")
+            self.model.conds = self.default_conds
+            return
+
+        key = (str(voice_path), voice_path.stat().st_mtime_ns)
+        conds = self._cache.get(key)
+        if conds is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.model.prepare_conditionals(str(voice_path))
+            conds = self.model.conds
+            self._cache[key] = conds
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+        self.model.conds = conds
+
+    def stats(self):
+        return {"size": len(self._cache), "capacity": self.capacity, "hits": self.hits, "misses": self.misses}
+
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+class ServerMetrics:
+    """Thread-safe request/batch counters and a sliding window of latencies"""
+
+    def __init__(self, window=SERVER_LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.audio_seconds = 0.0
+        self.batch_sizes = Counter()
+        self.latencies = deque(maxlen=window)
+        self.first_audio = deque(maxlen=window)
+
+    def record_batch(self, size):
+        with self._lock:
+            self.batch_sizes[size] += 1
+
+    def record_request(self, latency, audio_seconds=0.0, first_audio=None, error=False):
+        with self._lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.audio_seconds += audio_seconds
+            if not error:
+                self.latencies.append(latency)
+                if first_audio is not None:
+                    self.first_audio.append(first_audio)
+
+    @staticmethod
+    def _percentiles(values):
+        if not values:
+            return {}
+        arr = np.asarray(values) * 1000.0
+        return {f"p{p}": round(float(np.percentile(arr, p)), 1) for p in (50, 90, 95, 99)}
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "uptime_sec": round(time.time() - self.started, 1),
+                "requests": self.requests,
+                "errors": self.errors,
+                "audio_seconds": round(self.audio_seconds, 2),
+                "batch_size_histogram": {str(k): v for k, v in sorted(self.batch_sizes.items())},
+                "latency_ms": self._percentiles(list(self.latencies)),
+                "stream_first_audio_ms": self._percentiles(list(self.first_audio)),
+            }
+
+
+# ============================================================================
+# BATCHING SCHEDULER
+# ============================================================================
+
+class _Job:
+    def __init__(self, text, voice_path, params):
+        self.text = text
+        self.voice_path = voice_path
+        self.params = params
+        self.done = threading.Event()
+        self.wav = None
+        self.error = None
+
+    @property
+    def group_key(self):
+        return (str(self.voice_path), tuple(sorted(self.params.items())))
+
+
+class TTSServer:
+    """
+    Resident model plus a single worker thread that batches queued requests.
+
+    GPU work (batches and streams) is serialized by `model_lock`, since the model
+    holds per-voice state (`conds`).
+    """
+
+    def __init__(self, model, max_batch=SERVER_MAX_BATCH, batch_wait_ms=SERVER_BATCH_WAIT_MS,
+                 voice_cache_size=SERVER_VOICE_CACHE_SIZE, voices_dir=VOICE_SAMPLES_DIR):
+        self.model = model
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait_ms / 1000.0
+        self.voices = VoiceCache(model, voice_cache_size, voices_dir)
+        self.metrics = ServerMetrics()
+        self.model_lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self._running = True
+        self._worker = threading.Thread(target=self._batch_loop, name="tts-batcher", daemon=True)
+        self._worker.start()
+
+    def queue_depth(self):
+        return self.jobs.qsize()
+
+    def stop(self):
+        self._running = False
+        self.jobs.put(None)
+        self._worker.join(timeout=5)
+
+    # --- request parsing -----------------------------------------------------
+    def parse_request(self, payload):
+        if not isinstance(payload, dict):
+            raise ValueError("Request body must be a JSON object")
+        text = payload.get("text")
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError("Missing 'text'")
+        voice = payload.get("voice")
+        if voice is not None and not isinstance(voice, str):
+            raise ValueError("'voice' must be a string")
+        voice_path = self.voices.resolve(voice)
+        params = {}
+        for k, default in TTS_PARAMS.items():
+            try:
+                params[k] = float(payload.get(k, default))
+            except (TypeError, ValueError):
+                raise ValueError(f"'{k}' must be a number")
+        return text.strip(), voice_path, params
+
+    # --- batched synthesis ---------------------------------------------------
+    def synthesize(self, text, voice_path, params):
+        """Queue a request for the batcher and wait for its audio"""
+        job = _Job(text, voice_path, params)
+        self.jobs.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.wav
+
+    def _collect(self):
+        """Block for one job, then gather whatever else arrives within the batching window"""
+        first = self.jobs.get()
+        if first is None:
+            return []
+        jobs = [first]
+        deadline = time.time() + self.batch_wait
+        while len(jobs) < self.max_batch * 4:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                job = self.jobs.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if job is None:
+                self._running = False
+                break
+            jobs.append(job)
+        return jobs
+
+    def _batch_loop(self):
+        from src.chatterbox.tts import parse_pause_tags
+
+        while self._running:
+            jobs = self._collect()
+            groups = OrderedDict()
+            for job in jobs:
+                groups.setdefault(job.group_key, []).append(job)
+
+            for group in groups.values():
+                # Pause tags / long text need `generate`'s segmenting; plain texts go through one batch
+                plain = [j for j in group if len(j.text) <= 300 and len(parse_pause_tags(j.text)) == 1]
+                special = [j for j in group if j not in plain]
+                for start in range(0, len(plain), self.max_batch):
+                    self._run_batch(plain[start:start + self.max_batch])
+                for job in special:
+                    self._run_single(job)
+
+    def _run_batch(self, batch):
+        if not batch:
+            return
+        params = batch[0].params
+        try:
+            with self.model_lock:
+                self.voices.activate(batch[0].voice_path)
+                wavs = self.model.generate_batch([j.text for j in batch], **params)
+            if len(wavs) != len(batch):
+                raise RuntimeError(f"generate_batch returned {len(wavs)} waves for {len(batch)} texts")
+        except Exception as e:
+            if len(batch) == 1:
+                self._run_single(batch[0])
+                return
+            # Isolate the failure: each request gets its own attempt, so one bad text fails only its caller
+            logger.warning(f"Batch of {len(batch)} failed ({e}), retrying requests one at a time")
+            for job in batch:
+                self._run_single(job)
+            return
+
+        self.metrics.record_batch(len(batch))
+        for job, wav in zip(batch, wavs):
+            job.wav = wav
+            job.done.set()
+
+    def _run_single(self, job):
+        try:
+            with self.model_lock:
+                self.voices.activate(job.voice_path)
+                job.wav = self.model.generate(job.text, **job.params)
+            self.metrics.record_batch(1)
+        except Exception as e:
+            logger.error(f"Request failed: {e}")
+            job.error = e
+        finally:
+            job.done.set()
+
+    # --- streaming -----------------------------------------------------------
+    def stream(self, text, voice_path, params):
+        """Yield wave chunks from `generate_stream` (holds the model for the whole stream)"""
+        with self.model_lock:
+            self.voices.activate(voice_path)
+            for wav in self.model.generate_stream(text, **params):
+                yield wav
+
+    def snapshot(self):
+        data = self.metrics.snapshot()
+        data["queue_depth"] = self.queue_depth()
+        data["max_batch"] = self.max_batch
+        data["voice_cache"] = self.voices.stats()
+        return data
+
+
+# ============================================================================
+# HTTP HANDLER
+# ============================================================================
+
+class TTSRequestHandler(BaseHTTPRequestHandler):
+    server_version = "GenTTSServer/1.0"
+    protocol_version = "HTTP/1.1"
+    tts: TTSServer = None  # set by make_server
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send_json(200, self.tts.snapshot())
+        elif self.path == "/health":
+            self._send_json(200, {"status": "ok", "queue_depth": self.tts.queue_depth()})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/tts":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        start = time.time()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            text, voice_path, params = self.tts.parse_request(payload)
+        except (ValueError, TypeError, json.JSONDecodeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        sr = self.tts.model.sr
+        if payload.get("stream"):
+            self._stream_response(text, voice_path, params, sr, start)
+            return
+
+        try:
+            wav = self.tts.synthesize(text, voice_path, params)
+        except Exception as e:
+            self.tts.metrics.record_request(time.time() - start, error=True)
+            self._send_json(500, {"error": str(e)})
+            return
+
+        body = encode_wav(wav_to_pcm16(wav), sr)
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.tts.metrics.record_request(time.time() - start, audio_seconds=wav.shape[-1] / sr)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream_response(self, text, voice_path, params, sr, start):
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        first_audio = None
+        samples = 0
+        error = False
+        try:
+            self._write_chunk(streaming_wav_header(sr))
+            for wav in self.tts.stream(text, voice_path, params):
+                if first_audio is None:
+                    first_audio = time.time() - start
+                samples += wav.shape[-1]
+                self._write_chunk(wav_to_pcm16(wav))
+        except Exception as e:
+            # Headers are already sent; end the stream early and record the failure
+            logger.error(f"Stream failed after {samples} samples: {e}")
+            error = True
+        finally:
+            try:
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            except OSError:
+                pass
+        self.tts.metrics.record_request(time.time() - start, audio_seconds=samples / sr,
+                                        first_audio=first_audio, error=error)
+
+
+def make_server(tts, host=SERVER_HOST, port=SERVER_PORT):
+    """Bind a threading HTTP server to a TTSServer instance"""
+    handler = type("BoundTTSRequestHandler", (TTSRequestHandler,), {"tts": tts})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def load_server_model(device):
+    """Load ChatterboxTTS directly (local checkpoint first), without the book-processing engine"""
+    import torch
+    from src.chatterbox.tts import ChatterboxTTS
+    from config.config import CHATTERBOX_CKPT_DIR
+
+    if device == "cuda" and not torch.cuda.is_available():
+        device = "cpu"
+    ckpt_dir = Path((CHATTERBOX_CKPT_DIR or "").strip())
+    if str(ckpt_dir) and ckpt_dir.exists():
+        model = ChatterboxTTS.from_local(ckpt_dir, device)
+    else:
+        model = ChatterboxTTS.from_pretrained(device=device)
+
+    try:
+        from modules.real_tts_optimizer import optimize_chatterbox_model
+        optimize_chatterbox_model(model)
+    except Exception as e:
+        logger.warning(f"Running without TTS optimizations: {e}")
+    return model
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local TTS synthesis server")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--device", default="cuda")
+    parser.add_argument("--max-batch", type=int, default=SERVER_MAX_BATCH)
+    parser.add_argument("--batch-wait-ms", type=float, default=SERVER_BATCH_WAIT_MS)
+    parser.add_argument("--voice-cache", type=int, default=SERVER_VOICE_CACHE_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    model = load_server_model(args.device)
+    tts = TTSServer(model, max_batch=args.max_batch, batch_wait_ms=args.batch_wait_ms,
+                    voice_cache_size=args.voice_cache)
+    httpd = make_server(tts, args.host, args.port)
+    print(f"🎙️ TTS server listening on http://{args.host}:{args.port} (POST /tts, GET /metrics)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Shutting down TTS server")
+    finally:
+        httpd.server_close()
+        tts.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
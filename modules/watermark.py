@@ -0,0 +1,131 @@
+"""
+Deferred Perth watermarking at book assembly
+============================================
+
+With WATERMARK_MODE = "deferred", chunks are generated without a watermark.
+The assembled book WAV is watermarked once, just before M4B encoding. It is
+streamed through the Perth watermarker in WATERMARK_BLOCK_SEC blocks, and
+neighbouring blocks overlap by WATERMARK_OVERLAP_SEC and are crossfaded, so
+block edges leave no seams. This removes one short STFT analysis per chunk from
+the generation path. It also covers chunks shorter than the watermarker's 2048-
+sample minimum, which per-chunk mode had to skip.
+"""
+
+import os
+import time
+import logging
+import threading
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from config.config import WATERMARK_MODE, WATERMARK_BLOCK_SEC, WATERMARK_OVERLAP_SEC
+
+MIN_WATERMARK_SAMPLES = 2048    # Perth STFT needs at least this many samples
+
+_watermarker = None
+_watermarker_lock = threading.Lock()
+
+
+def chunk_watermark_disabled():
+    """`disable_watermark` value for per-chunk generation calls"""
+    return WATERMARK_MODE != "chunk"
+
+
+def _get_watermarker():
+    global _watermarker
+    with _watermarker_lock:
+        if _watermarker is None:
+            import perth
+            _watermarker = perth.PerthImplicitWatermarker()
+        return _watermarker
+
+
+def _mark(watermarker, block, sample_rate):
+    """Watermark a (frames, channels) float block, channel by channel"""
+    if len(block) < MIN_WATERMARK_SAMPLES:
+        return block
+    out = np.empty_like(block)
+    for ch in range(block.shape[1]):
+        marked = np.asarray(watermarker.apply_watermark(block[:, ch], sample_rate=sample_rate), dtype=np.float32)
+        n = min(len(marked), len(block))
+        out[:n, ch] = marked[:n]
+        out[n:, ch] = block[n:, ch]
+    return out
+
+
+def watermark_wav_file(wav_path, watermarker=None, block_sec=WATERMARK_BLOCK_SEC, overlap_sec=WATERMARK_OVERLAP_SEC):
+    """
+    Watermark a WAV file in place, in overlapping blocks (constant memory)
+
+    Args:
+        wav_path: WAV to watermark (rewritten atomically, same format)
+        watermarker: Perth watermarker (defaults to a shared PerthImplicitWatermarker)
+        block_sec: Seconds per watermarker call
+        overlap_sec: Crossfade length between blocks
+    """
+    wav_path = Path(wav_path)
+    watermarker = watermarker or _get_watermarker()
+    info = sf.info(str(wav_path))
+    sample_rate, total = info.samplerate, info.frames
+    block = max(int(block_sec * sample_rate), MIN_WATERMARK_SAMPLES * 4)
+    overlap = min(int(overlap_sec * sample_rate), block // 4)
+    tmp_path = wav_path.with_name(f".{wav_path.name}.wm.tmp")
+
+    start_time = time.time()
+    try:
+        with sf.SoundFile(str(wav_path)) as src, \
+                sf.SoundFile(str(tmp_path), "w", samplerate=sample_rate, channels=info.channels,
+                             subtype=info.subtype, format="WAV") as dst:
+            start = 0
+            tail = None
+            while start < total:
+                end = min(total, start + block)
+                # Fold a short remainder into this block rather than leave it unmarked
+                if total - end < block // 4:
+                    end = total
+                src.seek(start)
+                marked = _mark(watermarker, src.read(end - start, dtype="float32", always_2d=True), sample_rate)
+
+                if tail is not None:
+                    n = min(len(tail), len(marked))
+                    fade = np.linspace(0.0, 1.0, n, dtype=np.float32)[:, None]
+                    marked[:n] = tail[:n] * (1.0 - fade) + marked[:n] * fade
+
+                if end >= total or overlap == 0:
+                    dst.write(marked)
+                    tail = None
+                    start = end
+                else:
+                    dst.write(marked[:-overlap])
+                    tail = marked[-overlap:]
+                    start = end - overlap
+
+                elapsed = time.time() - start_time
+                factor = (start / sample_rate) / elapsed if elapsed > 0 else 0.0
+                print(f"💧 Watermarking: {start / max(1, total) * 100:5.1f}% | {factor:.1f}x realtime", end='\r')
+        os.replace(tmp_path, wav_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    print(f"\n✅ Watermarked {wav_path.name} ({total / sample_rate / 60:.1f} min) in {time.time() - start_time:.1f}s")
+
+
+def apply_deferred_watermark(wav_path):
+    """
+    Watermark an assembled book WAV when WATERMARK_MODE is "deferred"
+
+    Returns:
+        bool: True if the file was watermarked
+    """
+    if WATERMARK_MODE != "deferred":
+        return False
+    try:
+        watermark_wav_file(wav_path)
+        return True
+    except ImportError as e:
+        logging.warning(f"Deferred watermarking skipped (perth unavailable): {e}")
+    except Exception as e:
+        logging.error(f"Deferred watermarking failed for {wav_path}: {e}")
+    return False
@@ -0,0 +1,241 @@
+"""
+Memory-mapped, lazily materialized checkpoint loading for ChatterboxTTS
+
+`load_file` reads a whole safetensors file into freshly allocated tensors, and the
+module it is loaded into has already spent time filling its own weights with
+random init. This module does neither:
+
+- `mmap_safetensors` maps the file copy-on-write and returns tensor views over it,
+  so pages are only read when a weight is copied to its device (or used in place
+  on CPU, where the module parameters are assigned the views directly)
+- `load_component` builds modules under `skip_weight_init`, since every weight is
+  overwritten by the checkpoint anyway
+- `LazyComponent` defers a component until first use. The voice encoder and the S3
+  tokenizer only build voice conditionals, so runs that reuse cached conditionals
+  never load them.
+
+Per-component load times are collected in a `timings` dict and printed by
+`format_timings`.
+
+For render worker processes, `share_state_dict` packs a component's weights into
+one shared-memory buffer (a single handle to pass between processes), and
+`attach_state_dict` rebuilds the named views over it in the worker.
+"""
+
+import json
+import mmap
+import time
+import struct
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+
+import torch
+
+_SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+
+# torch.nn.init functions that module constructors use to fill weights
+_INIT_FUNCTIONS = (
+    "uniform_", "normal_", "trunc_normal_", "constant_", "zeros_", "ones_", "eye_", "dirac_",
+    "xavier_uniform_", "xavier_normal_", "kaiming_uniform_", "kaiming_normal_", "orthogonal_", "sparse_",
+)
+
+
+def mmap_safetensors(path):
+    """
+    Map a safetensors file and return its tensors as views over the mapping
+
+    The mapping is private (copy-on-write): nothing is read until a tensor is
+    touched, and in-place writes never reach the file.
+
+    Returns:
+        dict: name -> CPU tensor
+    """
+    with open(path, "rb") as f:
+        header_len = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_len))
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    data_start = 8 + header_len
+
+    state = {}
+    for name, meta in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = _SAFETENSORS_DTYPES[meta["dtype"]]
+        start, end = meta["data_offsets"]
+        if end == start:
+            state[name] = torch.empty(meta["shape"], dtype=dtype)
+            continue
+        count = (end - start) // torch.empty((), dtype=dtype).element_size()
+        state[name] = torch.frombuffer(mapped, dtype=dtype, count=count,
+                                       offset=data_start + start).reshape(meta["shape"])
+    return state
+
+
+def read_state_dict(path, mmap_weights=True):
+    """Checkpoint tensors from `path`: mapped views, or a full read with `load_file`"""
+    if mmap_weights:
+        return mmap_safetensors(path)
+    from safetensors.torch import load_file
+    return load_file(path)
+
+
+@contextmanager
+def skip_weight_init():
+    """
+    Build modules without running their random weight init
+
+    Only for modules whose weights are all loaded afterwards. torch.nn.init is
+    patched process-wide while the context is open.
+    """
+    saved = {name: getattr(torch.nn.init, name) for name in _INIT_FUNCTIONS if hasattr(torch.nn.init, name)}
+
+    def _no_init(tensor, *args, **kwargs):
+        return tensor
+
+    try:
+        from transformers.modeling_utils import no_init_weights
+        hf_context = no_init_weights()
+    except ImportError:
+        hf_context = nullcontext()
+
+    try:
+        for name in saved:
+            setattr(torch.nn.init, name, _no_init)
+        with hf_context:
+            yield
+    finally:
+        for name, fn in saved.items():
+            setattr(torch.nn.init, name, fn)
+
+
+def load_weights(module, state_dict, strict, assign):
+    if assign:
+        try:
+            return module.load_state_dict(state_dict, strict=strict, assign=True)
+        except TypeError:
+            # torch < 2.1: no `assign`, copy instead
+            logging.warning("load_state_dict(assign=True) needs torch >= 2.1; weights are copied, not shared")
+    return module.load_state_dict(state_dict, strict=strict)
+
+
+def load_component(name, factory, state_dict, device, strict=True, ignore_missing=(),
+                   mmap_weights=True, timings=None):
+    """
+    Build one model component, load its weights and move it to `device`
+
+    Args:
+        name: Component name for timings and messages
+        factory: Zero-argument constructor
+        state_dict: Weights for the component (mapped or fully read)
+        device: Target device
+        strict: Require every module weight to be in `state_dict`
+        ignore_missing: Weight names (last dotted part) the module computes itself,
+            allowed to be missing when not strict
+        mmap_weights: Skip random init, and on CPU use the mapped tensors in place
+        timings: Optional dict; receives `name -> seconds`
+
+    Returns:
+        torch.nn.Module: The component in eval mode
+    """
+    start = time.perf_counter()
+    with skip_weight_init() if mmap_weights else nullcontext():
+        module = factory()
+    assign = mmap_weights and str(device) == "cpu"
+    result = load_weights(module, state_dict, strict, assign)
+
+    if not strict:
+        missing = [k for k in result.missing_keys if k.rsplit(".", 1)[-1] not in ignore_missing]
+        if missing and mmap_weights:
+            # Weights the checkpoint does not provide need their real init
+            logging.warning(f"{name}: {len(missing)} weights not in checkpoint (e.g. {missing[0]}), rebuilding with init")
+            module = factory()
+            load_weights(module, state_dict, strict, assign)
+
+    module.to(device).eval()
+    if timings is not None:
+        timings[name] = time.perf_counter() - start
+    return module
+
+
+def share_state_dict(state_dict, align=64):
+    """
+    Copy a state dict into one shared-memory byte buffer
+
+    Tensors that share memory (tied weights) are stored once.
+
+    Returns:
+        tuple: (arena, index) for `attach_state_dict`; index maps name -> (offset, dtype, shape)
+    """
+    tensors = {name: t.detach().cpu().contiguous() for name, t in state_dict.items()}
+    layout, index, seen, total = [], {}, {}, 0
+    for name, t in tensors.items():
+        key = (t.data_ptr(), t.dtype, tuple(t.shape)) if t.numel() else None
+        if key in seen:
+            index[name] = index[seen[key]]
+            continue
+        if key is not None:
+            seen[key] = name
+        index[name] = (total, t.dtype, tuple(t.shape))
+        layout.append((name, total))
+        total += -(-t.numel() * t.element_size() // align) * align
+
+    arena = torch.empty(max(total, 1), dtype=torch.uint8).share_memory_()
+    views = attach_state_dict(arena, index)
+    for name, _ in layout:
+        views[name].copy_(tensors[name])
+    return arena, index
+
+
+def attach_state_dict(arena, index):
+    """Named tensor views over an arena from `share_state_dict` (no copies)"""
+    state = {}
+    for name, (offset, dtype, shape) in index.items():
+        nbytes = torch.Size(shape).numel() * torch.empty((), dtype=dtype).element_size()
+        state[name] = arena[offset:offset + nbytes].view(dtype).view(shape)
+    return state
+
+
+class LazyComponent:
+    """A model component that is built by `loader()` on the first `get()`"""
+
+    def __init__(self, name, loader, timings=None):
+        self.name = name
+        self._loader = loader
+        self._timings = timings
+        self._module = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def get(self):
+        with self._lock:
+            if self._module is None:
+                start = time.perf_counter()
+                self._module = self._loader()
+                self._loader = None
+                elapsed = time.perf_counter() - start
+                if self._timings is not None:
+                    self._timings[self.name] = elapsed
+                print(f"📦 Loaded {self.name} on first use ({elapsed:.2f}s)")
+        return self._module
+
+
+def format_timings(timings, deferred=()):
+    """One-line load summary, e.g. `T3 1.42s | S3Gen 0.61s | VoiceEncoder deferred`"""
+    parts = [f"{name} {seconds:.2f}s" for name, seconds in timings.items()]
+    parts += [f"{name} deferred" for name in deferred if name not in timings]
+    return " | ".join(parts)
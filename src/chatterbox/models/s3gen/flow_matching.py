@@ -196,12 +196,14 @@ class ConditionalCFM(BASECFM):
 
 
 class CausalConditionalCFM(ConditionalCFM):
+    FLOW_CACHE_OVERLAP = 34  # mel frames shared by consecutive streaming windows (17 tokens)
+
     def __init__(self, in_channels=240, cfm_params=CFM_PARAMS, n_spks=1, spk_emb_dim=80, estimator=None):
         super().__init__(in_channels, cfm_params, n_spks, spk_emb_dim, estimator)
         self.rand_noise = torch.randn([1, 80, 50 * 300])
 
     @torch.inference_mode()
-    def forward(self, mu, mask, n_timesteps, temperature=1.0, spks=None, cond=None):
+    def forward(self, mu, mask, n_timesteps, temperature=1.0, spks=None, cond=None, prompt_len=0, flow_cache=None):
         """Forward diffusion
 
         Args:
@@ -214,15 +216,30 @@ class CausalConditionalCFM(ConditionalCFM):
             spks (torch.Tensor, optional): speaker ids. Defaults to None.
                 shape: (batch_size, spk_emb_dim)
             cond: Not used but kept for future purposes
+            prompt_len (int): mel frames of the prompt at the start of `mu`
+            flow_cache (torch.Tensor, optional): streaming only. z and mu of the
+                previous window's prompt and last FLOW_CACHE_OVERLAP frames
+                (as in ConditionalCFM.forward); the window must start with the
+                prompt followed by those frames. An empty cache starts a stream.
+                shape: (batch_size, n_feats, cache_frames, 2)
 
         Returns:
             sample: generated mel-spectrogram
                 shape: (batch_size, n_feats, mel_timesteps)
+            flow_cache: cache for the next window (None without `flow_cache`)
         """
 
         z = self.rand_noise[:, :, :mu.size(2)].to(mu.device).to(mu.dtype) * temperature
         # fix prompt and overlap part mu and z
+        if flow_cache is not None:
+            cache_size = flow_cache.shape[2]
+            if cache_size != 0:
+                z[:, :, :cache_size] = flow_cache[:, :, :, 0]
+                mu[:, :, :cache_size] = flow_cache[:, :, :, 1]
+            z_cache = torch.concat([z[:, :, :prompt_len], z[:, :, -self.FLOW_CACHE_OVERLAP:]], dim=2)
+            mu_cache = torch.concat([mu[:, :, :prompt_len], mu[:, :, -self.FLOW_CACHE_OVERLAP:]], dim=2)
+            flow_cache = torch.stack([z_cache, mu_cache], dim=-1)
         t_span = torch.linspace(0, 1, n_timesteps + 1, device=mu.device, dtype=mu.dtype)
         if self.t_scheduler == 'cosine':
             t_span = 1 - torch.cos(t_span * 0.5 * torch.pi)
-        return self.solve_euler(z, t_span=t_span, mu=mu, mask=mask, spks=spks, cond=cond), None
+        return self.solve_euler(z, t_span=t_span, mu=mu, mask=mask, spks=spks, cond=cond), flow_cache
@@ -50,9 +50,12 @@ class S3Token2Mel(torch.nn.Module):
 
     TODO: make these modules configurable?
     """
-    def __init__(self):
+    def __init__(self, lazy_tokenizer=False):
         super().__init__()
-        self.tokenizer = S3Tokenizer("speech_tokenizer_v2_25hz")
+        # With lazy_tokenizer, `self.tokenizer` comes from `defer_tokenizer` on first access
+        self._lazy_tokenizer = None
+        if not lazy_tokenizer:
+            self.tokenizer = S3Tokenizer("speech_tokenizer_v2_25hz")
         self.mel_extractor = mel_spectrogram # TODO: make it a torch module?
         self.speaker_encoder = CAMPPlus()  # use default args
 
@@ -108,9 +111,61 @@ class S3Token2Mel(torch.nn.Module):
 
     @property
     def device(self):
-        params = self.tokenizer.parameters()
+        params = self.flow.parameters()
         return next(params).device
 
+    def defer_tokenizer(self, lazy):
+        """
+        Load the S3 tokenizer on first use of `self.tokenizer`
+
+        It only tokenizes reference audio in `embed_ref`, so it is never loaded
+        when conditionals come from a cache. `lazy` is a LazyComponent.
+        """
+        self._modules.pop("tokenizer", None)
+        self._lazy_tokenizer = lazy
+
+    def __getattr__(self, name):
+        if name == "tokenizer":
+            lazy = self.__dict__.get("_lazy_tokenizer")
+            if lazy is not None:
+                self.tokenizer = lazy.get()
+                self._lazy_tokenizer = None
+                return self._modules["tokenizer"]
+        return super().__getattr__(name)
+
+    def set_attention_backend(self, backend: str = "sdpa"):
+        """
+        Select the attention kernels used by the conformer encoder and the CFM decoder
+        transformer blocks. Weights are untouched, so this can be switched at any time.
+
+        - "sdpa": fused `torch.nn.functional.scaled_dot_product_attention` kernels
+          (relative position bias is folded in as an additive mask)
+        - "eager": explicit matmul / mask / softmax (reference path)
+
+        Returns the number of attention modules switched.
+        """
+        from diffusers.models.attention_processor import Attention, AttnProcessor, AttnProcessor2_0
+        from .transformer.attention import MultiHeadedAttention, SDPA_AVAILABLE
+
+        backend = (backend or "eager").lower()
+        if backend not in ("sdpa", "eager"):
+            raise ValueError(f"Unknown S3Gen attention backend: {backend!r} (expected 'sdpa' or 'eager')")
+        if backend == "sdpa" and not SDPA_AVAILABLE:
+            logging.warning("scaled_dot_product_attention unavailable in this torch build; using eager attention")
+            backend = "eager"
+
+        use_sdpa = backend == "sdpa"
+        switched = 0
+        for module in self.flow.modules():
+            if isinstance(module, MultiHeadedAttention):
+                module.use_sdpa = use_sdpa
+                switched += 1
+            elif isinstance(module, Attention):
+                module.set_processor(AttnProcessor2_0() if use_sdpa else AttnProcessor())
+                switched += 1
+        self.attention_backend = backend
+        return switched
+
     def embed_ref(
         self,
         ref_wav: torch.Tensor,
@@ -223,8 +278,8 @@ class S3Token2Wav(S3Token2Mel):
     TODO: make these modules configurable?
     """
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, lazy_tokenizer=False):
+        super().__init__(lazy_tokenizer=lazy_tokenizer)
 
         f0_predictor = ConvRNNF0Predictor()
         self.mel2wav = HiFTGenerator(
@@ -280,6 +335,30 @@ class S3Token2Wav(S3Token2Mel):
     ):
         return super().forward(speech_tokens, ref_wav=ref_wav, ref_sr=ref_sr, ref_dict=ref_dict, finalize=finalize)
 
+    @torch.inference_mode()
+    def flow_inference_window(self, speech_tokens, ref_dict: dict, flow_cache: torch.Tensor, finalize: bool = False):
+        """
+        Flow over one streaming window of speech tokens (ChatterboxTTS.generate_stream)
+
+        Start a stream with an empty cache (torch.zeros(1, 80, 0, 2)) and pass
+        the returned cache to the next window. Every later window must start
+        with the last FLOW_CACHE_OVERLAP // token_mel_ratio tokens whose mels
+        the previous window returned; their frames come back again first.
+        `ref_dict` must already be on this device (as in Conditionals.gen).
+
+        Returns:
+            (mels, flow_cache)
+        """
+        if len(speech_tokens.shape) == 1:
+            speech_tokens = speech_tokens.unsqueeze(0)
+        return self.flow.inference(
+            token=speech_tokens,
+            token_len=torch.LongTensor([speech_tokens.size(1)]).to(self.device),
+            finalize=finalize,
+            flow_cache=flow_cache,
+            **ref_dict,
+        )
+
     @torch.inference_mode()
     def hift_inference(self, speech_feat, cache_source: torch.Tensor = None):
         if cache_source is None:
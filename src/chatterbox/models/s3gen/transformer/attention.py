@@ -20,8 +20,12 @@ import math
 from typing import Tuple
 
 import torch
+import torch.nn.functional as F
 from torch import nn
 
+# torch>=2.0 ships fused scaled-dot-product attention kernels (flash / mem-efficient / math)
+SDPA_AVAILABLE = hasattr(F, "scaled_dot_product_attention")
+
 
 class MultiHeadedAttention(nn.Module):
     """Multi-Head Attention layer.
@@ -49,6 +53,9 @@ class MultiHeadedAttention(nn.Module):
         self.linear_v = nn.Linear(n_feat, n_feat)
         self.linear_out = nn.Linear(n_feat, n_feat)
         self.dropout = nn.Dropout(p=dropout_rate)
+        # Select torch SDPA kernels instead of explicit matmul/softmax.
+        # Toggled at load time via `S3Token2Mel.set_attention_backend`.
+        self.use_sdpa = False
 
     def forward_qkv(
         self, query: torch.Tensor, key: torch.Tensor, value: torch.Tensor
@@ -126,6 +133,62 @@ class MultiHeadedAttention(nn.Module):
 
         return self.linear_out(x)  # (batch, time1, d_model)
 
+    def forward_attention_sdpa(
+        self,
+        query: torch.Tensor,
+        key: torch.Tensor,
+        value: torch.Tensor,
+        mask: torch.Tensor = torch.ones((0, 0, 0), dtype=torch.bool),
+        bias: torch.Tensor = None,
+    ) -> torch.Tensor:
+        """Compute attention context vector with fused SDPA kernels.
+
+        Numerically equivalent to `forward_attention` on the scores
+        `q @ k^T / sqrt(d_k) + bias`, without materializing the softmax
+        matrix when no bias is given.
+
+        Args:
+            query (torch.Tensor): Transformed query, size
+                (#batch, n_head, time1, d_k).
+            key (torch.Tensor): Transformed key, size
+                (#batch, n_head, time2, d_k).
+            value (torch.Tensor): Transformed value, size
+                (#batch, n_head, time2, d_k).
+            mask (torch.Tensor): Mask, size (#batch, 1, time2) or
+                (#batch, time1, time2), (0, 0, 0) means fake mask.
+            bias (torch.Tensor): Optional additive score bias, already
+                divided by sqrt(d_k), size (#batch, n_head, time1, time2).
+
+        Returns:
+            torch.Tensor: Transformed value (#batch, time1, d_model).
+
+        """
+        n_batch = value.size(0)
+        attn_mask = bias
+        masked = None
+        if mask.size(2) > 0:  # time2 > 0
+            masked = mask.unsqueeze(1).eq(0)  # (batch, 1, *, time2)
+            masked = masked[:, :, :, :key.size(2)]
+            if attn_mask is None:
+                attn_mask = ~masked
+            else:
+                attn_mask = attn_mask.masked_fill(masked, -float('inf'))
+
+        x = F.scaled_dot_product_attention(
+            query, key, value,
+            attn_mask=attn_mask,
+            dropout_p=self.dropout.p if self.training else 0.0,
+        )  # (batch, head, time1, d_k)
+        if masked is not None:
+            # Rows without any valid key come out as NaN from SDPA; the eager
+            # path zeroes them after the softmax, so do the same here.
+            x = x.masked_fill(masked.all(dim=-1, keepdim=True), 0.0)
+        x = (x.transpose(1, 2).contiguous().view(n_batch, -1,
+                                                 self.h * self.d_k)
+             )  # (batch, time1, d_model)
+
+        return self.linear_out(x)  # (batch, time1, d_model)
+
     def forward(
         self,
         query: torch.Tensor,
@@ -193,6 +256,9 @@ class MultiHeadedAttention(nn.Module):
         #   non-trivial to calculate `next_cache_start` here.
         new_cache = torch.cat((k, v), dim=-1)
 
+        if self.use_sdpa:
+            return self.forward_attention_sdpa(q, k, v, mask), new_cache
+
         scores = torch.matmul(q, k.transpose(-2, -1)) / math.sqrt(self.d_k)
         return self.forward_attention(v, scores, mask), new_cache
 
@@ -311,19 +377,27 @@ class RelPositionMultiHeadedAttention(MultiHeadedAttention):
         # (batch, head, time1, d_k)
         q_with_bias_v = (q + self.pos_bias_v.to(q.device)).transpose(1, 2)
 
-        # compute attention score
-        # first compute matrix a and matrix c
-        # as described in https://arxiv.org/abs/1901.02860 Section 3.3
-        # (batch, head, time1, time2)
-        matrix_ac = torch.matmul(q_with_bias_u, k.transpose(-2, -1))
-
         # compute matrix b and matrix d
         # (batch, head, time1, time2)
         matrix_bd = torch.matmul(q_with_bias_v, p.transpose(-2, -1))
         # NOTE(Xiang Lyu): Keep rel_shift since espnet rel_pos_emb is used
-        if matrix_ac.shape != matrix_bd.shape:
+        # (same check as `matrix_ac.shape != matrix_bd.shape`, without matrix_ac)
+        if matrix_bd.shape != q_with_bias_u.shape[:-1] + (k.size(2),):
             matrix_bd = self.rel_shift(matrix_bd)
 
+        if self.use_sdpa:
+            # Fold the positional term in as an additive bias; the content
+            # term (matrix a and c) is computed inside the fused kernel.
+            bias = matrix_bd / math.sqrt(self.d_k)
+            return self.forward_attention_sdpa(q_with_bias_u, k, v, mask,
+                                               bias=bias), new_cache
+
+        # compute attention score
+        # first compute matrix a and matrix c
+        # as described in https://arxiv.org/abs/1901.02860 Section 3.3
+        # (batch, head, time1, time2)
+        matrix_ac = torch.matmul(q_with_bias_u, k.transpose(-2, -1))
+
         scores = (matrix_ac + matrix_bd) / math.sqrt(
             self.d_k)  # (batch, head, time1, time2)
 
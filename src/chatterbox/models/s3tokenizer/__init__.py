@@ -17,14 +17,15 @@ def drop_invalid_tokens(x):
     """Drop SoS and EoS"""
     assert len(x.shape) == 1 or (len(x.shape) == 2 and x.shape[0] == 1), "only batch size of one allowed for now"
     if SOS in x:
-        s = (x == SOS).nonzero(as_tuple=True)[0].squeeze(0) + 1
+        s = (x == SOS).nonzero(as_tuple=True)[-1][0] + 1
     else:
         s = 0
 
+    # Batched decoding pads finished rows with EOS; cut at the first one
     if EOS in x:
-        e = (x == EOS).nonzero(as_tuple=True)[0].squeeze(0)
+        e = (x == EOS).nonzero(as_tuple=True)[-1][0]
     else:
         e = None
 
-    x = x[s: e]
+    x = x[..., s: e]
     return x
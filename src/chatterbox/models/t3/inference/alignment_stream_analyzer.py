@@ -27,29 +27,52 @@ class AlignmentAnalysisResult:
 
 
 class AlignmentStreamAnalyzer:
-    def __init__(self, tfmr, queue, text_tokens_slice, alignment_layer_idx=9, eos_idx=0):
+    def __init__(self, tfmr, queue, text_tokens_slice, alignment_layer_idx=9, eos_idx=0, text_lengths=None, max_new_tokens=None):
         """
         Some transformer TTS models implicitly solve text-speech alignment in one or more of their self-attention
         activation maps. This module exploits this to perform online integrity checks which streaming.
         A hook is injected into the specified attention layer, and heuristics are used to determine alignment
         position, repetition, etc.
 
+        All state is kept per batch row on the transformer's device, and updated incrementally each frame, so
+        `step` never syncs with the host and never re-scans the alignment history.
+
+        Args:
+            text_tokens_slice: (i, j) span of the (padded) text tokens in the input sequence
+            text_lengths: (B,) real text length per row, including BOS/EOS (defaults to the full span)
+            max_new_tokens: decode cap, used to count the tokens saved by forced EOS
+
         NOTE: currently requires no queues.
         """
         # self.queue = queue
         self.text_tokens_slice = (i, j) = text_tokens_slice
         self.eos_idx = eos_idx
-        # Keep alignment buffer on the same device as the transformer to avoid device syncs/transfers
+        self.max_new_tokens = max_new_tokens
+        self.text_lengths = text_lengths
+        # Keep alignment state on the same device as the transformer to avoid device syncs/transfers
         try:
             self._device = next(tfmr.parameters()).device
         except StopIteration:
             self._device = torch.device("cpu")
-        self.alignment = torch.zeros(0, j - i, device=self._device)
-        # self.alignment_bin = torch.zeros(0, j-i)
         self.curr_frame_pos = 0
-        self.text_position = 0
+        self.num_frames = 0
         self.last_aligned_attn = None
 
+        # Per-row state, allocated on the first step once the batch size is known
+        self.text_position = None
+        self.started = None
+        self.started_at = None
+        self.complete = None
+        self.completed_at = None
+        self.forced = None
+        self.forced_at = None
+        self._long_tail = None
+        self._repetition = None
+        self._prev_frame = None
+        self._head_max = None
+        self._tail_sum = None
+        self._rep_sum = None
+
         # Using `output_attentions=True` is incompatible with optimized attention kernels, so
         # using it for all layers slows things down too much. We can apply it to just one layer
         # by intercepting the kwargs and adding a forward hook (credit: jrm)
@@ -72,7 +95,7 @@ class AlignmentStreamAnalyzer:
             """
             # Detach without forcing CPU sync; keep on-device to avoid per‑token host transfers
             step_attention = output[1].detach()  # (B, 16, N, N)
-            self.last_aligned_attn = step_attention[0].mean(0)  # (N, N)
+            self.last_aligned_attn = step_attention.mean(1)  # (B, N, N)
 
         target_layer = tfmr.layers[alignment_layer_idx].self_attn
         hook_handle = target_layer.register_forward_hook(attention_forward_hook)
@@ -89,74 +112,141 @@ class AlignmentStreamAnalyzer:
 
         target_layer.forward = MethodType(patched_forward, target_layer)
 
+    def _init_state(self, B, S):
+        device = self._device
+        if self.text_lengths is None:
+            self.text_lengths = torch.full((B,), S, dtype=torch.long, device=device)
+        else:
+            self.text_lengths = self.text_lengths.to(device=device, dtype=torch.long).clamp(max=S)
+        self.text_position = torch.zeros(B, dtype=torch.long, device=device)
+        self.started = torch.zeros(B, dtype=torch.bool, device=device)
+        self.started_at = torch.full((B,), -1, dtype=torch.long, device=device)
+        self.complete = torch.zeros(B, dtype=torch.bool, device=device)
+        self.completed_at = torch.full((B,), -1, dtype=torch.long, device=device)
+        self.forced = torch.zeros(B, dtype=torch.bool, device=device)
+        self.forced_at = torch.full((B,), -1, dtype=torch.long, device=device)
+        self._long_tail = torch.zeros(B, dtype=torch.bool, device=device)
+        self._repetition = torch.zeros(B, dtype=torch.bool, device=device)
+        self._prev_frame = torch.zeros(B, S, device=device)
+        self._head_max = torch.zeros(B, device=device)
+        self._tail_sum = torch.zeros(B, 3, device=device)
+        self._rep_sum = torch.zeros(B, device=device)
 
     def step(self, logits):
         """
-        Emits an AlignmentAnalysisResult into the output queue, and potentially modifies the logits to force an EOS.
+        Updates the alignment state with the latest frame, and potentially modifies the logits to force an EOS.
+
+        Args:
+            logits: (B, V) next-token logits of the conditional rows (after CFG combination)
         """
         # extract approximate alignment matrix chunk (1 frame at a time after the first chunk)
-        aligned_attn = self.last_aligned_attn # (N, N)
+        B = logits.size(0)
+        aligned_attn = self.last_aligned_attn[:B].float()  # (B, N, N); CFG rows come first
         i, j = self.text_tokens_slice
         if self.curr_frame_pos == 0:
             # first chunk has conditioning info, text tokens, and BOS token
-            A_chunk = aligned_attn[j:, i:j].clone()  # (T, S)
+            A_chunk = aligned_attn[:, j:, i:j].clone()  # (B, T, S)
         else:
             # subsequent chunks have 1 frame due to KV-caching
-            A_chunk = aligned_attn[:, i:j].clone()  # (1, S)
+            A_chunk = aligned_attn[:, -1:, i:j].clone()  # (B, 1, S)
 
         # TODO: monotonic masking; could have issue b/c spaces are often skipped.
-        A_chunk[:, self.curr_frame_pos + 1:] = 0
+        A_chunk[:, :, self.curr_frame_pos + 1:] = 0
 
-
-        self.alignment = torch.cat((self.alignment, A_chunk), dim=0)
-
-        A = self.alignment
-        T, S = A.shape
+        S = A_chunk.size(-1)
+        if self.text_position is None:
+            self._init_state(B, S)
+        lengths = self.text_lengths  # (B,)
+        cols = torch.arange(S, device=A_chunk.device)
+        # Padded rows (batched generation) only attend over their own text tokens
+        A_chunk = A_chunk * (cols[None, :] < lengths[:, None])[:, None, :]
+        self.num_frames += A_chunk.size(1)
 
         # update position
-        cur_text_posn = A_chunk[-1].argmax()
-        discontinuity = not(-4 < cur_text_posn - self.text_position < 7) # NOTE: very lenient!
-        if not discontinuity:
-            self.text_position = cur_text_posn
+        cur_text_posn = A_chunk[:, -1].argmax(dim=-1)  # (B,)
+        delta = cur_text_posn - self.text_position
+        discontinuity = (delta <= -4) | (delta >= 7)  # NOTE: very lenient!
+        self.text_position = torch.where(discontinuity, self.text_position, cur_text_posn)
 
         # Hallucinations at the start of speech show up as activations at the bottom of the attention maps!
         # To mitigate this, we just wait until there are no activations far off-diagonal in the last 2 tokens,
         # and there are some strong activations in the first few tokens.
-        false_start = (not self.started) and (A[-2:, -2:].max() > 0.1 or A[:, :4].max() < 0.5)
-        self.started = not false_start
-        if self.started and self.started_at is None:
-            self.started_at = T
+        recent = torch.cat([self._prev_frame[:, None], A_chunk], dim=1)[:, -2:]  # last 2 frames
+        last_two_cols = (cols[None, :] >= lengths[:, None] - 2)
+        end_activation = (recent * last_two_cols[:, None, :]).amax(dim=(1, 2))
+        self._head_max = torch.maximum(self._head_max, A_chunk[:, :, :4].amax(dim=(1, 2)))
+        false_start = (~self.started) & ((end_activation > 0.1) | (self._head_max < 0.5))
+        self.started = ~false_start
+        self.started_at = torch.where(self.started & (self.started_at < 0), self.num_frames, self.started_at)
+        self._prev_frame = A_chunk[:, -1]
 
-        # Is generation likely complete?
-        self.complete = self.complete or self.text_position >= S - 3
-        if self.complete and self.completed_at is None:
-            self.completed_at = T
+        # Activations after completion accumulate incrementally (frames strictly after `completed_at`)
+        was_complete = self.complete
+        tail_idx = (lengths[:, None] - 3 + torch.arange(3, device=cols.device)).clamp(min=0)
+        tail_activation = A_chunk.sum(dim=1).gather(1, tail_idx)  # (B, 3)
+        self._tail_sum += tail_activation * was_complete[:, None]
+        prior_cols = (cols[None, :] < lengths[:, None] - 5)
+        prior_activation = (A_chunk * prior_cols[:, None, :]).amax(dim=-1).sum(dim=1)  # (B,)
+        self._rep_sum += prior_activation * was_complete
 
-        # NOTE: EOS rarely assigned activations, and second-last token is often punctuation, so use last 3 tokens.
-        # NOTE: due to the false-start behaviour, we need to make sure we skip activations for the first few tokens.
-        last_text_token_duration = A[15:, -3:].sum()
+        # Is generation likely complete?
+        self.complete = self.complete | (self.text_position >= lengths - 3)
+        self.completed_at = torch.where(self.complete & (self.completed_at < 0), self.num_frames, self.completed_at)
 
         # Activations for the final token that last too long are likely hallucinations.
-        long_tail = self.complete and (A[self.completed_at:, -3:].sum(dim=0).max() >= 10) # 400ms
+        long_tail = self.complete & (self._tail_sum.amax(dim=-1) >= 10)  # 400ms
 
         # If there are activations in previous tokens after generation has completed, assume this is a repetition error.
-        repetition = self.complete and (A[self.completed_at:, :-5].max(dim=1).values.sum() > 5)
+        repetition = self.complete & (self._rep_sum > 5)
+
+        # Suppress EoS to prevent early termination
+        suppress = (cur_text_posn < lengths - 3) & (lengths > 5)  # FIXME: arbitrary
+        logits[:, self.eos_idx] = torch.where(suppress, torch.full_like(logits[:, self.eos_idx], -2**15), logits[:, self.eos_idx])
 
         # If a bad ending is detected, force emit EOS by modifying logits
         # NOTE: this means logits may be inconsistent with latents!
-        if long_tail or repetition:
-            logger.warn(f"forcing EOS token, {long_tail=}, {repetition=}")
-            # (±2**15 is safe for all dtypes >= 16bit)
-            logits = -(2**15) * torch.ones_like(logits)
-            logits[..., self.eos_idx] = 2**15
-
-        # Suppress EoS to prevent early termination
-        if cur_text_posn < S - 3: # FIXME: arbitrary
-            logits[..., self.eos_idx] = -2**15
+        force = long_tail | repetition
+        newly_forced = force & ~self.forced
+        self.forced_at = torch.where(newly_forced, self.curr_frame_pos, self.forced_at)
+        self._long_tail |= newly_forced & long_tail
+        self._repetition |= newly_forced & repetition
+        self.forced |= force
+        # (±2**15 is safe for all dtypes >= 16bit)
+        forced_logits = torch.full_like(logits, -(2**15))
+        forced_logits[:, self.eos_idx] = 2**15
+        logits = torch.where(force[:, None], forced_logits, logits)
 
         self.curr_frame_pos += 1
         return logits
 
+    def stats(self, finished_at=None):
+        """
+        Summarize forced EOS for this generation (syncs with the host; call once at the end).
+
+        Args:
+            finished_at: (B,) step at which each row emitted EOS, used to ignore rows that
+                stopped on their own before a force took effect
+
+        Returns:
+            dict: rows, forced_eos, long_tail, repetition, tokens_saved (decode steps between
+            the forced EOS and the token cap)
+        """
+        if self.forced is None:
+            return {"rows": 0, "forced_eos": 0, "long_tail": 0, "repetition": 0, "tokens_saved": 0}
+        forced = self.forced
+        if finished_at is not None:
+            forced = forced & (finished_at.to(self.forced_at.device) >= self.forced_at)
+        tokens_saved = 0
+        if self.max_new_tokens is not None:
+            tokens_saved = int(((self.max_new_tokens - 1 - self.forced_at) * forced).sum().item())
+        return {
+            "rows": int(forced.numel()),
+            "forced_eos": int(forced.sum().item()),
+            "long_tail": int((self._long_tail & forced).sum().item()),
+            "repetition": int((self._repetition & forced).sum().item()),
+            "tokens_saved": tokens_saved,
+        }
+
     def close(self):
         """
         Remove hooks and restore original forward to prevent accumulation across generations.
@@ -104,8 +104,8 @@ class T3HuggingfaceBackend(LlamaPreTrainedModel, GenerationMixin):
         logits = self.speech_head(hidden_states)
         # assert inputs_embeds.size(0) == 1 # (disabled for CFG)
 
-        # NOTE: hallucination handler may modify logits to force emit an EOS token
-        # logits = self.alignment_stream_analyzer.step(logits)
+        # NOTE: the hallucination handler (alignment_stream_analyzer.step) runs in T3.inference after the
+        # CFG combination, where it can force EOS per batch row
 
         return CausalLMOutputWithCrossAttentions(
             logits=logits,
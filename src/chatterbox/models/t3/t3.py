@@ -76,6 +76,8 @@ class T3(nn.Module):
         self.speech_head = nn.Linear(self.cfg.hidden_size, hp.speech_tokens_dict_size, bias=False)
         # ONNX export compatibility flag
         self.onnx_export_mode = False
+        # Cumulative alignment analyzer counters (rows, forced_eos, long_tail, repetition, tokens_saved)
+        self.alignment_stats = {}
 
     @property
     def device(self):
@@ -247,7 +249,25 @@ class T3(nn.Module):
         return loss_text, loss_speech
 
     @torch.inference_mode()
-    def inference(
+    def inference(self, **kwargs):
+        """
+        Args:
+            text_tokens: a 1D (unbatched) or 2D (batched) tensor.
+
+        Returns:
+            (B, num_tokens) generated speech tokens; see `inference_stream` for all arguments.
+        """
+        generated_ids = None
+        for _, generated_ids in self.inference_stream(**kwargs):
+            pass
+        if generated_ids is None:
+            B = torch.atleast_2d(kwargs["text_tokens"]).size(0)
+            return torch.empty((B, 0), dtype=torch.long, device=self.device)
+        # Generated tokens from the buffer (excluding BOS)
+        return generated_ids[:, 1:]
+
+    @torch.inference_mode()
+    def inference_stream(
         self,
         *,
         t3_cond: T3Cond,
@@ -269,10 +289,20 @@ class T3(nn.Module):
         repetition_penalty=2.0,
         cfg_weight=0,
         enable_alignment_analysis: bool = False,
+        text_lengths: Optional[Tensor]=None,
     ):
         """
+        Decode speech tokens step by step.
+
         Args:
             text_tokens: a 1D (unbatched) or 2D (batched) tensor.
+            text_lengths: (B,) unpadded length of each row including SOT/EOT, for the alignment
+                analyzer. Defaults to the full width for a single row, else each row's first EOT.
+            temperature: one value for all rows, or a sequence with one value per row.
+
+        Yields:
+            (next_token, generated_ids) after every decode step: the (B, 1) sampled tokens (EOS for rows
+            that already finished) and a (B, 1 + steps) view of the token buffer including BOS.
         """
         # Validate / sanitize inputs
         assert prepend_prompt_speech_tokens is None, "not implemented"
@@ -306,14 +336,29 @@ class T3(nn.Module):
                 alignment_stream_analyzer=None,
             )
 
+        # Drop any analyzer left behind by an interrupted generation (its layer patch would stack)
+        if self.patched_model.alignment_stream_analyzer is not None:
+            self.patched_model.alignment_stream_analyzer.close()
+
+        max_new_tokens = int(max_new_tokens or self.hp.max_speech_tokens)
+
         # Enable per-call alignment analysis only when requested
         if enable_alignment_analysis:
+            # Real text length per row (batched text is right-padded with stop_text_token)
+            if text_lengths is not None:
+                text_lengths = torch.as_tensor(text_lengths, dtype=torch.long, device=self.device)
+            elif text_tokens.size(0) == 1:
+                text_lengths = torch.full((1,), text_tokens.size(-1), dtype=torch.long, device=self.device)
+            else:
+                text_lengths = (text_tokens == self.hp.stop_text_token).int().argmax(dim=1) + 1
             alignment_stream_analyzer = AlignmentStreamAnalyzer(
                 self.tfmr,
                 None,
                 text_tokens_slice=(len_cond, len_cond + text_tokens.size(-1)),
                 alignment_layer_idx=9,  # TODO: hparam or something?
                 eos_idx=self.hp.stop_speech_token,
+                text_lengths=text_lengths,
+                max_new_tokens=max_new_tokens,
             )
             self.patched_model.alignment_stream_analyzer = alignment_stream_analyzer
         else:
@@ -341,6 +386,11 @@ class T3(nn.Module):
 
         # Build BOS per batch item
         B = text_tokens.size(0)
+
+        # Per-row temperatures (e.g. best-of-K candidates) scale each row's logits separately
+        if isinstance(temperature, (list, tuple)) or torch.is_tensor(temperature):
+            temperature = torch.as_tensor(temperature, dtype=torch.float32, device=device).view(-1, 1)
+            assert temperature.size(0) == B, f"expected {B} temperatures, got {temperature.size(0)}"
         bos_token = torch.full((B, 1), self.hp.start_speech_token, dtype=torch.long, device=device)
         bos_embed = self.speech_emb(bos_token)  # (B, 1, dim)
         bos_embed = bos_embed + self.speech_pos_emb.get_fixed_embedding(0)
@@ -356,10 +406,13 @@ class T3(nn.Module):
             inputs_embeds = embeds
 
         # Preallocate token buffer on device to avoid per‑step tensor cat and Python list growth
-        max_steps = int(max_new_tokens)
+        max_steps = max_new_tokens
         token_buffer = torch.empty((B, max_steps + 1), dtype=torch.long, device=device)
         token_buffer[:, 0] = bos_token.squeeze(1)
         generated_len = 0  # number of generated tokens (excludes BOS)
+        # Rows that already emitted EOS keep emitting EOS until every row is done
+        finished = torch.zeros(B, dtype=torch.bool, device=device)
+        finished_at = torch.full((B,), max_steps, dtype=torch.long, device=device)
 
         # A view of the currently generated sequence including BOS for processors
         generated_ids = token_buffer[:, :1]
@@ -375,95 +428,113 @@ class T3(nn.Module):
         min_p_warper = MinPLogitsWarper(min_p=min_p)
         repetition_penalty_processor = RepetitionPenaltyLogitsProcessor(penalty=repetition_penalty)
 
-        # ---- Initial Forward Pass (no kv_cache yet) ----
-        output = self.patched_model(
-            inputs_embeds=inputs_embeds,
-            past_key_values=None,
-            use_cache=True,
-            output_attentions=False,
-            output_hidden_states=False,
-            return_dict=True,
-        )
-        # Initialize kv_cache with the full context.
-        past = output.past_key_values
-
-        # ---- Generation Loop using kv_cache ----
-        iterator = tqdm(range(max_new_tokens), desc="Sampling", dynamic_ncols=True)
-        for i in iterator:
-            logits = output.logits[:, -1, :]  # (B or 2B, V)
-
-            # CFG combine per pair
-            if cfg_weight > 0.0:
-                twoB = logits.size(0)
-                assert twoB % 2 == 0, "Expected even batch size for CFG"
-                B_eff = twoB // 2
-                logits = logits.view(2, B_eff, -1)
-                logits_cond = logits[0]
-                logits_uncond = logits[1]
-                logits = logits_cond + cfg_weight * (logits_cond - logits_uncond)  # (B_eff, V)
-
-            # Apply temperature scaling.
-            if temperature != 1.0:
-                logits = logits / temperature
-
-            # Apply repetition penalty, min-p, and top‑p filtering.
-            # Use the appropriate generated_ids size to match logits batch dimension
-            if cfg_weight > 0.0:
-                # For CFG, we reduced logits from 2B to B, so use B-sized generated_ids
-                logits = repetition_penalty_processor(generated_ids, logits)
-            else:
-                # For non-CFG, generated_ids and logits are both B-sized
-                logits = repetition_penalty_processor(generated_ids_cfg, logits)
-            logits = min_p_warper(None, logits)
-            logits = top_p_warper(None, logits)
-
-            # Convert logits to probabilities and sample the next token.
-            probs = torch.softmax(logits, dim=-1)
-            next_token = torch.multinomial(probs, num_samples=1)  # shape: (B, 1)
-
-            # Append into preallocated buffer without new allocations
-            token_buffer[:, generated_len + 1] = next_token.squeeze(1)
-            generated_len += 1
-            generated_ids = token_buffer[:, :generated_len + 1]
-
-            # Update CFG tracking ids as well
-            if cfg_weight > 0.0:
-                next_token_cfg = torch.cat([next_token, next_token], dim=0)  # Duplicate for 2B
-                generated_ids_cfg = torch.cat([generated_ids_cfg, next_token_cfg], dim=1)
-            else:
-                generated_ids_cfg = generated_ids
-
-            # Check for EOS token across the batch: stop only if all reached EOS
-            if (next_token.view(-1) == self.hp.stop_speech_token).all():
-                break
-
-            # Get embedding for the new token.
-            next_token_embed = self.speech_emb(next_token)
-            next_token_embed = next_token_embed + self.speech_pos_emb.get_fixed_embedding(i + 1)
-
-            # Duplicate for CFG (2×B)
-            if cfg_weight > 0.0:
-                next_token_embed = torch.cat([next_token_embed, next_token_embed], dim=0)
-
-            # Forward pass with only the new token and the cached past.
+        try:
+            # ---- Initial Forward Pass (no kv_cache yet) ----
             output = self.patched_model(
-                inputs_embeds=next_token_embed,
-                past_key_values=past,
+                inputs_embeds=inputs_embeds,
+                past_key_values=None,
+                use_cache=True,
                 output_attentions=False,
                 output_hidden_states=False,
                 return_dict=True,
             )
-            # Update the kv_cache.
+            # Initialize kv_cache with the full context.
             past = output.past_key_values
 
-        # Extract generated tokens from buffer (excluding BOS)
-        predicted_tokens = token_buffer[:, 1:generated_len + 1]  # shape: (B, num_tokens)
-
-        # Clean up alignment hook to avoid accumulation across generations
-        if alignment_stream_analyzer is not None:
-            try:
-                alignment_stream_analyzer.close()
-            except Exception:
-                pass
-
-        return predicted_tokens
+            # ---- Generation Loop using kv_cache ----
+            iterator = tqdm(range(max_new_tokens), desc="Sampling", dynamic_ncols=True)
+            for i in iterator:
+                logits = output.logits[:, -1, :]  # (B or 2B, V)
+
+                # CFG combine per pair
+                if cfg_weight > 0.0:
+                    twoB = logits.size(0)
+                    assert twoB % 2 == 0, "Expected even batch size for CFG"
+                    B_eff = twoB // 2
+                    logits = logits.view(2, B_eff, -1)
+                    logits_cond = logits[0]
+                    logits_uncond = logits[1]
+                    logits = logits_cond + cfg_weight * (logits_cond - logits_uncond)  # (B_eff, V)
+
+                # Alignment analysis may suppress an early EOS or force EOS on long tails / repetitions, per row
+                if alignment_stream_analyzer is not None:
+                    logits = alignment_stream_analyzer.step(logits)
+
+                # Apply temperature scaling.
+                if torch.is_tensor(temperature) or temperature != 1.0:
+                    logits = logits / temperature
+
+                # Apply repetition penalty, min-p, and top‑p filtering.
+                # Use the appropriate generated_ids size to match logits batch dimension
+                if cfg_weight > 0.0:
+                    # For CFG, we reduced logits from 2B to B, so use B-sized generated_ids
+                    logits = repetition_penalty_processor(generated_ids, logits)
+                else:
+                    # For non-CFG, generated_ids and logits are both B-sized
+                    logits = repetition_penalty_processor(generated_ids_cfg, logits)
+                logits = min_p_warper(None, logits)
+                logits = top_p_warper(None, logits)
+
+                # Convert logits to probabilities and sample the next token.
+                probs = torch.softmax(logits, dim=-1)
+                next_token = torch.multinomial(probs, num_samples=1)  # shape: (B, 1)
+                next_token = torch.where(finished[:, None], self.hp.stop_speech_token, next_token)
+
+                # Append into preallocated buffer without new allocations
+                token_buffer[:, generated_len + 1] = next_token.squeeze(1)
+                generated_len += 1
+                generated_ids = token_buffer[:, :generated_len + 1]
+
+                # Update CFG tracking ids as well
+                if cfg_weight > 0.0:
+                    next_token_cfg = torch.cat([next_token, next_token], dim=0)  # Duplicate for 2B
+                    generated_ids_cfg = torch.cat([generated_ids_cfg, next_token_cfg], dim=1)
+                else:
+                    generated_ids_cfg = generated_ids
+
+                # Check for EOS token across the batch: stop once every row has reached EOS
+                is_eos = next_token.view(-1) == self.hp.stop_speech_token
+                finished_at = torch.where(is_eos & ~finished, i, finished_at)
+                finished |= is_eos
+                yield next_token, generated_ids
+                if finished.all():
+                    break
+
+                # Get embedding for the new token.
+                next_token_embed = self.speech_emb(next_token)
+                next_token_embed = next_token_embed + self.speech_pos_emb.get_fixed_embedding(i + 1)
+
+                # Duplicate for CFG (2×B)
+                if cfg_weight > 0.0:
+                    next_token_embed = torch.cat([next_token_embed, next_token_embed], dim=0)
+
+                # Forward pass with only the new token and the cached past.
+                output = self.patched_model(
+                    inputs_embeds=next_token_embed,
+                    past_key_values=past,
+                    output_attentions=False,
+                    output_hidden_states=False,
+                    return_dict=True,
+                )
+                # Update the kv_cache.
+                past = output.past_key_values
+        finally:
+            # Clean up alignment hook to avoid accumulation across generations
+            if alignment_stream_analyzer is not None:
+                try:
+                    stats = alignment_stream_analyzer.stats(finished_at)
+                    for key, value in stats.items():
+                        self.alignment_stats[key] = self.alignment_stats.get(key, 0) + value
+                    if stats["forced_eos"]:
+                        logger.info(
+                            f"Alignment analyzer forced EOS on {stats['forced_eos']}/{stats['rows']} rows "
+                            f"(long_tail={stats['long_tail']}, repetition={stats['repetition']}), "
+                            f"{stats['tokens_saved']} tokens saved"
+                        )
+                except Exception as e:
+                    logger.debug(f"Alignment stats unavailable: {e}")
+                try:
+                    alignment_stream_analyzer.close()
+                except Exception:
+                    pass
+                self.patched_model.alignment_stream_analyzer = None
@@ -0,0 +1,104 @@
+"""
+In-process artifact cleaning (threshold/margin silence cutting)
+
+Replaces the `auto-editor --edit audio:threshold=T --margin Ms` subprocess.
+The audio is split into frames at auto-editor's timebase. A frame is loud when
+its peak, relative to the segment's peak, reaches `threshold`. Loud blips
+shorter than `MIN_CLIP_FRAMES` are dropped, quiet gaps shorter than
+`MIN_CUT_FRAMES` are kept, and the remaining loud regions are widened by
+`margin` seconds on each side. Only frames in those regions are kept.
+
+A batch of segments is padded into one 2-D array, so framing and the run
+filters run once for the whole batch rather than once per segment.
+"""
+
+import numpy as np
+
+FRAME_RATE = 30          # auto-editor timebase for audio-only input (frames per second)
+MIN_CLIP_FRAMES = 3      # auto-editor `minclip` default: shorter loud runs are removed
+MIN_CUT_FRAMES = 6       # auto-editor `mincut` default: shorter quiet runs are kept
+
+
+def _window_any(mask, before, after):
+    """mask[:, i] -> any(mask[:, i-before : i+after+1]) for each row (binary dilation)"""
+    if before == 0 and after == 0:
+        return mask
+    padded = np.pad(mask.astype(np.int32), ((0, 0), (before + 1, after)))
+    csum = np.cumsum(padded, axis=1)
+    width = before + after + 1
+    return (csum[:, width:] - csum[:, :-width]) > 0
+
+
+def _window_all(mask, before, after):
+    """mask[:, i] -> all(mask[:, i-before : i+after+1]) for each row (binary erosion, edges count as set)"""
+    return ~_window_any(~mask, before, after)
+
+
+def _remove_short_runs(mask, min_len):
+    """Clear True runs shorter than min_len (1-D morphological opening along each row)"""
+    if min_len <= 1:
+        return mask
+    before, after = (min_len - 1) // 2, min_len // 2
+    return _window_any(_window_all(mask, before, after), after, before)
+
+
+def keep_masks(levels, threshold, margin_frames):
+    """
+    Frame keep-masks for a (batch, frames) array of relative peak levels
+
+    Args:
+        levels: Per-frame peak / segment peak, shape (batch, frames)
+        threshold: Loudness threshold (0-1), auto-editor `audio:threshold`
+        margin_frames: Frames kept on each side of loud regions
+
+    Returns:
+        np.ndarray: bool, shape (batch, frames)
+    """
+    loud = levels >= threshold
+    loud = _remove_short_runs(loud, MIN_CLIP_FRAMES)
+    loud = ~_remove_short_runs(~loud, MIN_CUT_FRAMES)
+    return _window_any(loud, margin_frames, margin_frames)
+
+
+def cut_silence_batch(segments, sample_rate, threshold=0.06, margin=0.2):
+    """
+    Remove quiet/artifact regions from several mono segments at once
+
+    Args:
+        segments: 1-D float arrays (None entries are passed through)
+        sample_rate: Sample rate of all segments
+        threshold: Relative volume below which frames are cut (auto-editor `audio:threshold`)
+        margin: Seconds kept around loud regions (auto-editor `--margin`)
+
+    Returns:
+        list: Cleaned 1-D arrays (a segment with no loud frames is returned unchanged)
+    """
+    hop = max(1, int(round(sample_rate / FRAME_RATE)))
+    margin_frames = int(round(margin * FRAME_RATE))
+    live = [i for i, seg in enumerate(segments) if seg is not None and len(seg) > 0]
+    results = list(segments)
+    if not live:
+        return results
+
+    n_frames = [-(-len(segments[i]) // hop) for i in live]
+    max_frames = max(n_frames)
+    frames = np.zeros((len(live), max_frames * hop), dtype=np.float32)
+    for row, i in enumerate(live):
+        frames[row, :len(segments[i])] = np.abs(segments[i])
+    frame_peaks = frames.reshape(len(live), max_frames, hop).max(axis=2)
+    seg_peaks = frame_peaks.max(axis=1, keepdims=True)
+    levels = np.divide(frame_peaks, seg_peaks, out=np.zeros_like(frame_peaks), where=seg_peaks > 0)
+
+    masks = keep_masks(levels, threshold, margin_frames)
+    for row, i in enumerate(live):
+        mask = masks[row, :n_frames[row]]
+        if not mask.any() or mask.all():
+            continue
+        sample_mask = np.repeat(mask, hop)[:len(segments[i])]
+        results[i] = segments[i][sample_mask]
+    return results
+
+
+def cut_silence(audio, sample_rate, threshold=0.06, margin=0.2):
+    """Single-segment `cut_silence_batch`"""
+    return cut_silence_batch([audio], sample_rate, threshold, margin)[0]
@@ -0,0 +1,105 @@
+"""
+Speech token budget for T3 decoding
+
+Estimates how many speech tokens a text needs from its length, so decoding is
+capped (and the T3 token buffer sized) per chunk instead of at a fixed 1000.
+The tokens-per-character rate is calibrated from past runs' performance.log
+(rows `index,chars,seconds,audio_seconds`), taking a high percentile so slow
+or pause-heavy chunks still fit.
+"""
+
+import logging
+from pathlib import Path
+
+import numpy as np
+
+# S3 speech tokens per second of audio
+SPEECH_TOKEN_RATE = 25
+
+
+def count_budget_units(text: str) -> int:
+    """Characters that carry speech time (whitespace-collapsed length)"""
+    return len(" ".join((text or "").split()))
+
+
+def calibrate_tokens_per_char(log_path, percentile=95.0, min_samples=20, min_chars=20):
+    """
+    Learn tokens-per-character from performance.log
+
+    Args:
+        log_path: Path to performance.log
+        percentile: Percentile of the observed per-chunk rates to return
+        min_samples: Minimum usable rows required for calibration
+        min_chars: Ignore chunks shorter than this (rates are noisy)
+
+    Returns:
+        float or None: Calibrated rate, or None if there is not enough data
+    """
+    log_path = Path(log_path)
+    if not log_path.exists():
+        return None
+
+    rates = []
+    try:
+        with open(log_path, "r") as f:
+            for line in f:
+                parts = line.strip().split(",")
+                # Older rows only have index,chars,seconds - no audio length to learn from
+                if len(parts) < 4:
+                    continue
+                try:
+                    chars, audio_seconds = int(parts[1]), float(parts[3])
+                except ValueError:
+                    continue
+                if chars >= min_chars and audio_seconds > 0:
+                    rates.append(audio_seconds * SPEECH_TOKEN_RATE / chars)
+    except OSError as e:
+        logging.warning(f"Could not read {log_path} for token budget calibration: {e}")
+        return None
+
+    if len(rates) < min_samples:
+        return None
+    return float(np.percentile(rates, percentile))
+
+
+class TokenBudget:
+    """Maps text to a max_new_tokens value for T3"""
+
+    def __init__(self, tokens_per_char, margin=1.3, slack_tokens=25, min_tokens=75, max_tokens=1000):
+        self.tokens_per_char = tokens_per_char
+        self.margin = margin
+        self.slack_tokens = slack_tokens
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+
+    @classmethod
+    def from_config(cls):
+        """Build from config, calibrating from performance.log when it has enough rows"""
+        from config.config import (
+            TOKEN_BUDGET_TOKENS_PER_CHAR, TOKEN_BUDGET_MARGIN, TOKEN_BUDGET_SLACK_TOKENS,
+            TOKEN_BUDGET_MIN_TOKENS, TOKEN_BUDGET_MAX_TOKENS, TOKEN_BUDGET_PERCENTILE,
+            TOKEN_BUDGET_LOG_PATH,
+        )
+
+        rate = calibrate_tokens_per_char(TOKEN_BUDGET_LOG_PATH, percentile=TOKEN_BUDGET_PERCENTILE)
+        if rate is not None:
+            logging.info(f"Token budget calibrated from {TOKEN_BUDGET_LOG_PATH}: {rate:.3f} tokens/char (p{TOKEN_BUDGET_PERCENTILE:g})")
+        else:
+            rate = TOKEN_BUDGET_TOKENS_PER_CHAR
+
+        return cls(
+            tokens_per_char=rate,
+            margin=TOKEN_BUDGET_MARGIN,
+            slack_tokens=TOKEN_BUDGET_SLACK_TOKENS,
+            min_tokens=TOKEN_BUDGET_MIN_TOKENS,
+            max_tokens=TOKEN_BUDGET_MAX_TOKENS,
+        )
+
+    def for_text(self, text: str) -> int:
+        """Token budget for one text"""
+        estimate = count_budget_units(text) * self.tokens_per_char * self.margin + self.slack_tokens
+        return int(min(self.max_tokens, max(self.min_tokens, estimate)))
+
+    def for_texts(self, texts) -> int:
+        """Token budget for a batch (the longest text sets the shared decode length)"""
+        return max((self.for_text(t) for t in texts), default=self.min_tokens)
@@ -1,11 +1,8 @@
 from dataclasses import dataclass
 from pathlib import Path
-import tempfile
-import subprocess
 import os
-import threading
-import queue
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+import logging
 
 
 import librosa
@@ -13,22 +10,47 @@ import torch
 import perth
 import torch.nn.functional as F
 from huggingface_hub import hf_hub_download
-from safetensors.torch import load_file
 import re
-from config.config import ENABLE_INLINE_PAUSES, INLINE_PAUSE_1_MS, INLINE_PAUSE_2_MS
+from config.config import CHECKPOINT_MMAP, LAZY_MODEL_COMPONENTS
+from config.config import ENABLE_INLINE_PAUSES, INLINE_PAUSE_1_MS, INLINE_PAUSE_2_MS, S3GEN_ATTENTION_BACKEND, ENABLE_TOKEN_BUDGET, TOKEN_BUDGET_MAX_TOKENS, ENABLE_ALIGNMENT_EARLY_STOP, STREAM_FIRST_CHUNK_TOKENS, STREAM_CHUNK_TOKENS
 import numpy as np
 import torchaudio
 
 from .models.t3 import T3
-from .models.s3tokenizer import S3_SR, drop_invalid_tokens
+from .models.s3tokenizer import S3_SR, S3Tokenizer, drop_invalid_tokens
 from .models.s3gen import S3GEN_SR, S3Gen
 from .models.tokenizers import EnTokenizer
 from .models.voice_encoder import VoiceEncoder
 from .models.t3.modules.cond_enc import T3Cond
 from .text_utils import split_text_into_segments
+from .token_budget import TokenBudget
+from .silence_cut import cut_silence_batch
+from .checkpoint import LazyComponent, load_component, read_state_dict, format_timings
+from .checkpoint import share_state_dict, attach_state_dict, load_weights
 
 
 REPO_ID = "ResembleAI/chatterbox"
+CKPT_FILES = ["ve.safetensors", "t3_cfg.safetensors", "s3gen.safetensors", "tokenizer.json", "conds.pt"]
+
+
+_resolved_ckpt_dir = None
+
+
+def resolve_checkpoint_dir():
+    """
+    Local folder with the hub checkpoint files
+
+    Uses the local hub cache without network requests when every file is already
+    there, and remembers the folder so reloads skip the hub entirely.
+    """
+    global _resolved_ckpt_dir
+    if _resolved_ckpt_dir is None:
+        try:
+            paths = [hf_hub_download(repo_id=REPO_ID, filename=f, local_files_only=True) for f in CKPT_FILES]
+        except Exception:
+            paths = [hf_hub_download(repo_id=REPO_ID, filename=f) for f in CKPT_FILES]
+        _resolved_ckpt_dir = Path(paths[-1]).parent
+    return _resolved_ckpt_dir
 
 
 def punc_norm(text: str) -> str:
@@ -131,15 +153,48 @@ class ChatterboxTTS:
         self.sr = S3GEN_SR  # sample rate of synthesized audio
         self.t3 = t3
         self.s3gen = s3gen
-        self.ve = ve
+        self._ve = ve  # VoiceEncoder, or a LazyComponent loaded by the `ve` property
         self.tokenizer = tokenizer
         self.device = device
         self.conds = conds
+        self.load_timings = {}
+        self.ckpt_dir = None
+        self._shared_weights = None
         self.watermarker = perth.PerthImplicitWatermarker()
+        self.token_budget = TokenBudget.from_config() if ENABLE_TOKEN_BUDGET else None
+        self.last_speech_token_counts = []  # Speech tokens vocoded per output wave of the last generate/generate_batch
+
+    @property
+    def ve(self):
+        if isinstance(self._ve, LazyComponent):
+            self._ve = self._ve.get()
+        return self._ve
+
+    @ve.setter
+    def ve(self, value):
+        self._ve = value
+
+    def _max_new_tokens(self, texts):
+        """Decode cap for the given (normalized) texts: length-aware budget, or the fixed cap"""
+        if self.token_budget is None:
+            return TOKEN_BUDGET_MAX_TOKENS
+        return self.token_budget.for_texts(texts)
 
     @classmethod
-    def from_local(cls, ckpt_dir, device) -> 'ChatterboxTTS':
+    def from_local(cls, ckpt_dir, device, mmap_weights=None, lazy=None) -> 'ChatterboxTTS':
+        """
+        Load from a checkpoint folder
+
+        Args:
+            ckpt_dir: Folder with the CKPT_FILES
+            device: Default device (GENTTS_VE/T3/S3GEN_DEVICE override per component)
+            mmap_weights: Memory-map weights and skip random init (default CHECKPOINT_MMAP)
+            lazy: Load the voice encoder and S3 tokenizer on first use (default LAZY_MODEL_COMPONENTS)
+        """
         ckpt_dir = Path(ckpt_dir)
+        mmap_weights = CHECKPOINT_MMAP if mmap_weights is None else mmap_weights
+        lazy = LAZY_MODEL_COMPONENTS if lazy is None else lazy
+        timings = {}
 
         # Always load to CPU first for non-CUDA devices to handle CUDA-saved models
         if device in ["cpu", "mps"]:
@@ -147,39 +202,63 @@ class ChatterboxTTS:
         else:
             map_location = None
 
-        import os
-        ve = VoiceEncoder()
-        ve.load_state_dict(
-            load_file(ckpt_dir / "ve.safetensors")
-        )
         ve_dev = os.getenv("GENTTS_VE_DEVICE", device)
-        ve.to(ve_dev).eval()
-
-        t3 = T3()
-        t3_state = load_file(ckpt_dir / "t3_cfg.safetensors")
-        if "model" in t3_state.keys():
-            t3_state = t3_state["model"][0]
-        t3.load_state_dict(t3_state)
         t3_dev = os.getenv("GENTTS_T3_DEVICE", device)
-        t3.to(t3_dev).eval()
-
-        s3gen = S3Gen()
-        s3gen.load_state_dict(
-            load_file(ckpt_dir / "s3gen.safetensors"), strict=False
-        )
         s3_dev = os.getenv("GENTTS_S3GEN_DEVICE", device)
-        s3gen.to(s3_dev).eval()
 
+        def load_ve():
+            return load_component("VoiceEncoder", VoiceEncoder, read_state_dict(ckpt_dir / "ve.safetensors", mmap_weights),
+                                  ve_dev, mmap_weights=mmap_weights, timings=None if lazy else timings)
+
+        ve = LazyComponent("VoiceEncoder", load_ve, timings) if lazy else load_ve()
+
+        start = time.perf_counter()
+        t3_state = read_state_dict(ckpt_dir / "t3_cfg.safetensors", mmap_weights)
+        if "model" in t3_state.keys():
+            t3_state = t3_state["model"][0]
+        t3 = load_component("T3", T3, t3_state, t3_dev, mmap_weights=mmap_weights)
+        del t3_state
+        timings["T3"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        s3_state = read_state_dict(ckpt_dir / "s3gen.safetensors", mmap_weights)
+        ignore_missing = S3Tokenizer.ignore_state_dict_missing
+        if lazy:
+            tok_state = {k[len("tokenizer."):]: v for k, v in s3_state.items() if k.startswith("tokenizer.")}
+            s3_state = {k: v for k, v in s3_state.items() if not k.startswith("tokenizer.")}
+        s3gen = load_component("S3Gen", lambda: S3Gen(lazy_tokenizer=lazy), s3_state, s3_dev, strict=False,
+                               ignore_missing=ignore_missing, mmap_weights=mmap_weights)
+        del s3_state
+        s3gen.set_attention_backend(os.getenv("GENTTS_S3GEN_ATTENTION", S3GEN_ATTENTION_BACKEND))
+        timings["S3Gen"] = time.perf_counter() - start
+
+        if lazy:
+            def load_s3_tokenizer():
+                return load_component("S3Tokenizer", lambda: S3Tokenizer("speech_tokenizer_v2_25hz"), tok_state,
+                                      s3gen.device, strict=False, ignore_missing=ignore_missing,
+                                      mmap_weights=mmap_weights)
+
+            s3gen.defer_tokenizer(LazyComponent("S3Tokenizer", load_s3_tokenizer, timings))
+
+        start = time.perf_counter()
         tokenizer = EnTokenizer(
             str(ckpt_dir / "tokenizer.json")
         )
+        timings["EnTokenizer"] = time.perf_counter() - start
 
         conds = None
         if (builtin_voice := ckpt_dir / "conds.pt").exists():
+            start = time.perf_counter()
             # Place conditionals with T3 by default
             conds = Conditionals.load(builtin_voice, map_location=map_location).to(t3_dev)
+            timings["conds"] = time.perf_counter() - start
 
-        return cls(t3, s3gen, ve, tokenizer, device, conds=conds)
+        model = cls(t3, s3gen, ve, tokenizer, device, conds=conds)
+        model.load_timings = timings
+        model.ckpt_dir = ckpt_dir
+        deferred = ("VoiceEncoder", "S3Tokenizer") if lazy else ()
+        print(f"📦 Model load ({'mmap' if mmap_weights else 'full read'}): {format_timings(timings, deferred)}")
+        return model
 
     @classmethod
     def from_pretrained(cls, device) -> 'ChatterboxTTS':
@@ -191,10 +270,65 @@ class ChatterboxTTS:
                 print("MPS not available because the current MacOS version is not 12.3+ and/or you do not have an MPS-enabled device on this machine.")
             device = "cpu"
 
-        for fpath in ["ve.safetensors", "t3_cfg.safetensors", "s3gen.safetensors", "tokenizer.json", "conds.pt"]:
-            local_path = hf_hub_download(repo_id=REPO_ID, filename=fpath)
+        return cls.from_local(resolve_checkpoint_dir(), device)
+
+    def share_weights(self):
+        """
+        Move the T3/S3Gen weights into shared memory for render worker processes
+
+        The modules here are re-pointed at the shared copy, so this process keeps a
+        single copy too. CPU models only.
 
-        return cls.from_local(Path(local_path).parent, device)
+        Returns:
+            dict: Picklable bundle for `from_shared` (one shared buffer per component)
+        """
+        if self._shared_weights is None:
+            shared = {"s3gen_lazy_tokenizer": "tokenizer" not in self.s3gen._modules}
+            for name, module in (("t3", self.t3), ("s3gen", self.s3gen)):
+                arena, index = share_state_dict(module.state_dict())
+                load_weights(module, attach_state_dict(arena, index), strict=True, assign=True)
+                shared[name] = (arena, index)
+            self._shared_weights = shared
+        bundle = dict(self._shared_weights, ckpt_dir=str(self.ckpt_dir), conds=None)
+        if self.conds is not None:
+            bundle["conds"] = {"t3": dict(self.conds.t3.__dict__), "gen": dict(self.conds.gen)}
+        return bundle
+
+    @classmethod
+    def from_shared(cls, bundle, device="cpu") -> 'ChatterboxTTS':
+        """Build a model around the shared weights from `share_weights` (in a worker process)"""
+        ckpt_dir = Path(bundle["ckpt_dir"])
+        lazy_tokenizer = bundle["s3gen_lazy_tokenizer"]
+        ignore_missing = S3Tokenizer.ignore_state_dict_missing
+        timings = {}
+
+        t3 = load_component("T3", T3, attach_state_dict(*bundle["t3"]), device, timings=timings)
+        s3gen = load_component("S3Gen", lambda: S3Gen(lazy_tokenizer=lazy_tokenizer), attach_state_dict(*bundle["s3gen"]),
+                               device, strict=False, ignore_missing=ignore_missing, timings=timings)
+        s3gen.set_attention_backend(os.getenv("GENTTS_S3GEN_ATTENTION", S3GEN_ATTENTION_BACKEND))
+
+        # Only needed if the worker builds new conditionals
+        if lazy_tokenizer:
+            def load_s3_tokenizer():
+                s3_state = read_state_dict(ckpt_dir / "s3gen.safetensors")
+                tok_state = {k[len("tokenizer."):]: v for k, v in s3_state.items() if k.startswith("tokenizer.")}
+                return load_component("S3Tokenizer", lambda: S3Tokenizer("speech_tokenizer_v2_25hz"), tok_state,
+                                      device, strict=False, ignore_missing=ignore_missing)
+
+            s3gen.defer_tokenizer(LazyComponent("S3Tokenizer", load_s3_tokenizer, timings))
+
+        ve = LazyComponent("VoiceEncoder", lambda: load_component(
+            "VoiceEncoder", VoiceEncoder, read_state_dict(ckpt_dir / "ve.safetensors"), device), timings)
+        tokenizer = EnTokenizer(str(ckpt_dir / "tokenizer.json"))
+
+        conds = None
+        if bundle["conds"] is not None:
+            conds = Conditionals(T3Cond(**bundle["conds"]["t3"]), dict(bundle["conds"]["gen"]))
+
+        model = cls(t3, s3gen, ve, tokenizer, device, conds=conds)
+        model.load_timings = timings
+        model.ckpt_dir = ckpt_dir
+        return model
 
     def prepare_conditionals(self, wav_fpath, exaggeration=0.5):
         ## Load reference wav
@@ -237,8 +371,9 @@ class ChatterboxTTS:
         ae_margin=0.2,
         disable_watermark=False,
         max_segment_length=300,
-        max_workers=None,  # None means auto-detect optimal value
+        max_workers=None,  # Unused; segments are batched instead of threaded
     ):
+        self.last_speech_token_counts = []
         if audio_prompt_path:
             self.prepare_conditionals(audio_prompt_path, exaggeration=exaggeration)
         else:
@@ -255,12 +390,11 @@ class ChatterboxTTS:
 
         # Long text processing: automatically determine if text needs to be split based on length
         if len(text) > max_segment_length:
-            # Use async batch generation
-            if max_workers is None:
-                max_workers = 3  # Simple default value
-            return self._generate_long_text_async(
+            # Use batched generation of the split segments
+            wav = self._generate_long_text_async(
                 text,
                 max_segment_length=max_segment_length,
+                exaggeration=exaggeration,
                 cfg_weight=cfg_weight,
                 temperature=temperature,
                 repetition_penalty=repetition_penalty,
@@ -272,6 +406,8 @@ class ChatterboxTTS:
                 disable_watermark=disable_watermark,
                 max_workers=max_workers
             )
+            self._total_speech_token_count()
+            return wav
 
         # Parse pause tags BEFORE applying punc_norm to preserve the tags
         segments = parse_pause_tags(text)
@@ -285,102 +421,198 @@ class ChatterboxTTS:
 
             # Clean artifacts (if enabled)
             if use_auto_editor:
-                # Save temporary audio file
-                import tempfile
-                with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                    temp_audio_path = temp_file.name
-                torchaudio.save(temp_audio_path, segment_audio, self.sr)
-
-                # Clean artifacts
-                cleaned_audio_path = self._clean_artifacts(temp_audio_path, ae_threshold, ae_margin)
-
-                # Load cleaned audio
-                if cleaned_audio_path != temp_audio_path:
-                    try:
-                        cleaned_audio, _ = torchaudio.load(cleaned_audio_path)
-                        # Clean temporary files
-                        if os.path.exists(temp_audio_path):
-                            os.unlink(temp_audio_path)
-                        if os.path.exists(cleaned_audio_path):
-                            os.unlink(cleaned_audio_path)
-                        return cleaned_audio
-                    except Exception as e:
-                        print(f"[WARNING] Unable to load cleaned audio: {e}")
-                        # Clean temporary files
-                        if os.path.exists(temp_audio_path):
-                            os.unlink(temp_audio_path)
-                        if os.path.exists(cleaned_audio_path):
-                            os.unlink(cleaned_audio_path)
-                else:
-                    # Cleaning failed, use original audio
-                    if os.path.exists(temp_audio_path):
-                        os.unlink(temp_audio_path)
+                return self._clean_audio_segments_batch([segment_audio], ae_threshold, ae_margin)[0]
 
             return segment_audio
 
-        # Process text with pauses - generate and clean each segment first, then add pauses
+        # Process text with pauses - generate all text segments in one batch,
+        # clean each segment, then stitch the pauses back in
+        text_parts = [text_segment for text_segment, _ in segments if text_segment.strip()]
+        generated = self._generate_segments_batched(
+            text_parts, exaggeration, cfg_weight, temperature,
+            repetition_penalty, min_p, top_p, disable_watermark
+        )
+        if use_auto_editor:
+            generated = self._clean_audio_segments_batch(generated, ae_threshold, ae_margin)
+        generated = iter(generated)
+        self._total_speech_token_count()
+
         audio_segments = []
-        temp_files_to_cleanup = []
+        for text_segment, pause_duration in segments:
+            if text_segment.strip():
+                audio_segments.append(next(generated).squeeze(0))
+
+            # Add pause (after artifact cleaning)
+            if pause_duration > 0:
+                silence = create_silence(pause_duration, self.sr)
+                audio_segments.append(silence.squeeze(0))
+
+        # Concatenate all audio segments
+        if audio_segments:
+            final_audio = torch.cat(audio_segments, dim=0)
+            return final_audio.unsqueeze(0)
+        else:
+            # If no valid audio segments, return brief silence
+            return create_silence(0.1, self.sr)
 
-        try:
-            for text_segment, pause_duration in segments:
-                if text_segment.strip():  # Non-empty text segment
-                    # 1. Generate audio segment
-                    segment_audio = self._generate_single_segment(
-                        text_segment, cfg_weight, temperature, repetition_penalty, min_p, top_p, disable_watermark
-                    )
-
-                    # 2. Clean artifacts for this segment
-                    if use_auto_editor:
-                        # Save temporary audio file
-                        import tempfile
-                        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                            temp_audio_path = temp_file.name
-                        temp_files_to_cleanup.append(temp_audio_path)
-                        torchaudio.save(temp_audio_path, segment_audio, self.sr)
-
-                        # Clean artifacts
-                        cleaned_audio_path = self._clean_artifacts(temp_audio_path, ae_threshold, ae_margin)
-                        if cleaned_audio_path != temp_audio_path:
-                            temp_files_to_cleanup.append(cleaned_audio_path)
-
-                        # Load cleaned audio
-                        try:
-                            if cleaned_audio_path != temp_audio_path:
-                                cleaned_audio, _ = torchaudio.load(cleaned_audio_path)
-                                segment_audio = cleaned_audio
-                        except Exception as e:
-                            print(f"[WARNING] Unable to load cleaned audio segment: {e}")
-                            # Continue using original audio segment
-
-                    audio_segments.append(segment_audio.squeeze(0))
-
-                # 3. Add pause (after artifact cleaning)
-                if pause_duration > 0:
-                    silence = create_silence(pause_duration, self.sr)
-                    audio_segments.append(silence.squeeze(0))
-
-            # 4. Concatenate all audio segments
-            if audio_segments:
-                final_audio = torch.cat(audio_segments, dim=0)
-                return final_audio.unsqueeze(0)
-            else:
-                # If no valid audio segments, return brief silence
-                return create_silence(0.1, self.sr)
+    @torch.inference_mode()
+    def generate_stream(
+        self,
+        text,
+        repetition_penalty=1.2,
+        min_p=0.05,
+        top_p=1.0,
+        audio_prompt_path=None,
+        exaggeration=0.5,
+        cfg_weight=0.5,
+        temperature=0.8,
+        disable_watermark=False,
+        first_chunk_tokens=STREAM_FIRST_CHUNK_TOKENS,
+        chunk_tokens=STREAM_CHUNK_TOKENS,
+    ):
+        """
+        Stream audio for one text segment while T3 is still decoding.
+
+        Every `chunk_tokens` new speech tokens, the flow runs over those tokens plus the 17 tokens
+        that ended the previous window, with finalize=False (the lookahead tokens are held back).
+        The flow cache carries the noise and encoder output of the prompt and that overlap from
+        window to window, so the overlap is decoded the same way again and each window costs the
+        same however long the chunk gets. Only the new mel frames go through HiFT. HiFT keeps its
+        source excitation and a short mel/audio overlap between windows, which are cross-faded,
+        so consecutive chunks join without seams.
+
+        Used by `tools/run_tts_once.py --stream` and the TTS server's streamed responses.
+
+        Pause tags and artifact cleaning are not applied; use `generate` for finished chunks.
 
+        Yields:
+            1×N wave tensors (CPU) in playback order
+        """
+        if audio_prompt_path:
+            self.prepare_conditionals(audio_prompt_path, exaggeration=exaggeration)
+        else:
+            assert self.conds is not None, "Please `prepare_conditionals` first or specify `audio_prompt_path`"
+
+        # Update exaggeration if needed
+        if exaggeration != self.conds.t3.emotion_adv[0, 0, 0]:
+            _cond: T3Cond = self.conds.t3
+            self.conds.t3 = T3Cond(
+                speaker_emb=_cond.speaker_emb,
+                cond_prompt_speech_tokens=_cond.cond_prompt_speech_tokens,
+                emotion_adv=exaggeration * torch.ones(1, 1, 1),
+            ).to(device=self.device)
+
+        # Norm and tokenize text
+        text = punc_norm(text)
+        text_tokens = self.tokenizer.text_to_tokens(text).to(self.device)
+        text_tokens = F.pad(text_tokens, (1, 0), value=self.t3.hp.start_text_token)
+        text_tokens = F.pad(text_tokens, (0, 1), value=self.t3.hp.stop_text_token)
+
+        # HiFT overlap between windows (CosyVoice2 streaming values): 8 mel frames = 8 × 480 samples
+        mel_cache_len = 8
+        source_cache_len = mel_cache_len * 480
+        window = torch.from_numpy(np.hamming(2 * source_cache_len)).float()
+        # Flow windows: tokens shared with the previous window, and tokens held back as lookahead
+        flow = self.s3gen.flow
+        overlap_tokens = flow.decoder.FLOW_CACHE_OVERLAP // flow.token_mel_ratio
+        lookahead = flow.pre_lookahead_len
+        min_tokens = lookahead + overlap_tokens  # the first window must cover the overlap
+
+        state = {"emitted": 0, "flow_cache": torch.zeros(1, 80, 0, 2, device=self.device),
+                 "hift_cache": None, "first": True}
+
+        def vocode(speech_tokens, finalize):
+            # Tokens whose mels went out already; the window restarts `overlap_tokens` before them
+            emitted = state["emitted"]
+            start = emitted - overlap_tokens if emitted else 0
+            mels, flow_cache = self.s3gen.flow_inference_window(
+                torch.tensor(speech_tokens[start:], dtype=torch.long, device=self.device),
+                self.conds.gen,
+                state["flow_cache"],
+                finalize=finalize,
+            )
+            new_mels = mels[:, :, (emitted - start) * flow.token_mel_ratio:]
+            if new_mels.size(2) == 0 and not finalize:
+                return None
+            state["flow_cache"] = flow_cache
+            state["emitted"] = len(speech_tokens) - (0 if finalize else lookahead)
+
+            hift_cache = state["hift_cache"]
+            if hift_cache is not None:
+                new_mels = torch.cat([hift_cache["mel"], new_mels], dim=2)
+                cache_source = hift_cache["source"]
+            else:
+                cache_source = None
+            if new_mels.size(2) == 0:
+                return None
+
+            wav, source = self.s3gen.hift_inference(new_mels, cache_source)
+
+            # Cross-fade the overlap with the tail held back from the previous window
+            if hift_cache is not None:
+                n = min(source_cache_len, wav.size(1), hift_cache["speech"].size(1))
+                win = window.to(wav.device)
+                wav[:, :n] = wav[:, :n] * win[:n] + hift_cache["speech"][:, -n:] * win[source_cache_len:source_cache_len + n]
+
+            if not finalize:
+                state["hift_cache"] = {
+                    "mel": new_mels[:, :, -mel_cache_len:],
+                    "source": source[:, :, -source_cache_len:],
+                    "speech": wav[:, -source_cache_len:].clone(),
+                }
+                wav = wav[:, :-source_cache_len]
+
+            if state["first"]:
+                # Same spillover fade-in as S3Gen.inference, on the first samples of the stream
+                fade_len = min(wav.size(1), len(self.s3gen.trim_fade))
+                wav[:, :fade_len] *= self.s3gen.trim_fade[:fade_len]
+                state["first"] = False
+
+            wav = wav.detach().cpu()
+            if not disable_watermark and wav.shape[-1] >= 2048:
+                wav = torch.from_numpy(self.watermarker.apply_watermark(wav.squeeze(0).numpy(), sample_rate=self.sr)).unsqueeze(0)
+            return wav
+
+        speech_tokens = []
+        vocoded = 0
+        stream = self.t3.inference_stream(
+            t3_cond=self.conds.t3,
+            text_tokens=text_tokens,
+            max_new_tokens=self._max_new_tokens([text]),
+            temperature=temperature,
+            cfg_weight=cfg_weight,
+            repetition_penalty=repetition_penalty,
+            min_p=min_p,
+            top_p=top_p,
+            enable_alignment_analysis=ENABLE_ALIGNMENT_EARLY_STOP,
+        )
+        try:
+            for next_token, _ in stream:
+                token = int(next_token[0, 0])
+                if token == self.t3.hp.stop_speech_token:
+                    break
+                if token < 6561:
+                    speech_tokens.append(token)
+
+                target = first_chunk_tokens if vocoded == 0 else chunk_tokens
+                if len(speech_tokens) - vocoded >= target and len(speech_tokens) > min_tokens:
+                    wav = vocode(speech_tokens, finalize=False)
+                    vocoded = len(speech_tokens)
+                    if wav is not None and wav.size(1) > 0:
+                        yield wav
         finally:
-            # Clean up all temporary files
-            for temp_file in temp_files_to_cleanup:
-                if os.path.exists(temp_file):
-                    try:
-                        os.unlink(temp_file)
-                    except:
-                        pass  # Ignore cleanup errors
+            stream.close()
+
+        if speech_tokens:
+            wav = vocode(speech_tokens, finalize=True)
+            if wav is not None and wav.size(1) > 0:
+                yield wav
 
     def _generate_long_text_async(
         self,
         text,
         max_segment_length=300,
+        exaggeration=0.5,
         cfg_weight=0.5,
         temperature=0.8,
         repetition_penalty=1.2,
@@ -390,10 +622,13 @@ class ChatterboxTTS:
         ae_threshold=0.06,
         ae_margin=0.2,
         disable_watermark=False,
-        max_workers=3
+        max_workers=None
     ):
         """
-        Async generation of long text audio - core optimization only keeps async batch generation
+        Generate long text audio - all split segments go through one batched T3 pass
+
+        `max_workers` is accepted for backward compatibility and ignored: the
+        segments share one model, so threads only contended for it.
         """
         # Split text into short paragraphs
         text_segments = split_text_into_segments(text, max_segment_length)
@@ -422,10 +657,10 @@ class ChatterboxTTS:
                 if pause_duration > 0 and pause_info:
                     pause_info[-1] = round(pause_duration / 0.1) * 0.1
 
-        # Core: async batch generation
-        audio_segments = self._generate_segments_async(
-            text_parts, cfg_weight, temperature,
-            repetition_penalty, min_p, top_p, disable_watermark, max_workers
+        # Core: one batched generation for all segments
+        audio_segments = self._generate_segments_batched(
+            text_parts, exaggeration, cfg_weight, temperature,
+            repetition_penalty, min_p, top_p, disable_watermark
         )
 
         # Apply audio cleaning (if enabled)
@@ -450,88 +685,65 @@ class ChatterboxTTS:
         else:
             return create_silence(0.1, self.sr)
 
-    def _generate_segments_async(self, text_list, cfg_weight, temperature, repetition_penalty, min_p, top_p, disable_watermark, max_workers):
-        """Async parallel generation of text segments - core performance optimization"""
-        audio_results = [None] * len(text_list)
-        result_queue = queue.Queue()
-
-        def generate_worker(index, text):
-            try:
-                if text and text.strip():
-                    # Preprocess text
-                    text = punc_norm(text.strip())
-                    # Generate audio
-                    audio = self._generate_single_segment(
-                        text, cfg_weight, temperature, repetition_penalty, min_p, top_p, disable_watermark
-                    )
-                else:
-                    audio = create_silence(0.1, self.sr)
-                result_queue.put((index, audio, None))
-            except Exception as e:
-                result_queue.put((index, None, str(e)))
-
-        # Concurrent execution
-        with ThreadPoolExecutor(max_workers=min(max_workers, len(text_list))) as executor:
-            futures = [executor.submit(generate_worker, i, text) for i, text in enumerate(text_list)]
-
-            # Wait for completion
-            for future in as_completed(futures):
-                future.result()
-
-        # Collect results
-        while not result_queue.empty():
-            index, audio, error = result_queue.get()
-            if error:
-                audio_results[index] = create_silence(0.1, self.sr)
-            else:
-                audio_results[index] = audio
+    def _total_speech_token_count(self):
+        """Collapse the per-segment counts of one generate() call into the count for its single wave"""
+        if self.last_speech_token_counts:
+            self.last_speech_token_counts = [sum(self.last_speech_token_counts)]
 
-        return audio_results
+    def _generate_segments_batched(self, text_list, exaggeration, cfg_weight, temperature, repetition_penalty, min_p, top_p, disable_watermark):
+        """Generate all text segments of one chunk with a single `generate_batch` call
 
-    def _clean_audio_segments_batch(self, audio_segments, ae_threshold, ae_margin):
-        """Batch clean artifacts from audio segments"""
-        cleaned_segments = []
-        temp_files_to_cleanup = []
+        Falls back to one segment at a time if the batched call fails (e.g. OOM on
+        a chunk with many pauses), so batching never fails a chunk on its own.
+        """
+        if not text_list:
+            return []
+        if len(text_list) == 1:
+            return [self._generate_single_segment(
+                text_list[0], cfg_weight, temperature, repetition_penalty, min_p, top_p, disable_watermark
+            )]
 
         try:
-            for i, audio in enumerate(audio_segments):
-                if audio is not None:
-                    # Save temporary audio file
-                    import tempfile
-                    with tempfile.NamedTemporaryFile(suffix=f'_segment_{i}.wav', delete=False) as temp_file:
-                        temp_audio_path = temp_file.name
-                    temp_files_to_cleanup.append(temp_audio_path)
-                    torchaudio.save(temp_audio_path, audio, self.sr)
-
-                    # Clean artifacts
-                    cleaned_audio_path = self._clean_artifacts(temp_audio_path, ae_threshold, ae_margin)
-                    if cleaned_audio_path != temp_audio_path:
-                        temp_files_to_cleanup.append(cleaned_audio_path)
-
-                    # Load cleaned audio
-                    try:
-                        if cleaned_audio_path != temp_audio_path:
-                            cleaned_audio, _ = torchaudio.load(cleaned_audio_path)
-                            cleaned_segments.append(cleaned_audio)
-                        else:
-                            # Cleaning failed, use original audio
-                            cleaned_segments.append(audio)
-                    except Exception as e:
-                        print(f"[WARNING] Unable to load cleaned audio segment {i}: {e}")
-                        cleaned_segments.append(audio)
-                else:
-                    cleaned_segments.append(audio)
+            return self.generate_batch(
+                text_list,
+                exaggeration=exaggeration,
+                cfg_weight=cfg_weight,
+                temperature=temperature,
+                min_p=min_p,
+                top_p=top_p,
+                repetition_penalty=repetition_penalty,
+                disable_watermark=disable_watermark,
+            )
+        except Exception as e:
+            if "out of memory" in str(e).lower() and torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            logging.warning(f"Batched segment generation failed ({e}), generating {len(text_list)} segments sequentially")
+
+        wavs, counts = [], []
+        for text in text_list:
+            wavs.append(self._generate_single_segment(
+                text, cfg_weight, temperature, repetition_penalty, min_p, top_p, disable_watermark
+            ))
+            counts.extend(self.last_speech_token_counts)
+        self.last_speech_token_counts = counts
+        return wavs
 
-            return cleaned_segments
+    def _clean_audio_segments_batch(self, audio_segments, ae_threshold, ae_margin):
+        """
+        Clean artifacts from all segments in one vectorized pass (see silence_cut)
 
-        finally:
-            # Clean up all temporary files
-            for temp_file in temp_files_to_cleanup:
-                if os.path.exists(temp_file):
-                    try:
-                        os.unlink(temp_file)
-                    except:
-                        pass  # Ignore cleanup errors
+        Same threshold/margin semantics as the former auto-editor subprocess, but
+        in-process: no temp WAVs, no process spawn per segment.
+        """
+        arrays = [
+            audio.squeeze(0).detach().cpu().numpy() if audio is not None else None
+            for audio in audio_segments
+        ]
+        cleaned = cut_silence_batch(arrays, self.sr, ae_threshold, ae_margin)
+        return [
+            torch.from_numpy(np.ascontiguousarray(c)).unsqueeze(0) if a is not None else None
+            for a, c in zip(audio_segments, cleaned)
+        ]
 
     def _generate_single_segment(self, text, cfg_weight, temperature, repetition_penalty=1.2, min_p=0.05, top_p=1.0, disable_watermark=False):
         """Generate audio for a single text segment"""
@@ -550,12 +762,13 @@ class ChatterboxTTS:
             speech_tokens = self.t3.inference(
                 t3_cond=self.conds.t3,
                 text_tokens=text_tokens,
-                max_new_tokens=1000,  # TODO: use the value in config
+                max_new_tokens=self._max_new_tokens([text]),
                 temperature=temperature,
                 cfg_weight=cfg_weight,
                 repetition_penalty=repetition_penalty,
                 min_p=min_p,
                 top_p=top_p,
+                enable_alignment_analysis=ENABLE_ALIGNMENT_EARLY_STOP,
             )
             # Extract only the conditional batch.
             speech_tokens = speech_tokens[0]
@@ -564,6 +777,7 @@ class ChatterboxTTS:
             speech_tokens = drop_invalid_tokens(speech_tokens)
 
             speech_tokens = speech_tokens[speech_tokens < 6561]
+            self.last_speech_token_counts = [int(speech_tokens.numel())]
 
             speech_tokens = speech_tokens.to(self.device)
 
@@ -586,70 +800,6 @@ class ChatterboxTTS:
             else:
                 return torch.from_numpy(wav).unsqueeze(0)
 
-    def _clean_artifacts(self, audio_path: str, threshold: float = 0.06, margin: float = 0.2) -> str:
-        """
-        Clean artifacts from audio using auto-editor
-
-        Args:
-            audio_path: Path to input audio file
-            threshold: Volume threshold, values below this are considered silence/artifacts
-            margin: Boundary protection time in seconds
-
-        Returns:
-            Path to cleaned audio file
-        """
-        import subprocess
-        import tempfile
-        import os
-
-        # Create output file
-        output_file = tempfile.NamedTemporaryFile(suffix='_cleaned.wav', delete=False)
-        output_file.close()
-
-        try:
-            # Build auto-editor command (adapted for 28.0.0 version)
-            cmd = [
-                "auto-editor",
-                audio_path,
-                "--edit", f"audio:threshold={threshold}",
-                "--margin", f"{margin}s",
-                "--output-file", output_file.name
-            ]
-
-            print(f"[INFO] Cleaning artifacts: {' '.join(cmd)}")
-
-            # Execute auto-editor
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=60,
-                check=True
-            )
-
-            if os.path.exists(output_file.name) and os.path.getsize(output_file.name) > 0:
-                print(f"[INFO] Artifact cleaning completed: {output_file.name}")
-                return output_file.name
-            else:
-                raise RuntimeError("auto-editor did not generate a valid output file")
-
-        except subprocess.CalledProcessError as e:
-            print(f"[ERROR] auto-editor execution failed: {e}")
-            print(f"[ERROR] stderr: {e.stderr}")
-            print(f"[ERROR] stdout: {e.stdout}")
-            # Clean up failed output file
-            if os.path.exists(output_file.name):
-                os.unlink(output_file.name)
-            return audio_path  # Return original file
-
-        except Exception as e:
-            print(f"[ERROR] Exception occurred during artifact cleaning: {e}")
-            # Clean up failed output file
-            if os.path.exists(output_file.name):
-                os.unlink(output_file.name)
-        return audio_path  # Return original file
-
-
     def generate_batch(
         self,
         texts: list[str],
@@ -664,7 +814,10 @@ class ChatterboxTTS:
     ):
         """Batch generation for multiple texts sharing the same params/voice.
 
-        Returns a list of 1×N wave tensors (CPU) for each input text.
+        `temperature` may also be a list with one value per text.
+
+        Returns a list of 1×N wave tensors (CPU) for each input text. The number
+        of speech tokens behind each wave is left in `last_speech_token_counts`.
         """
         if audio_prompt_path:
             self.prepare_conditionals(audio_prompt_path, exaggeration=exaggeration)
@@ -683,34 +836,39 @@ class ChatterboxTTS:
         # Normalize and tokenize
         norm_texts = [punc_norm(t or "") for t in texts]
         token_list = [self.tokenizer.text_to_tokens(t) for t in norm_texts]
+        self.last_speech_token_counts = []
         if not token_list:
             return []
 
-        # Pad to common length and add BOS/EOS as in single generate
-        eot = self.t3.hp.stop_text_token
-        max_len = max(tok.shape[1] for tok in token_list)
-        padded = torch.stack([F.pad(tok, (0, max_len - tok.shape[1]), value=eot) for tok in token_list])
-        padded = padded.squeeze(1).to(self.device)
-
+        # SOT + tokens + EOT per row as in single generate, then right-pad with EOT
+        # (every row, including the longest, keeps its own stop_text_token)
         sot = self.t3.hp.start_text_token
-        padded = F.pad(padded, (1, 0), value=sot)
+        eot = self.t3.hp.stop_text_token
+        rows = [F.pad(F.pad(tok.squeeze(0), (1, 0), value=sot), (0, 1), value=eot) for tok in token_list]
+        max_len = max(row.shape[0] for row in rows)
+        padded = torch.stack([F.pad(row, (0, max_len - row.shape[0]), value=eot) for row in rows]).to(self.device)
+        text_lengths = torch.tensor([row.shape[0] for row in rows], dtype=torch.long)
 
         wavs: list[torch.Tensor] = []
+        token_counts = []
         with torch.inference_mode():
             speech_tokens_batch = self.t3.inference(
                 t3_cond=self.conds.t3,
                 text_tokens=padded,
-                max_new_tokens=1000,
+                max_new_tokens=self._max_new_tokens(norm_texts),
                 temperature=temperature,
                 cfg_weight=cfg_weight,
                 min_p=min_p,
                 top_p=top_p,
                 repetition_penalty=repetition_penalty,
+                enable_alignment_analysis=ENABLE_ALIGNMENT_EARLY_STOP,
+                text_lengths=text_lengths,
             )
 
             for speech_tokens in speech_tokens_batch:
                 speech_tokens = drop_invalid_tokens(speech_tokens)
                 speech_tokens = speech_tokens[speech_tokens < 6561]
+                token_counts.append(int(speech_tokens.numel()))
                 speech_tokens = speech_tokens.to(self.device)
 
                 wav, _ = self.s3gen.inference(
@@ -725,6 +883,7 @@ class ChatterboxTTS:
                         wav = self.watermarker.apply_watermark(wav, sample_rate=self.sr)
                 wavs.append(torch.from_numpy(wav).unsqueeze(0))
 
+        self.last_speech_token_counts = token_counts
         return wavs
 
 def parse_pause_tags(text: str):
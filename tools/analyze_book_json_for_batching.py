@@ -4,7 +4,8 @@ Book JSON Batching Analyzer
 ===========================
 
 Analyzes book JSON files to identify optimal batching groups based on TTS parameters.
-Creates batching strategy for Flash Attention optimization.
+Creates batching strategy for Flash Attention optimization. This report is advisory;
+modules/render_plan.py builds the plan that process_book_folder actually executes.
 
 Usage:
     cd /home/danno/MyApps/chatterbox (copy)
@@ -443,9 +444,8 @@ def main():
 
     print(f"\n🚀 NEXT STEPS:")
     print(f"   1. Review batching plan in output file")
-    print(f"   2. Implement batched T3 inference")
-    print(f"   3. Test with Flash Attention enabled")
-    print(f"   4. Benchmark performance improvements")
+    print(f"   2. For a plan the renderer executes (with predicted runtime):")
+    print(f"      python -m modules.render_plan {json_file_path}")
 
 
 if __name__ == "__main__":
@@ -14,7 +14,8 @@ from modules.file_manager import (
     get_audio_files_in_directory, combine_audio_chunks,
     convert_to_m4b, add_metadata_to_m4b, find_book_files
 )
-from modules.audio_processor import get_wav_duration
+from modules.chunk_journal import total_chunk_duration
+from modules.watermark import apply_deferred_watermark
 from modules.progress_tracker import log_console, log_run
 import subprocess
 import shutil
@@ -57,7 +58,7 @@ def combine_audio_for_book(book_path_str, voice_name=None):
         print(f"{YELLOW}🔄 Continuing with available chunks for GUI operation...{RESET}")
 
     # Display chunk info
-    total_duration = sum(get_wav_duration(chunk_path) for chunk_path in chunk_paths)
+    total_duration = total_chunk_duration(chunk_paths)
     duration_str = str(timedelta(seconds=int(total_duration)))
 
     print(f"\n📊 Chunk Analysis:")
@@ -90,6 +91,7 @@ def _perform_combine_operation(book_path, chunk_paths, total_duration, voice_nam
 
     try:
         combine_audio_chunks(chunk_paths, combined_wav_path)
+        apply_deferred_watermark(combined_wav_path)
         print(f"✅ Combined WAV created: {combined_wav_path.name}")
     except Exception as e:
         print(f"{RED}❌ Failed to combine chunks: {e}{RESET}")
@@ -116,7 +118,7 @@ def _perform_combine_operation(book_path, chunk_paths, total_duration, voice_nam
     final_m4b_path = book_path / f"{basename}{file_suffix}.m4b"
 
     try:
-        convert_to_m4b(combined_wav_path, temp_m4b_path)
+        convert_to_m4b(combined_wav_path, temp_m4b_path, chunk_paths=chunk_paths)
         add_metadata_to_m4b(temp_m4b_path, final_m4b_path, cover_file, nfo_file)
         print(f"✅ M4B audiobook created: {final_m4b_path.name}")
     except FileNotFoundError as ffmpeg_error:
@@ -244,7 +246,7 @@ def run_combine_only_mode():
             return None
 
     # Display chunk info
-    total_duration = sum(get_wav_duration(chunk_path) for chunk_path in chunk_paths)
+    total_duration = total_chunk_duration(chunk_paths)
     duration_str = str(timedelta(seconds=int(total_duration)))
 
     print(f"\n📊 Chunk Analysis:")
@@ -272,9 +274,8 @@ def verify_chunk_sequence(chunk_paths):
     if not chunk_numbers:
         return []
 
-    chunk_numbers.sort()
-    expected_range = range(1, max(chunk_numbers) + 1)
-    missing = [num for num in expected_range if num not in chunk_numbers]
+    present = set(chunk_numbers)
+    missing = [num for num in range(1, max(present) + 1) if num not in present]
 
     return missing
 
@@ -299,7 +300,7 @@ def list_available_books_for_combine():
 
         # Calculate total duration
         try:
-            total_duration = sum(get_wav_duration(chunk_path) for chunk_path in chunk_paths)
+            total_duration = total_chunk_duration(chunk_paths)
             duration_str = str(timedelta(seconds=int(total_duration)))
         except:
             duration_str = "Unknown"
@@ -335,11 +336,12 @@ def quick_combine(book_name):
     final_m4b_path = book_path / f"{book_name}_quick_combined.m4b"
 
     combine_audio_chunks(chunk_paths, combined_wav_path)
+    apply_deferred_watermark(combined_wav_path)
 
     temp_m4b_path = book_path / "temp_quick.m4b"
     
     try:
-        convert_to_m4b(combined_wav_path, temp_m4b_path)
+        convert_to_m4b(combined_wav_path, temp_m4b_path, chunk_paths=chunk_paths)
         # Simple M4B without metadata for quick operation
         temp_m4b_path.rename(final_m4b_path)
     except FileNotFoundError:
@@ -26,6 +26,18 @@ import argparse
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+from modules.chunk_pack import list_chunk_paths, read_chunk_audio
+
+
+def load_chunk_audio(path, sr=None):
+    """Chunk audio as mono float32 from a loose file or the book's chunk pack, optionally resampled"""
+    audio, file_sr = read_chunk_audio(path)
+    if audio.ndim > 1:
+        audio = librosa.to_mono(audio.T)
+    if sr is not None and sr != file_sr:
+        return librosa.resample(audio, orig_sr=file_sr, target_sr=sr), sr
+    return audio, file_sr
+
 @dataclass
 class EmotionalSegment:
     """Represents an audio segment with its emotional characteristics."""
@@ -97,13 +109,14 @@ class EmotionExtractor:
         with open(self.chunks_info_path, 'r') as f:
             chunks_data = json.load(f)
         
+        available = {p.name for p in list_chunk_paths(self.audio_chunks_dir)}
         segments = []
         for chunk in chunks_data:
             # Look for audio file
             chunk_idx = chunk['index']
             audio_file = self.audio_chunks_dir / f"chunk_{chunk_idx:05d}.wav"
             
-            if not audio_file.exists():
+            if audio_file.name not in available:
                 print(f"⚠️  Audio file missing for chunk {chunk_idx}: {audio_file}")
                 continue
             
@@ -133,7 +146,7 @@ class EmotionExtractor:
         - Spectral characteristics
         """
         try:
-            audio, sr = librosa.load(segment.audio_path, sr=None)
+            audio, sr = load_chunk_audio(segment.audio_path)
             duration = len(audio) / sr
             segment.duration = duration
             
@@ -265,7 +278,7 @@ class EmotionExtractor:
                     break
                 
                 try:
-                    audio, sr = librosa.load(segment.audio_path, sr=22050)  # Standardize sample rate
+                    audio, sr = load_chunk_audio(segment.audio_path, sr=22050)  # Standardize sample rate
                     segment_duration = len(audio) / sr
                     
                     # Trim if needed to not exceed target
@@ -63,6 +63,8 @@ sys.path.append(str(project_root))
 from config.config import *
 from modules.tts_engine import load_optimized_model, process_one_chunk, prewarm_model_with_voice
 from modules.file_manager import setup_book_directories, list_voice_samples, ensure_voice_sample_compatibility
+from modules.chunk_journal import ChunkJournal
+from modules.chunk_pack import ChunkPack
 from wrapper.chunk_loader import load_chunks
 from chatterbox.tts import punc_norm
 from modules.progress_tracker import log_chunk_progress, log_run
@@ -142,6 +144,8 @@ def main():
     print("🧹 Clearing old audio chunks...")
     for wav_file in audio_chunks_dir.glob("*.wav"):
         wav_file.unlink()
+    ChunkJournal(audio_chunks_dir).reset()
+    ChunkPack(audio_chunks_dir).reset()
 
     start_time = time.time()
     total_chunks = len(all_chunks)
@@ -1,6 +1,12 @@
 import json
 
 def load_chunks(path):
+    # Books with a chunk store read from it (it holds edits not yet exported to JSON)
+    from wrapper.chunk_store import ChunkStore, store_path_for
+    if store_path_for(path).exists():
+        with ChunkStore.for_json(path) as store:
+            return store.all()
+
     with open(path, 'r', encoding='utf-8') as f:
         data = json.load(f)
         
@@ -14,6 +20,11 @@ def load_chunks(path):
 def load_metadata(path):
     """Extract metadata from JSON file"""
     try:
+        from wrapper.chunk_store import ChunkStore, store_path_for
+        if store_path_for(path).exists():
+            with ChunkStore.for_json(path) as store:
+                return store.metadata()
+
         with open(path, 'r', encoding='utf-8') as f:
             data = json.load(f)
             
@@ -28,45 +39,56 @@ def load_metadata(path):
     
     return None
 
-def save_chunks(path, chunks):
-    # Validate and clean chunks before saving
+def clean_chunk(chunk):
+    """Return a copy of a chunk with quote/dialogue corruption in its text cleaned up"""
     from collections import OrderedDict
     import copy
-    
-    cleaned_chunks = []
-    for chunk in chunks:
-        if isinstance(chunk, dict) and 'text' in chunk:
-            original_text = chunk['text']
-            # Clean up any quote corruption
-            cleaned_text = original_text.replace('\\"', '"').replace("\\'", "'")
-            
-            # Check for dialogue corruption patterns
-            if ('replied' in cleaned_text or 'said' in cleaned_text) and '"' in cleaned_text:
-                # Additional cleanup for dialogue
-                import re
-                cleaned_text = re.sub(r'(["\'])\s*,\s*(["\'])\s*\.', r'\1.', cleaned_text)  # Fix ", ". pattern
-                cleaned_text = re.sub(r'(["\'])\s*,\s*(["\'])\s*$', r'\1.', cleaned_text)  # Fix trailing ", "
-                
-                if cleaned_text != original_text:
-                    print(f"🔧 FIXED dialogue corruption:")
-                    print(f"   Before: {original_text}")
-                    print(f"   After:  {cleaned_text}")
-            
-            # Preserve structure (OrderedDict or regular dict)
-            if isinstance(chunk, OrderedDict):
-                chunk_copy = OrderedDict()
-                for key, value in chunk.items():
-                    if key == 'text':
-                        chunk_copy[key] = cleaned_text
-                    else:
-                        chunk_copy[key] = copy.deepcopy(value)
+
+    if not (isinstance(chunk, dict) and 'text' in chunk):
+        return chunk
+
+    original_text = chunk['text']
+    # Clean up any quote corruption
+    cleaned_text = original_text.replace('\\"', '"').replace("\\'", "'")
+
+    # Check for dialogue corruption patterns
+    if ('replied' in cleaned_text or 'said' in cleaned_text) and '"' in cleaned_text:
+        # Additional cleanup for dialogue
+        import re
+        cleaned_text = re.sub(r'(["\'])\s*,\s*(["\'])\s*\.', r'\1.', cleaned_text)  # Fix ", ". pattern
+        cleaned_text = re.sub(r'(["\'])\s*,\s*(["\'])\s*$', r'\1.', cleaned_text)  # Fix trailing ", "
+
+        if cleaned_text != original_text:
+            print(f"🔧 FIXED dialogue corruption:")
+            print(f"   Before: {original_text}")
+            print(f"   After:  {cleaned_text}")
+
+    # Preserve structure (OrderedDict or regular dict)
+    if isinstance(chunk, OrderedDict):
+        chunk_copy = OrderedDict()
+        for key, value in chunk.items():
+            if key == 'text':
+                chunk_copy[key] = cleaned_text
             else:
-                chunk_copy = chunk.copy()
-                chunk_copy['text'] = cleaned_text
-                
-            cleaned_chunks.append(chunk_copy)
-        else:
-            cleaned_chunks.append(chunk)
-    
+                chunk_copy[key] = copy.deepcopy(value)
+    else:
+        chunk_copy = chunk.copy()
+        chunk_copy['text'] = cleaned_text
+    return chunk_copy
+
+def save_chunks(path, chunks):
+    """
+    Write a complete chunk list to JSON (generators, full rewrites).
+    Single-chunk edits should go through wrapper.chunk_store.ChunkStore instead.
+    """
+    # Validate and clean chunks before saving
+    cleaned_chunks = [clean_chunk(chunk) for chunk in chunks]
+
     with open(path, 'w', encoding='utf-8') as f:
         json.dump(cleaned_chunks, f, indent=2, ensure_ascii=False)
+
+    # Keep an existing chunk store in step with the new file
+    from wrapper.chunk_store import ChunkStore, store_path_for
+    if store_path_for(path).exists():
+        with ChunkStore(store_path_for(path), path) as store:
+            store.import_json(path)
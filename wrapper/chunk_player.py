@@ -1,12 +1,21 @@
 import subprocess
 import os
 
+from modules.chunk_pack import chunk_available, chunk_wav_bytes
+
 def play_chunk_audio(path):
-    if not os.path.exists(path):
+    if os.path.exists(path):
+        try:
+            subprocess.run(["ffplay", "-nodisp", "-autoexit", path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except Exception as e:
+            print(f"Error playing audio: {e}")
+        return
+    if not chunk_available(path):
         print(f"❌ Audio file not found: {path}")
         return
     try:
-        subprocess.run(["ffplay", "-nodisp", "-autoexit", path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        # Packed chunk: stream the WAV from the pack, nothing is extracted
+        subprocess.run(["ffplay", "-nodisp", "-autoexit", "-i", "-"], input=chunk_wav_bytes(path),
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     except Exception as e:
         print(f"Error playing audio: {e}")
-
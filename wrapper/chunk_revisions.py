@@ -1,7 +1,7 @@
 import os
-import shutil
 from pathlib import Path
 from config.config import AUDIOBOOK_ROOT
+from modules.chunk_pack import chunk_available, extract_chunk, place_chunk_file
 base = AUDIOBOOK_ROOT
 
 
@@ -22,13 +22,13 @@ def accept_revision(index, audio_dir):
         return
 
     # Archive original if exists
-    if original.exists():
+    if chunk_available(original):
         archived = archive_dir / f"chunk_{index+1:05d}_orig.wav"
-        shutil.move(str(original), str(archived))
+        extract_chunk(original, archived)
         print(f"📦 Original chunk archived to {archived.name}")
     else:
         print(f"⚠️ Original chunk missing — no archive created.")
 
     # Move revised chunk to main filename
-    shutil.move(str(revised), str(original))
+    place_chunk_file(revised, original)
     print(f"✅ Revised chunk accepted as {original.name}")
@@ -1,3 +1,13 @@
+import re
+import json
+import difflib
+
+# "asr<0.85" lists chunks whose ASR transcript diverged from the text (default threshold 0.8)
+_DIVERGED_RE = re.compile(r"^asr\s*<\s*([0-9]*\.?[0-9]+)?$", re.IGNORECASE)
+_TOKEN_RE = re.compile(r'"([^"]+)"|(\S+)')
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
 def search_chunks(chunks, query):
     results = []
     query_lower = query.lower()
@@ -7,3 +17,102 @@ def search_chunks(chunks, query):
             results.append(chunk)
 
     return results
+
+
+def _fts_quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _fuzzy_terms(store, word, max_terms=8, cutoff=0.75):
+    """Index terms close to `word` (typos, spelling variants)"""
+    word = word.lower()
+    candidates = [term for (term,) in store.conn.execute(
+        "SELECT term FROM chunks_fts_vocab WHERE length(term) BETWEEN ? AND ?",
+        (max(1, len(word) - 2), len(word) + 2))]
+    return difflib.get_close_matches(word, candidates, n=max_terms, cutoff=cutoff)
+
+
+def _build_match(store, query):
+    """
+    Translate a repair-tool query into an FTS5 MATCH expression
+
+    - words are prefix matches ("philo" finds "philosophy"), all must match
+    - "quoted text" is an exact phrase
+    - ~word also matches close spellings from the index
+    - asr: searches the ASR transcripts instead of the chunk text
+    """
+    column = "text"
+    if query.lower().startswith("asr:"):
+        column = "asr_text"
+        query = query[4:]
+
+    parts = []
+    for phrase, word in _TOKEN_RE.findall(query):
+        if phrase:
+            parts.append(_fts_quote(phrase))
+        elif word.startswith("~") and len(word) > 1:
+            terms = _fuzzy_terms(store, word[1:]) or [word[1:].lower()]
+            parts.append("(" + " OR ".join(_fts_quote(t) for t in terms) + ")")
+        else:
+            # Strip punctuation FTS would not index anyway
+            parts.extend(_fts_quote(w) + "*" for w in _WORD_RE.findall(word))
+    if not parts:
+        return None
+    return f"{column} : ({' AND '.join(parts)})"
+
+
+def diverged_chunks(store, threshold=0.8, limit=500):
+    """
+    Chunks whose ASR transcript diverged from their text, worst first
+
+    Requires transcripts imported with `store.import_asr(audio_chunks_dir)`.
+
+    Returns:
+        list: (chunk, asr_text, similarity) tuples
+    """
+    results = []
+    rows = store.conn.execute(
+        "SELECT c.data, a.asr_text, a.asr_score FROM asr a JOIN chunks c ON c.idx = a.idx "
+        "WHERE a.asr_score IS NULL OR a.asr_score < ? ORDER BY a.asr_score", (threshold,))
+    for data, asr_text, score in rows:
+        chunk = json.loads(data)
+        if score is None:
+            score = difflib.SequenceMatcher(None, chunk.get('text', '').lower(), asr_text.lower()).ratio()
+            if score >= threshold:
+                continue
+        results.append((chunk, asr_text, score))
+    results.sort(key=lambda r: r[2])
+    return results[:limit]
+
+
+def search_store(store, query, limit=500):
+    """
+    Search a ChunkStore (see `_build_match` for the query syntax)
+
+    Falls back to a case-insensitive substring scan of the text column when FTS5 is
+    unavailable or finds nothing (e.g. fragments starting mid-word).
+
+    Returns:
+        list: chunk dicts in index order
+    """
+    query = query.strip()
+    diverged = _DIVERGED_RE.match(query)
+    if diverged:
+        threshold = float(diverged.group(1)) if diverged.group(1) else 0.8
+        return [chunk for chunk, _, _ in diverged_chunks(store, threshold, limit)]
+
+    if store.has_fts:
+        match = _build_match(store, query)
+        if match:
+            rows = store.conn.execute(
+                "SELECT c.data FROM chunks_fts f JOIN chunks c ON c.idx = f.rowid "
+                "WHERE chunks_fts MATCH ? ORDER BY c.idx LIMIT ?", (match, limit)).fetchall()
+            if rows:
+                return [json.loads(data) for (data,) in rows]
+
+    if query.lower().startswith("asr:"):
+        return []
+    pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    rows = store.conn.execute(
+        "SELECT data FROM chunks WHERE text LIKE ? ESCAPE '\\' ORDER BY idx LIMIT ?", (pattern, limit))
+    return [json.loads(data) for (data,) in rows]
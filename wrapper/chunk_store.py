@@ -0,0 +1,333 @@
+"""
+Indexed chunk metadata store (SQLite) kept next to chunks_info.json
+
+The JSON file stays the interchange format written by the generators; the
+store lets the repair tools read and update single chunks without parsing or
+rewriting the whole file:
+
+    store = ChunkStore.for_json(json_path)
+    chunk = store.get(41)
+    store.update_fields(41, text="Fixed text.")
+    store.set_render_status(41, "stale")
+    store.export_json()          # write edits back to chunks_info.json
+
+Each row keeps the full chunk dict as JSON (key order preserved), keyed by the
+chunk's 0-based `index`. The JSON `_metadata` entry is stored separately.
+
+Chunk text and ASR transcripts (imported from the audio chunk journal) are
+kept in an FTS5 index for wrapper/chunk_search.py when SQLite has FTS5.
+
+Sync rules:
+- First open imports the JSON.
+- If the JSON was rewritten by something else and the store has no unexported
+  edits, it is re-imported. With unexported edits only its metadata is taken.
+- Render status survives a re-import for chunks whose text did not change.
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+# Render status values used by the repair tools
+RENDER_PENDING = "pending"      # no audio yet / unknown
+RENDER_DONE = "rendered"        # audio matches the chunk text/params
+RENDER_STALE = "stale"          # chunk edited since its audio was rendered
+RENDER_REVISED = "revised"      # a *_rev.wav is waiting to be accepted
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    idx INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    data TEXT NOT NULL,
+    render_status TEXT NOT NULL DEFAULT 'pending',
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS asr (
+    idx INTEGER PRIMARY KEY,
+    asr_text TEXT NOT NULL,
+    asr_score REAL
+);
+CREATE INDEX IF NOT EXISTS asr_score_idx ON asr (asr_score);
+"""
+
+# Full-text index over chunk text and ASR transcripts (rowid = chunk index), see wrapper/chunk_search.py
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(text, asr_text, prefix='2 3', tokenize='unicode61');
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts_vocab USING fts5vocab(chunks_fts, row);
+"""
+
+
+def store_path_for(json_path):
+    """Path of the store belonging to a chunks JSON file"""
+    return Path(json_path).with_suffix(".db")
+
+
+def _json_signature(json_path):
+    st = Path(json_path).stat()
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def _split_json(data):
+    """Split loaded chunks JSON into (metadata entry or None, chunk list)"""
+    if not isinstance(data, list):
+        return None, []
+    metadata = None
+    chunks = []
+    for item in data:
+        if isinstance(item, dict) and item.get('_metadata', False):
+            metadata = item
+        else:
+            chunks.append(item)
+    return metadata, chunks
+
+
+class ChunkStore:
+    """SQLite-backed chunk store for one book"""
+
+    def __init__(self, db_path, json_path=None):
+        self.db_path = Path(db_path)
+        self.json_path = Path(json_path) if json_path else None
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        try:
+            self.conn.executescript(_FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: search falls back to scanning the text column
+            self.has_fts = False
+        if self.has_fts and self._get_meta("fts_built") != "1":
+            # Stores created before the search index existed
+            with self.conn:
+                self._reindex()
+
+    @classmethod
+    def for_json(cls, json_path):
+        """Open (creating or refreshing as needed) the store for a chunks JSON file"""
+        json_path = Path(json_path)
+        store = cls(store_path_for(json_path), json_path)
+        store.sync_from_json()
+        return store
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- meta ----------------------------------------------------------------
+    def _get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def dirty(self):
+        """True when rows were edited since the last JSON import/export"""
+        return self._get_meta("dirty") == "1"
+
+    def metadata(self):
+        """The JSON `_metadata` entry (voice_used etc.), or None"""
+        value = self._get_meta("metadata")
+        return json.loads(value) if value else None
+
+    def set_metadata(self, metadata):
+        with self.conn:
+            self._set_meta("metadata", json.dumps(metadata, ensure_ascii=False) if metadata else None)
+            self._set_meta("dirty", "1")
+
+    # --- import / export -------------------------------------------------------
+    def sync_from_json(self):
+        """Import the JSON file if it changed since the store last saw it"""
+        if not self.json_path or not self.json_path.exists():
+            return False
+        signature = _json_signature(self.json_path)
+        if self._get_meta("json_signature") == signature:
+            return False
+
+        if self.dirty:
+            # Keep unexported row edits; only pick up metadata (e.g. voice_used) from the file
+            with open(self.json_path, 'r', encoding='utf-8') as f:
+                metadata, _ = _split_json(json.load(f))
+            with self.conn:
+                if metadata is not None:
+                    self._set_meta("metadata", json.dumps(metadata, ensure_ascii=False))
+                self._set_meta("json_signature", signature)
+            return True
+
+        self.import_json(self.json_path)
+        return True
+
+    def import_json(self, json_path=None):
+        """Replace all rows with the chunks from a chunks JSON file"""
+        json_path = Path(json_path or self.json_path)
+        with open(json_path, 'r', encoding='utf-8') as f:
+            metadata, chunks = _split_json(json.load(f))
+        self.replace_all(chunks, metadata)
+        if self.json_path and json_path == self.json_path:
+            with self.conn:
+                self._set_meta("json_signature", _json_signature(json_path))
+
+    def replace_all(self, chunks, metadata=None):
+        """Replace all rows, keeping render status of chunks whose text is unchanged"""
+        previous = dict(self.conn.execute("SELECT idx, text || char(0) || render_status FROM chunks"))
+        now = time.time()
+        rows = []
+        for position, chunk in enumerate(chunks):
+            idx = int(chunk.get('index', position)) if isinstance(chunk, dict) else position
+            text = chunk.get('text', '') if isinstance(chunk, dict) else ''
+            status = RENDER_PENDING
+            if idx in previous:
+                old_text, old_status = previous[idx].split("\0", 1)
+                status = old_status if old_text == text else RENDER_STALE
+            rows.append((idx, text, json.dumps(chunk, ensure_ascii=False), status, now))
+
+        with self.conn:
+            self.conn.execute("DELETE FROM chunks")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO chunks (idx, text, data, render_status, updated) VALUES (?, ?, ?, ?, ?)", rows)
+            self._set_meta("metadata", json.dumps(metadata, ensure_ascii=False) if metadata else None)
+            self._set_meta("dirty", "0")
+            self._reindex()
+
+    def _reindex(self, indices=None):
+        """Refresh full-text rows for some (or all) chunks; call inside a transaction"""
+        if not self.has_fts:
+            return
+        select = ("SELECT c.idx, c.text, COALESCE(a.asr_text, '') FROM chunks c "
+                  "LEFT JOIN asr a ON a.idx = c.idx")
+        if indices is None:
+            self.conn.execute("DELETE FROM chunks_fts")
+            self.conn.execute(f"INSERT INTO chunks_fts (rowid, text, asr_text) {select}")
+            self._set_meta("fts_built", "1")
+            return
+        for idx in indices:
+            self.conn.execute("DELETE FROM chunks_fts WHERE rowid = ?", (idx,))
+            self.conn.execute(f"INSERT INTO chunks_fts (rowid, text, asr_text) {select} WHERE c.idx = ?", (idx,))
+
+    def import_asr(self, audio_chunks_dir):
+        """
+        Load ASR transcripts from the audio chunk journal if it changed since the last import
+
+        Returns:
+            int: Number of chunks with transcripts (0 if nothing changed)
+        """
+        from modules.chunk_journal import ChunkJournal
+
+        journal = ChunkJournal(audio_chunks_dir)
+        if not journal.exists():
+            return 0
+        signature = _json_signature(journal.path)
+        if self._get_meta("asr_signature") == signature:
+            return 0
+
+        rows = []
+        for chunk_number, entry in journal.replay().items():
+            asr = entry.get("asr")
+            if asr and asr.get("text") is not None:
+                rows.append((chunk_number - 1, asr["text"], asr.get("score")))
+
+        with self.conn:
+            self.conn.execute("DELETE FROM asr")
+            self.conn.executemany("INSERT INTO asr (idx, asr_text, asr_score) VALUES (?, ?, ?)", rows)
+            self._set_meta("asr_signature", signature)
+            self._reindex()
+        return len(rows)
+
+    def export_json(self, json_path=None):
+        """Write the store back to the chunks JSON format (metadata entry first)"""
+        json_path = Path(json_path or self.json_path)
+        data = []
+        metadata = self.metadata()
+        if metadata:
+            data.append(metadata)
+        data.extend(self.iter_range())
+
+        tmp_path = json_path.with_name(f".{json_path.name}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        tmp_path.replace(json_path)
+
+        if self.json_path and json_path == self.json_path:
+            with self.conn:
+                self._set_meta("json_signature", _json_signature(json_path))
+                self._set_meta("dirty", "0")
+        return json_path
+
+    # --- reads -----------------------------------------------------------------
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def get(self, index):
+        """Chunk dict for a 0-based index, or None"""
+        row = self.conn.execute("SELECT data FROM chunks WHERE idx = ?", (int(index),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_range(self, start=0, end=None):
+        """Yield chunks with start <= index < end in index order"""
+        if end is None:
+            cursor = self.conn.execute("SELECT data FROM chunks WHERE idx >= ? ORDER BY idx", (int(start),))
+        else:
+            cursor = self.conn.execute("SELECT data FROM chunks WHERE idx >= ? AND idx < ? ORDER BY idx",
+                                       (int(start), int(end)))
+        for (data,) in cursor:
+            yield json.loads(data)
+
+    def all(self):
+        return list(self.iter_range())
+
+    def indices_with_status(self, status):
+        """0-based indices whose render status is `status`"""
+        return [idx for (idx,) in self.conn.execute(
+            "SELECT idx FROM chunks WHERE render_status = ? ORDER BY idx", (status,))]
+
+    def render_status(self, index):
+        row = self.conn.execute("SELECT render_status FROM chunks WHERE idx = ?", (int(index),)).fetchone()
+        return row[0] if row else None
+
+    # --- single-row writes -----------------------------------------------------
+    def update_chunk(self, index, chunk, render_status=None):
+        """Replace one chunk; marks it stale if its text or TTS params changed"""
+        from wrapper.chunk_loader import clean_chunk
+
+        index = int(index)
+        chunk = clean_chunk(chunk)
+        row = self.conn.execute("SELECT data, render_status FROM chunks WHERE idx = ?", (index,)).fetchone()
+        if row is None:
+            raise KeyError(f"No chunk with index {index}")
+        old = json.loads(row[0])
+        if render_status is None:
+            changed = old.get('text') != chunk.get('text') or old.get('tts_params') != chunk.get('tts_params')
+            render_status = RENDER_STALE if changed else row[1]
+
+        with self.conn:
+            self.conn.execute(
+                "UPDATE chunks SET text = ?, data = ?, render_status = ?, updated = ? WHERE idx = ?",
+                (chunk.get('text', ''), json.dumps(chunk, ensure_ascii=False), render_status, time.time(), index))
+            self._set_meta("dirty", "1")
+            self._reindex([index])
+
+    def update_fields(self, index, **fields):
+        """Update selected fields of one chunk and return the updated chunk"""
+        chunk = self.get(index)
+        if chunk is None:
+            raise KeyError(f"No chunk with index {index}")
+        chunk.update(fields)
+        self.update_chunk(index, chunk)
+        return chunk
+
+    def set_render_status(self, index, status):
+        with self.conn:
+            self.conn.execute("UPDATE chunks SET render_status = ?, updated = ? WHERE idx = ?",
+                              (status, time.time(), int(index)))
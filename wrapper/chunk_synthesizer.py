@@ -6,6 +6,8 @@ from pydub import AudioSegment
 
 from modules.tts_engine import load_optimized_model
 from modules.file_manager import ensure_voice_sample_compatibility, list_voice_samples
+from modules.chunk_journal import write_chunk_atomic
+from modules.watermark import chunk_watermark_disabled
 from modules.audio_processor import apply_smart_fade_memory, smart_audio_validation_memory, process_audio_with_trimming_and_silence
 from config.config import *
 
@@ -163,7 +165,8 @@ def synthesize_chunk(chunk, index, book_name, audio_dir, revision=False, chunks_
             wav = model.generate(chunk_text, 
                                exaggeration=tts_params['exaggeration'],
                                cfg_weight=tts_params['cfg_weight'], 
-                               temperature=tts_params['temperature']).detach().cpu()
+                               temperature=tts_params['temperature'],
+                               disable_watermark=chunk_watermark_disabled()).detach().cpu()
         
         if wav.dim() == 1:
             wav = wav.unsqueeze(0)
@@ -193,7 +196,7 @@ def synthesize_chunk(chunk, index, book_name, audio_dir, revision=False, chunks_
                 audio_segment = trim_audio_endpoint(audio_segment)
             
         # Save final audio
-        audio_segment.export(out_path, format="wav")
+        write_chunk_atomic(audio_segment, out_path, tts_params)
         print(f"✅ Saved synthesized chunk: {out_path.name}")
         
         # Clean up model